@@ -0,0 +1,7 @@
+"""Benchmarks for the dp800 package.
+
+python -m bench runs the I/O scenarios in bench.scenarios against a fake
+instrument with configurable latency and emits JSON results, including message,
+byte and round-trip counts. python -m bench.command_path times the Python-side
+cost of individual operations.
+"""
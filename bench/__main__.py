@@ -0,0 +1,37 @@
+"""Run the benchmark scenarios and emit the results as JSON.
+
+Run from the repository root with, for example:
+
+    python -m bench --latency 0.002 --jitter 0.0005 --output bench.json
+"""
+import argparse
+import json
+import sys
+
+from bench.runner import run
+from bench.scenarios import SCENARIOS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bench', description=__doc__.splitlines()[0])
+    parser.add_argument('scenarios', nargs='*', metavar='SCENARIO',
+                        help="Scenarios to run, from: {}. Defaults to all.".format(', '.join(SCENARIOS)))
+    parser.add_argument('--latency', type=float, default=0.0, help="Mean per-message latency in seconds.")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Maximum per-message jitter in seconds.")
+    parser.add_argument('--repeat', type=int, default=5, help="Number of repeats of each scenario.")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for the jitter.")
+    parser.add_argument('--output', default=None, help="File to write results to. Defaults to stdout.")
+    args = parser.parse_args(argv)
+
+    results = run(args.scenarios or None, latency=args.latency, jitter=args.jitter,
+                  repeat=args.repeat, seed=args.seed)
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Microbenchmark of the Python-side cost of the DP832 command path.
+
+Run from the repository root with:
+
+    python -m bench.command_path
+
+Each operation is timed against the fake instrument and against a null
+instrument which does no work at all, so that the latter isolates the cost of
+the object model itself.
+"""
+import timeit
+
+from dp800.dp800 import DP832
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class NullInstrument:
+
+    def write(self, command):
+        pass
+
+    def query(self, command):
+        if command == '*IDN?':
+            return 'RIGOL TECHNOLOGIES,DP832,DP8A000001,00.01.01\n'
+        return '1.000\n'
+
+
+def operations(dp832):
+    channel = dp832.channel(2)
+    setpoint = channel.voltage.setpoint
+    step = setpoint.step
+    protection = channel.current.protection
+
+    def set_level():
+        setpoint.level = 5.0
+
+    def set_increment():
+        step.increment = 0.1
+
+    def set_protection_level():
+        protection.level = 1.5
+
+    return [
+        ('setpoint.level = v', set_level),
+        ('setpoint.level', lambda: setpoint.level),
+        ('step.increment = v', set_increment),
+        ('protection.level = v', set_protection_level),
+        ('protection.level', lambda: protection.level),
+        ('voltage.measurement', lambda: channel.voltage.measurement),
+    ]
+
+
+def measure(number=20000, repeat=5):
+    """Time each operation.
+
+    Returns:
+        A list of (instrument name, operation name, nanoseconds per call) tuples.
+    """
+    results = []
+    for instrument_name, instrument in (('null', NullInstrument()), ('fake', FakeVisaDP832())):
+        dp832 = DP832(instrument)
+        for operation_name, operation in operations(dp832):
+            best = min(timeit.repeat(operation, number=number, repeat=repeat))
+            results.append((instrument_name, operation_name, best / number * 1e9))
+    return results
+
+
+def main():
+    for instrument_name, operation_name, nanoseconds in measure():
+        print("{:<6} {:<24} {:>10.0f} ns/call".format(instrument_name, operation_name, nanoseconds))
+
+
+if __name__ == '__main__':
+    main()
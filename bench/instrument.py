@@ -0,0 +1,66 @@
+"""A fake DP832 which injects latency and counts traffic."""
+import random
+import time
+
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class LatencyInstrument:
+    """Wraps an instrument, delaying each message and counting the traffic.
+
+    A write costs one message latency; a query costs one message latency for
+    the request and its response together, so that a query is one round trip.
+
+    Args:
+        instrument: The wrapped instrument. Defaults to a new FakeVisaDP832.
+        latency: The mean delay per message in seconds.
+        jitter: The maximum deviation from the mean delay in seconds, drawn
+            uniformly for each message.
+        seed: An optional seed for the jitter.
+    """
+
+    def __init__(self, instrument=None, latency=0.0, jitter=0.0, seed=None):
+        self._inst = FakeVisaDP832() if instrument is None else instrument
+        self._latency = latency
+        self._jitter = jitter
+        self._random = random.Random(seed)
+        self.reset()
+
+    @property
+    def instrument(self):
+        return self._inst
+
+    def reset(self):
+        self.messages = 0
+        self.round_trips = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def counters(self):
+        return dict(
+            messages=self.messages,
+            round_trips=self.round_trips,
+            bytes_sent=self.bytes_sent,
+            bytes_received=self.bytes_received)
+
+    def _delay(self):
+        delay = self._latency
+        if self._jitter:
+            delay += self._random.uniform(-self._jitter, self._jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def write(self, command):
+        self.messages += 1
+        self.bytes_sent += len(command) + 1
+        self._delay()
+        return self._inst.write(command)
+
+    def query(self, command):
+        self.messages += 1
+        self.round_trips += 1
+        self.bytes_sent += len(command) + 1
+        self._delay()
+        response = self._inst.query(command)
+        self.bytes_received += len(response) if response is not None else 0
+        return response
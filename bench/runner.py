@@ -0,0 +1,52 @@
+"""Running of benchmark scenarios against a latency-injecting fake instrument."""
+import time
+from collections import OrderedDict
+
+from bench.instrument import LatencyInstrument
+from bench.scenarios import SCENARIOS
+from dp800.dp800 import DP832
+
+
+def run_scenario(scenario, latency=0.0, jitter=0.0, repeat=5, seed=None):
+    """Run one scenario repeatedly on a fresh instrument.
+
+    Returns:
+        A dict of the I/O counters for a single run, and the best wall-clock and
+        client CPU times over the repeats, in seconds.
+    """
+    instrument = LatencyInstrument(latency=latency, jitter=jitter, seed=seed)
+    dp832 = DP832(instrument)
+    wall_times = []
+    cpu_times = []
+    for _ in range(repeat):
+        instrument.reset()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        scenario(dp832)
+        cpu_times.append(time.process_time() - cpu_start)
+        wall_times.append(time.perf_counter() - wall_start)
+    result = instrument.counters()
+    result.update(wall_time=min(wall_times), cpu_time=min(cpu_times))
+    return result
+
+
+def run(names=None, latency=0.0, jitter=0.0, repeat=5, seed=None):
+    """Run the named scenarios, or all of them.
+
+    Returns:
+        A dict, suitable for serializing as JSON, of the parameters and an ordered
+        mapping of scenario name to result.
+    """
+    names = list(SCENARIOS.keys()) if names is None else names
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise ValueError("Unknown scenarios {}; choose from {}".format(
+            ', '.join(unknown), ', '.join(SCENARIOS.keys())))
+    results = OrderedDict(
+        (name, run_scenario(SCENARIOS[name], latency=latency, jitter=jitter, repeat=repeat, seed=seed))
+        for name in names)
+    return OrderedDict([
+        ('latency', latency),
+        ('jitter', jitter),
+        ('repeat', repeat),
+        ('results', results)])
@@ -0,0 +1,95 @@
+"""Benchmark scenarios, each a function of a DP832.
+
+Scenarios come in variants which do the same work through different APIs, so
+that the I/O cost of each API can be compared and tracked.
+"""
+from collections import OrderedDict
+
+
+def _configuration_queries(dp832):
+    queries = []
+    for channel_id in dp832.channel_ids:
+        queries.append(':OUTPUT:STATE? CH{}'.format(channel_id))
+        for name in ('VOLTAGE', 'CURRENT'):
+            header = ':SOURCE{}:{}'.format(channel_id, name)
+            queries.extend([
+                header + ':IMMEDIATE?',
+                header + ':STEP?',
+                header + ':PROTECTION?',
+                header + ':PROTECTION:STATE?'])
+    return queries
+
+
+def full_state_read_per_property(dp832):
+    for channel_id in dp832.channel_ids:
+        channel = dp832.channel(channel_id)
+        channel.is_on
+        for quantity in (channel.voltage, channel.current):
+            quantity.setpoint.level
+            quantity.setpoint.step.increment
+            quantity.protection.level
+            quantity.protection.is_enabled
+
+
+def full_state_read_batched(dp832):
+    dp832.query_many(_configuration_queries(dp832))
+
+
+def _setup(dp832):
+    for channel_id in dp832.channel_ids:
+        channel = dp832.channel(channel_id)
+        for quantity in (channel.voltage, channel.current):
+            quantity.setpoint.level = quantity.protection.min
+            quantity.setpoint.step.increment = 0.01
+            quantity.protection.level = quantity.protection.max
+            quantity.protection.enable()
+        channel.on()
+
+
+def setup_sequence_per_write(dp832):
+    _setup(dp832)
+
+
+def setup_sequence_batched(dp832):
+    with dp832.batch():
+        _setup(dp832)
+
+
+def measurement_polling_per_property(dp832, samples=10):
+    for _ in range(samples):
+        for channel_id in dp832.channel_ids:
+            channel = dp832.channel(channel_id)
+            channel.voltage.measurement
+            channel.current.measurement
+            channel.power.measurement
+
+
+def measurement_polling_measure_all(dp832, samples=10):
+    for _ in range(samples):
+        for channel_id in dp832.channel_ids:
+            dp832.channel(channel_id).measure_all()
+
+
+def measurement_polling_batched(dp832, samples=10):
+    queries = [':MEASURE:ALL? CH{}'.format(channel_id) for channel_id in dp832.channel_ids]
+    for _ in range(samples):
+        dp832.query_many(queries)
+
+
+def sweep_set_and_measure(dp832, points=20):
+    channel = dp832.channel(1)
+    for index in range(points):
+        channel.voltage.setpoint.level = 1.0 + index * 0.1
+        channel.current.measurement
+
+
+SCENARIOS = OrderedDict([
+    ('full_state_read.per_property', full_state_read_per_property),
+    ('full_state_read.batched', full_state_read_batched),
+    ('setup_sequence.per_write', setup_sequence_per_write),
+    ('setup_sequence.batched', setup_sequence_batched),
+    ('measurement_polling.per_property', measurement_polling_per_property),
+    ('measurement_polling.measure_all', measurement_polling_measure_all),
+    ('measurement_polling.batched', measurement_polling_batched),
+    ('sweep.set_and_measure', sweep_set_and_measure),
+])
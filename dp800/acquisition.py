@@ -0,0 +1,107 @@
+"""Streaming acquisition of channel measurements into NumPy sample blocks.
+
+This module depends on NumPy, which is imported only when streaming is used.
+"""
+import time
+from collections import namedtuple
+
+import numpy as np
+
+
+Block = namedtuple('Block', ['samples', 'channel_ids', 'achieved_rate', 'dropped'])
+Block.__doc__ = """A block of consecutive samples yielded by stream().
+
+samples: A structured array with fields 'timestamp', 'voltage', 'current' and
+    'power'. The measurement fields each hold one column per channel. This is
+    a view into the stream's ring buffer, so copy it if it must outlive
+    subsequent blocks.
+channel_ids: The channel ids in column order.
+achieved_rate: The sample rate achieved over this block, in samples per second.
+dropped: The number of sample periods missed during this block because the
+    instrument could not keep up with the requested rate.
+"""
+
+
+def sample_dtype(num_channels):
+    """The structured dtype of a sample across num_channels channels."""
+    return np.dtype([
+        ('timestamp', 'f8'),
+        ('voltage', 'f8', (num_channels,)),
+        ('current', 'f8', (num_channels,)),
+        ('power', 'f8', (num_channels,)),
+    ])
+
+
+def stream(device, channels=None, rate=10.0, block_size=None, num_blocks=4):
+    """Acquire measurements from channels at a fixed rate, yielding blocks of samples.
+
+    Each sample measures voltage, current and power on all requested channels in
+    a single round trip. Sampling is paced against the monotonic clock; when a
+    round trip overruns one or more sample periods those periods are skipped
+    and counted as dropped rather than accumulating lag.
+
+    Args:
+        device: A DP832.
+        channels: An iterable of channel ids. Defaults to all channels.
+        rate: The requested sample rate in samples per second.
+        block_size: The number of samples per yielded block. Defaults to
+            approximately one second of samples.
+        num_blocks: The number of blocks in the ring buffer. Blocks remain
+            valid until num_blocks - 1 further blocks have been yielded.
+
+    Yields:
+        Block instances, indefinitely.
+    """
+    if rate <= 0:
+        raise ValueError("Sample rate {} is not positive".format(rate))
+    channel_ids = device.channel_ids if channels is None else [device.channel(channel_id).id
+                                                               for channel_id in channels]
+    if block_size is None:
+        block_size = max(1, int(rate))
+    if block_size < 1:
+        raise ValueError("Block size {} is less than one".format(block_size))
+    if num_blocks < 2:
+        raise ValueError("Number of blocks {} is less than two".format(num_blocks))
+
+    num_channels = len(channel_ids)
+    ring = np.zeros(num_blocks * block_size, dtype=sample_dtype(num_channels))
+    timestamps = ring['timestamp']
+    voltages = ring['voltage']
+    currents = ring['current']
+    powers = ring['power']
+    # Each sample is parsed into this array, one row per channel, and copied
+    # into the ring buffer column by column.
+    values = np.empty((num_channels, 3))
+    queries = [':MEASURE:ALL? CH{}'.format(channel_id) for channel_id in channel_ids]
+
+    period = 1.0 / rate
+    start = time.monotonic()
+    tick = 0
+    block_index = 0
+    while True:
+        offset = block_index * block_size
+        dropped = 0
+        block_start = time.monotonic()
+        for row in range(offset, offset + block_size):
+            deadline = start + tick * period
+            now = time.monotonic()
+            if now < deadline:
+                time.sleep(deadline - now)
+            else:
+                missed = int((now - deadline) / period)
+                dropped += missed
+                tick += missed
+            timestamps[row] = time.time()
+            for index, response in enumerate(device.query_many(queries)):
+                try:
+                    values[index] = np.fromstring(response, sep=',', count=3)
+                except ValueError as e:
+                    raise RuntimeError("Unexpected response to measure all query: {!r}".format(response)) from e
+            voltages[row] = values[:, 0]
+            currents[row] = values[:, 1]
+            powers[row] = values[:, 2]
+            tick += 1
+        elapsed = time.monotonic() - block_start
+        achieved_rate = block_size / elapsed if elapsed > 0 else float('inf')
+        yield Block(ring[offset:offset + block_size], channel_ids, achieved_rate, dropped)
+        block_index = (block_index + 1) % num_blocks
@@ -0,0 +1,400 @@
+"""An asyncio-native client for the Rigol DP832.
+
+The object model mirrors that of dp800.dp800 - AsyncDP832, AsyncChannel,
+AsyncQuantity, AsyncSetPoint, AsyncStep and AsyncProtection - but every
+operation which touches the instrument is a coroutine. Since property setters
+cannot be awaited, each settable value has a getter coroutine named after the
+property and a set_ prefixed setter coroutine:
+
+    level = await channel.voltage.setpoint.level()
+    await channel.voltage.setpoint.set_level(5.0)
+
+AsyncDP832 sits on an async transport, an object with coroutine methods
+write(message) and query(message). AsyncSocketTransport speaks SCPI over TCP
+directly; ExecutorTransport adapts any blocking instrument, such as a pyvisa
+resource, by running its calls in an executor.
+"""
+import asyncio
+from collections import OrderedDict
+
+from dp800.dp800 import (
+    DP832_CHANNEL_LIMITS, ChannelMode, Measurement, Applied, to_boolean, is_query, join_commands,
+    split_responses, parse_measurement, parse_applied, parse_float, parse_boolean, check_range)
+
+
+class AsyncSocketTransport:
+    """An async transport speaking newline-terminated SCPI over a TCP socket.
+
+    Requests on one transport are serialized, so concurrent coroutines sharing it
+    receive the responses to their own queries. If a request times out, fails or
+    is cancelled part way through, the connection is dropped, so that a response
+    left unread cannot be mistaken for that of a later query. The next request
+    reconnects.
+
+    Args:
+        host: The host name or address of the instrument.
+        port: The TCP port of the instrument.
+        encoding: The character encoding of messages.
+        timeout: The timeout in seconds for connecting and for each request, or
+            None to wait indefinitely.
+    """
+
+    def __init__(self, host, port=5555, encoding='ascii', timeout=5.0):
+        self._host = host
+        self._port = port
+        self._encoding = encoding
+        self._timeout = timeout
+        self._reader = None
+        self._writer = None
+        self._lock = asyncio.Lock()
+
+    async def open(self):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self._host, self._port), self._timeout)
+        return self
+
+    async def close(self):
+        if self._writer is not None:
+            writer = self._writer
+            self._reader = None
+            self._writer = None
+            writer.close()
+            await writer.wait_closed()
+
+    async def write(self, message):
+        async with self._lock:
+            await self._request(message, expects_response=False)
+
+    async def query(self, message):
+        async with self._lock:
+            response = await self._request(message, expects_response=True)
+            if not response:
+                self._abandon()
+                raise ConnectionError("Connection to {}:{} closed by instrument".format(self._host, self._port))
+        return response.decode(self._encoding)
+
+    async def _request(self, message, expects_response):
+        await self.open()
+        try:
+            return await asyncio.wait_for(self._exchange(message, expects_response), self._timeout)
+        except BaseException:
+            self._abandon()
+            raise
+
+    async def _exchange(self, message, expects_response):
+        self._writer.write(message.encode(self._encoding) + b'\n')
+        await self._writer.drain()
+        if expects_response:
+            return await self._reader.readline()
+        return None
+
+    def _abandon(self):
+        """Drop the connection without waiting, since the request which failed may have been cancelled."""
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = None
+            self._writer = None
+
+
+class ExecutorTransport:
+    """An async transport which runs the calls of a blocking instrument in an executor.
+
+    Args:
+        instrument: An object with blocking write(message) and query(message) methods.
+        executor: A concurrent.futures.Executor, or None for the event loop's default.
+    """
+
+    def __init__(self, instrument, executor=None):
+        self._inst = instrument
+        self._executor = executor
+        self._lock = asyncio.Lock()
+
+    async def write(self, message):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._inst.write, message)
+
+    async def query(self, message):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._inst.query, message)
+
+
+class AsyncDP832:
+    """An asyncio client for a Rigol DP832.
+
+    Use the open() coroutine to construct an instance, since the instrument
+    must be identified before it is used.
+    """
+
+    def __init__(self, transport):
+        self._transport = transport
+        self._channels = OrderedDict(
+            (channel_id, AsyncChannel(self, channel_id, **limits))
+            for channel_id, limits in DP832_CHANNEL_LIMITS.items())
+
+    @classmethod
+    async def open(cls, transport):
+        identification = await transport.query('*IDN?')
+        if 'DP832' not in identification:
+            raise ValueError("Instrument identified by {!r} is not a Rigol DP832".format(identification))
+        return cls(transport)
+
+    @property
+    def transport(self):
+        return self._transport
+
+    @property
+    def channel_ids(self):
+        return list(self._channels.keys())
+
+    def channel(self, channel_id):
+        try:
+            return self._channels[channel_id]
+        except KeyError:
+            channel_ids = self.channel_ids
+            raise ValueError("Invalid channel id {} not in range {}-{}".format(
+                channel_id, channel_ids[0], channel_ids[-1]))
+
+    async def write(self, command, *args, **kwargs):
+        return await self._transport.write(command.format(*args, **kwargs))
+
+    async def query(self, command, *args, **kwargs):
+        return await self._transport.query(command.format(*args, **kwargs))
+
+    async def write_many(self, commands):
+        """Send several commands to the instrument in a single message."""
+        message = join_commands(commands)
+        if message:
+            await self._transport.write(message)
+
+    async def query_many(self, commands):
+        """Send several commands in a single message and collect the responses.
+
+        See DP832.query_many.
+        """
+        commands = list(commands)
+        num_queries = sum(1 for command in commands if is_query(command))
+        if num_queries == 0:
+            await self.write_many(commands)
+            return []
+        response = await self._transport.query(join_commands(commands))
+        responses = split_responses(response)
+        if len(responses) != num_queries:
+            raise RuntimeError("Expected {} responses but received {} in {!r}".format(
+                num_queries, len(responses), response))
+        return responses
+
+
+class AsyncChannel:
+
+    def __init__(self, device, channel_id, over_voltage_min, over_voltage_max, over_current_min, over_current_max, step_min, step_max):
+        self._device = device
+        self._id = channel_id
+        self._voltage = AsyncQuantity(self, 'voltage', 'V', over_voltage_min, over_voltage_max, step_min, step_max)
+        self._current = AsyncQuantity(self, 'current', 'A', over_current_min, over_current_max, step_min, step_max)
+        self._power = AsyncMeasurableQuantity(self, 'power', 'W')
+
+    @property
+    def device(self):
+        return self._device
+
+    @property
+    def id(self):
+        return self._id
+
+    async def is_on(self):
+        return parse_boolean(await self._device.query(':OUTPUT:STATE? CH{}', self._id))
+
+    async def set_on(self, value):
+        await self._device.write(':OUTPUT:STATE CH{},{}', self._id, to_boolean(value))
+
+    async def on(self):
+        await self.set_on(True)
+
+    async def off(self):
+        await self.set_on(False)
+
+    async def mode(self):
+        response = await self._device.query(':OUTPUT:MODE? CH{}', self._id)
+        try:
+            return ChannelMode.from_response(response)
+        except ValueError as e:
+            raise RuntimeError("Unexpected response: {!r}".format(response)) from e
+
+    async def measure_all(self) -> Measurement:
+        return parse_measurement(await self._device.query(':MEASURE:ALL? CH{}', self._id))
+
+    async def applied(self) -> Applied:
+        return parse_applied(await self._device.query(':APPLY? CH{}', self._id))
+
+    @property
+    def voltage(self) -> 'AsyncQuantity':
+        return self._voltage
+
+    @property
+    def current(self) -> 'AsyncQuantity':
+        return self._current
+
+    @property
+    def power(self) -> 'AsyncMeasurableQuantity':
+        return self._power
+
+
+class AsyncMeasurableQuantity:
+
+    def __init__(self, channel, name, unit):
+        self._channel = channel
+        self._name = name
+        self._unit = unit
+
+    @property
+    def channel(self) -> AsyncChannel:
+        return self._channel
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def unit(self):
+        return self._unit
+
+    async def measurement(self):
+        response = await self._channel.device.query(':MEASURE:{}? CH{}', self._name.upper(), self._channel.id)
+        return parse_float(self, response)
+
+
+class AsyncQuantity(AsyncMeasurableQuantity):
+
+    def __init__(self, channel, name, unit, over_quantity_min, over_quantity_max, step_min, step_max):
+        super().__init__(channel, name, unit)
+        self._setpoint = AsyncSetPoint(self, step_min, step_max)
+        self._protection = AsyncProtection(self, over_quantity_min, over_quantity_max)
+
+    @property
+    def setpoint(self) -> 'AsyncSetPoint':
+        return self._setpoint
+
+    @property
+    def protection(self) -> 'AsyncProtection':
+        return self._protection
+
+
+class AsyncSetPoint:
+
+    def __init__(self, quantity, step_min, step_max):
+        self._quantity = quantity
+        self._step = AsyncStep(self, step_min, step_max)
+
+    @property
+    def quantity(self) -> AsyncQuantity:
+        return self._quantity
+
+    @property
+    def step(self) -> 'AsyncStep':
+        return self._step
+
+    async def level(self):
+        quantity = self._quantity
+        response = await quantity.channel.device.query(':SOURCE{}:{}:IMMEDIATE?', quantity.channel.id, quantity.name.upper())
+        return parse_float(quantity, response)
+
+    async def set_level(self, value):
+        quantity = self._quantity
+        check_range(quantity, value, quantity.protection.min, quantity.protection.max)
+        await quantity.channel.device.write(':SOURCE{}:{}:IMMEDIATE {:.3f}', quantity.channel.id, quantity.name.upper(), value)
+
+
+class AsyncStep:
+
+    def __init__(self, setpoint, step_min, step_max):
+        self._setpoint = setpoint
+        self._min = step_min
+        self._max = step_max
+
+    @property
+    def setpoint(self) -> AsyncSetPoint:
+        return self._setpoint
+
+    @property
+    def min(self):
+        return self._min
+
+    @property
+    def max(self):
+        return self._max
+
+    async def increment(self):
+        quantity = self._setpoint.quantity
+        response = await quantity.channel.device.query(':SOURCE{}:{}:STEP?', quantity.channel.id, quantity.name.upper())
+        return parse_float(quantity, response)
+
+    async def set_increment(self, value):
+        quantity = self._setpoint.quantity
+        check_range(quantity, value, quantity.protection.min, quantity.protection.max)
+        await quantity.channel.device.write(':SOURCE{}:{}:STEP {:.3f}', quantity.channel.id, quantity.name.upper(), value)
+
+    async def default(self):
+        quantity = self._setpoint.quantity
+        response = await quantity.channel.device.query(':SOURCE{}:{}:STEP? DEFAULT', quantity.channel.id, quantity.name.upper())
+        return parse_float(quantity, response)
+
+    async def reset(self):
+        quantity = self._setpoint.quantity
+        await quantity.channel.device.write(':SOURCE{}:{}:STEP DEFAULT', quantity.channel.id, quantity.name.upper())
+
+
+class AsyncProtection:
+
+    def __init__(self, quantity, over_quantity_min, over_quantity_max):
+        self._quantity = quantity
+        self._min = over_quantity_min
+        self._max = over_quantity_max
+
+    @property
+    def quantity(self) -> AsyncQuantity:
+        return self._quantity
+
+    @property
+    def min(self):
+        return self._min
+
+    @property
+    def max(self):
+        return self._max
+
+    async def has_tripped(self):
+        quantity = self._quantity
+        response = await quantity.channel.device.query(':SOURCE{}:{}:PROTECTION:TRIPPED?', quantity.channel.id, quantity.name.upper())
+        return parse_boolean(response)
+
+    async def is_enabled(self):
+        quantity = self._quantity
+        response = await quantity.channel.device.query(':SOURCE{}:{}:PROTECTION:STATE?', quantity.channel.id, quantity.name.upper())
+        return parse_boolean(response)
+
+    async def set_enabled(self, value):
+        quantity = self._quantity
+        await quantity.channel.device.write(':SOURCE{}:{}:PROTECTION:STATE {}', quantity.channel.id, quantity.name.upper(), to_boolean(value))
+
+    async def enable(self):
+        await self.set_enabled(True)
+
+    async def disable(self):
+        await self.set_enabled(False)
+
+    async def clear(self):
+        quantity = self._quantity
+        await quantity.channel.device.write(':SOURCE{}:{}:PROTECTION:CLEAR', quantity.channel.id, quantity.name.upper())
+
+    async def level(self):
+        quantity = self._quantity
+        response = await quantity.channel.device.query(':SOURCE{}:{}:PROTECTION?', quantity.channel.id, quantity.name.upper())
+        return parse_float(quantity, response)
+
+    async def set_level(self, value):
+        quantity = self._quantity
+        check_range(quantity, value, quantity.protection.min, quantity.protection.max)
+        await quantity.channel.device.write(':SOURCE{}:{}:PROTECTION {:.3f}', quantity.channel.id, quantity.name.upper(), value)
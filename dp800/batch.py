@@ -0,0 +1,95 @@
+"""Coalescing of buffered writes into few program messages."""
+from itertools import count
+
+
+# The longest program message, in characters, sent when flushing a batch.
+MAX_MESSAGE_LENGTH = 1024
+
+# Headers of commands which select a channel, or act on the selected channel.
+_SELECTED_CHANNEL_HEADERS = (':INST', 'INST', ':TIME', 'TIME')
+
+
+def parameter_key(command):
+    """Identify the instrument parameter set by a command.
+
+    The key is the command header, qualified by a leading channel argument such
+    as the CH1 in ':OUTPUT:STATE CH1,ON'. Commands without arguments, such as
+    ':SOURCE1:VOLTAGE:PROTECTION:CLEAR', and common '*' commands are actions
+    rather than parameter settings, for which None is returned. So are the
+    commands which select a channel, and the timer commands which act on the
+    selected channel, since the parameter they set depends on the selection.
+    """
+    header, _, arguments = command.strip().partition(' ')
+    if not arguments or header.startswith('*'):
+        return None
+    header = header.upper()
+    if header.startswith(_SELECTED_CHANNEL_HEADERS):
+        return None
+    first, separator, _ = arguments.partition(',')
+    first = first.strip().upper()
+    if separator and first.startswith('CH'):
+        return header + ' ' + first
+    return header
+
+
+class WriteBatch:
+    """A buffer of write commands in which superseded writes are dropped.
+
+    A write which sets the same parameter as an earlier buffered write replaces
+    it, and takes its place after the other buffered writes, so the writes which
+    are kept are applied in the order in which they were made. Actions are never dropped, and act as barriers: writes after
+    an action are never coalesced with writes before it.
+    """
+
+    def __init__(self):
+        self._commands = {}
+        self._epoch = 0
+        self._unique = count()
+
+    def __len__(self):
+        return len(self._commands)
+
+    def add(self, command):
+        key = parameter_key(command)
+        if key is None:
+            self._commands[(self._epoch, next(self._unique))] = command
+            self._epoch += 1
+        else:
+            self._commands.pop((self._epoch, key), None)
+            self._commands[(self._epoch, key)] = command
+
+    @property
+    def commands(self):
+        """The buffered commands, in order."""
+        return list(self._commands.values())
+
+    def clear(self):
+        self._commands.clear()
+
+    def messages(self, max_length=MAX_MESSAGE_LENGTH):
+        """Group the buffered commands into lists, each of which fits in one program message.
+
+        See pack_commands().
+        """
+        return pack_commands(self._commands.values(), max_length)
+
+
+def pack_commands(commands, max_length=MAX_MESSAGE_LENGTH):
+    """Group commands, in order, into lists each of which fits in one program message.
+
+    A command longer than max_length is placed in a list of its own.
+    """
+    messages = []
+    current = []
+    length = 0
+    for command in commands:
+        added_length = len(command) + 1
+        if current and length + added_length > max_length:
+            messages.append(current)
+            current = []
+            length = 0
+        current.append(command)
+        length += added_length
+    if current:
+        messages.append(current)
+    return messages
@@ -0,0 +1,428 @@
+"""A local broker through which many processes share one DP832.
+
+The instrument accepts only a few connections. Rather than each process
+opening its own, a Broker owns the single connection and serves any number of
+local client processes over a Unix domain socket:
+
+    $ python -m dp800.broker 10.0.0.145 --socket /tmp/dp832.sock
+
+    dp832 = connect('/tmp/dp832.sock')
+
+Messages from all clients are executed by one IOWorker, so identical reads
+which are pending at the same time, such as measurements polled by several
+loggers, are merged into a single query. Configuration reads - setpoints, step
+increments and protection settings - are served from a StateCache shared by
+all clients, which writes through the broker invalidate.
+
+Each frame of the protocol is a six byte header, packed as _HEADER, of an
+opcode, an argument byte and the length of the payload which follows. Requests
+are WRITE or QUERY, whose argument is the priority and whose payload is the
+message. Replies are RESPONSE, whose payload is the response, ACK for a
+request with no response, or ERROR, whose argument is one of the ERROR_ kinds
+and whose payload describes the error.
+"""
+import argparse
+import os
+import socket
+import socketserver
+import struct
+import threading
+
+from dp800.cache import (
+    StateCache, SETPOINT_LEVEL, STEP_INCREMENT, STEP_DEFAULT, PROTECTION_LEVEL, PROTECTION_IS_ENABLED)
+from dp800.dp800 import DP832
+from dp800.instrumentation import is_timeout
+from dp800.scpi import split_units
+from dp800.shared import NORMAL, IOWorker
+
+
+_HEADER = struct.Struct('!BBI')
+
+WRITE = 1
+QUERY = 2
+RESPONSE = 3
+ACK = 4
+ERROR = 5
+
+ERROR_INSTRUMENT = 0
+ERROR_TIMEOUT = 1
+ERROR_PROTOCOL = 2
+
+# The longest payload accepted, in bytes.
+MAX_PAYLOAD = 1 << 20
+
+
+class BrokerError(RuntimeError):
+    """An error reported by the broker."""
+
+
+def _receive_exactly(sock, view):
+    received = 0
+    while received < len(view):
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            return False
+        received += count
+    return True
+
+
+def send_frame(sock, opcode, argument, payload=b''):
+    sock.sendall(_HEADER.pack(opcode, argument, len(payload)) + payload)
+
+
+def receive_frame(sock):
+    """Receive a frame.
+
+    Returns:
+        An (opcode, argument, payload) triple, or None if the connection was
+        closed before a frame began.
+    """
+    header = bytearray(_HEADER.size)
+    if not _receive_exactly(sock, memoryview(header)):
+        return None
+    opcode, argument, length = _HEADER.unpack(header)
+    if length > MAX_PAYLOAD:
+        raise BrokerError("Frame payload of {} bytes exceeds maximum of {}".format(length, MAX_PAYLOAD))
+    payload = bytearray(length)
+    if not _receive_exactly(sock, memoryview(payload)):
+        raise ConnectionError("Connection closed within a frame")
+    return opcode, argument, bytes(payload)
+
+
+def _configuration_tables(dp832):
+    """Tables of the configuration queries of a DP832, and of the commands which set their values.
+
+    Returns:
+        A pair of dicts: query to cache category, and command header to the
+        query it affects, or None for commands which affect no configuration.
+    """
+    categories = {}
+    headers = {':OUTPUT:STATE': None}
+    for channel_id in dp832.channel_ids:
+        channel = dp832.channel(channel_id)
+        for quantity in (channel.voltage, channel.current):
+            setpoint = quantity.setpoint
+            step = setpoint.step
+            protection = quantity.protection
+            for query, command, category in (
+                    (setpoint._level_query, setpoint._level_command, SETPOINT_LEVEL),
+                    (step._increment_query, step._increment_command, STEP_INCREMENT),
+                    (step._default_query, None, STEP_DEFAULT),
+                    (protection._level_query, protection._level_command, PROTECTION_LEVEL),
+                    (protection._state_query, protection._state_command, PROTECTION_IS_ENABLED)):
+                categories[query] = category
+                if command is not None:
+                    headers[command.strip()] = query
+            headers[protection._clear_command] = None
+    return categories, headers
+
+
+class Broker:
+    """Owns the connection to a DP832 and serves local clients over a Unix domain socket.
+
+    Args:
+        instrument: A VISA instrument resource, or any object with compatible
+            write() and query() methods, such as a SocketTransport.
+        path: The path of the Unix domain socket to listen on.
+        cache: The StateCache shared by all clients. Defaults to one in which
+            entries expire after a second, so that changes made other than
+            through the broker, such as from the front panel, are soon seen.
+    """
+
+    def __init__(self, instrument, path, cache=None):
+        self._worker = IOWorker(instrument, name='dp800-broker-io')
+        try:
+            self._categories, self._headers = _configuration_tables(DP832(self._worker))
+        except BaseException:
+            self._worker.close()
+            raise
+        self._cache = StateCache(default_ttl=1.0) if cache is None else cache
+        self._cache_lock = threading.Lock()
+        self._generation = 0
+        self._path = path
+        self._server = None
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def worker(self):
+        return self._worker
+
+    @property
+    def cache(self):
+        return self._cache
+
+    def start(self):
+        """Listen on the socket and serve clients from a background thread."""
+        self._listen()
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), name='dp800-broker',
+                                        daemon=True)
+        self._thread.start()
+
+    def serve_forever(self):
+        """Listen on the socket and serve clients until interrupted."""
+        self._listen()
+        try:
+            self._server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop serving, remove the socket and close the connection to the instrument."""
+        server, self._server = self._server, None
+        if server is not None:
+            if self._thread is not None:
+                server.shutdown()
+                self._thread.join()
+                self._thread = None
+            server.server_close()
+            try:
+                os.unlink(self._path)
+            except FileNotFoundError:
+                pass
+        self._worker.close()
+
+    def _listen(self):
+        if self._server is not None:
+            raise RuntimeError("Broker is already serving on {}".format(self._path))
+        if os.path.exists(self._path):
+            # Remove a socket left by a broker which did not exit cleanly, unless it is still being served.
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self._path)
+            except OSError:
+                os.unlink(self._path)
+            else:
+                raise RuntimeError("A broker is already serving on {}".format(self._path))
+            finally:
+                probe.close()
+        broker = self
+
+        class Handler(socketserver.BaseRequestHandler):
+
+            def handle(self):
+                broker._serve_client(self.request)
+
+        self._server = _Server(self._path, Handler)
+
+    def _serve_client(self, sock):
+        while True:
+            try:
+                frame = receive_frame(sock)
+            except (BrokerError, ConnectionError) as e:
+                try:
+                    send_frame(sock, ERROR, ERROR_PROTOCOL, str(e).encode('utf-8'))
+                except OSError:
+                    pass
+                return
+            if frame is None:
+                return
+            opcode, priority, payload = frame
+            try:
+                message = payload.decode('ascii')
+                if opcode == QUERY:
+                    response = self.query(message, priority)
+                elif opcode == WRITE:
+                    response = self.write(message, priority)
+                else:
+                    send_frame(sock, ERROR, ERROR_PROTOCOL, "Unknown opcode {}".format(opcode).encode('utf-8'))
+                    continue
+            except Exception as e:
+                kind = ERROR_TIMEOUT if is_timeout(e) else ERROR_INSTRUMENT
+                send_frame(sock, ERROR, kind, "{}: {}".format(type(e).__name__, e).encode('utf-8'))
+                continue
+            if response is None:
+                send_frame(sock, ACK, 0)
+            else:
+                send_frame(sock, RESPONSE, 0, response.encode('ascii'))
+
+    def write(self, message, priority=NORMAL):
+        """Execute a message which expects no response, invalidating the configuration it affects."""
+        self._invalidate(message)
+        try:
+            return self._worker.submit_write(message, priority).result()
+        finally:
+            # A read which overlapped the write may have cached a value which it superseded.
+            self._invalidate(message)
+
+    def query(self, message, priority=NORMAL):
+        """Execute a message and read its response, serving configuration reads from the cache."""
+        units = [unit.strip() for unit in split_units(message)]
+        categories = self._categories
+        if not all(unit in categories for unit in units):
+            # The message may contain writes, as query_many() and error checking send them.
+            self._invalidate(message)
+            try:
+                return self._worker.submit_query(message, priority).result()
+            finally:
+                self._invalidate(message)
+        with self._cache_lock:
+            responses = [self._cache.lookup(unit) for unit in units]
+            generation = self._generation
+        missing = [unit for unit, response in zip(units, responses) if response is None]
+        self.hits += len(units) - len(missing)
+        if missing:
+            self.misses += len(missing)
+            fetched = self._worker.submit_query(';'.join(missing), priority).result()
+            fetched = [response.strip() for response in fetched.split(';')]
+            if len(fetched) != len(missing):
+                raise BrokerError("Expected {} responses to {!r}".format(len(missing), message))
+            fetched = iter(fetched)
+            with self._cache_lock:
+                for index, unit in enumerate(units):
+                    if responses[index] is None:
+                        responses[index] = next(fetched)
+                        if generation == self._generation:
+                            self._cache.store(categories[unit], unit, responses[index])
+        return ';'.join(response.strip() for response in responses) + '\n'
+
+    def _invalidate(self, message):
+        """Invalidate the configuration which the writes in a message may affect."""
+        headers = self._headers
+        queries = []
+        for unit in split_units(message):
+            header = unit.strip().partition(' ')[0]
+            if not header or header.endswith('?'):
+                continue
+            try:
+                query = headers[header]
+            except KeyError:
+                queries = None
+                break
+            if query is not None:
+                queries.append(query)
+        if queries == []:
+            return
+        with self._cache_lock:
+            self._generation += 1
+            if queries is None:
+                self._cache.invalidate()
+            else:
+                self._cache.invalidate(*queries)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class BrokerTransport:
+    """A connection to a Broker, usable in place of a VISA resource.
+
+    Args:
+        path: The path of the broker's Unix domain socket.
+        timeout: The timeout in seconds for each reply, or None to wait indefinitely.
+        priority: The priority of this client's requests; see dp800.shared.
+        encoding: The character encoding of messages.
+    """
+
+    def __init__(self, path, timeout=None, priority=NORMAL, encoding='ascii'):
+        self._path = path
+        self._timeout = timeout
+        self._priority = priority
+        self._encoding = encoding
+        self._socket = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def is_open(self):
+        return self._socket is not None
+
+    def open(self):
+        if self._socket is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.settimeout(self._timeout)
+                sock.connect(self._path)
+            except BaseException:
+                sock.close()
+                raise
+            self._socket = sock
+        return self
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            finally:
+                self._socket = None
+
+    def write(self, message):
+        self._request(WRITE, message)
+
+    def query(self, message):
+        return self._request(QUERY, message)
+
+    def _request(self, opcode, message):
+        self.open()
+        try:
+            send_frame(self._socket, opcode, self._priority, message.encode(self._encoding))
+            frame = receive_frame(self._socket)
+        except OSError:
+            self.close()
+            raise
+        if frame is None:
+            self.close()
+            raise ConnectionError("Connection to broker at {} closed".format(self._path))
+        kind, argument, payload = frame
+        if kind == RESPONSE:
+            return payload.decode(self._encoding)
+        if kind == ACK:
+            return None
+        if kind == ERROR:
+            description = payload.decode('utf-8', errors='replace')
+            if argument == ERROR_TIMEOUT:
+                raise TimeoutError(description)
+            raise BrokerError(description)
+        self.close()
+        raise BrokerError("Unexpected reply opcode {}".format(kind))
+
+
+def connect(path, timeout=None, priority=NORMAL, **kwargs):
+    """Create a DP832 which talks to the instrument through a Broker.
+
+    Args:
+        path: The path of the broker's Unix domain socket.
+        timeout: As for BrokerTransport.
+        priority: As for BrokerTransport.
+        **kwargs: Keyword arguments for DP832.
+    """
+    return DP832(BrokerTransport(path, timeout=timeout, priority=priority), **kwargs)
+
+
+def main(argv=None):
+    from dp800.transport import DEFAULT_PORT, SocketTransport
+    parser = argparse.ArgumentParser(prog='python -m dp800.broker',
+                                     description="Share one DP832 between local processes.")
+    parser.add_argument('host', help="Host name or address of the instrument.")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="TCP port of the instrument.")
+    parser.add_argument('--socket', default='/tmp/dp832.sock', help="Path of the Unix domain socket to serve.")
+    parser.add_argument('--ttl', type=float, default=1.0, help="Time-to-live of cached configuration in seconds.")
+    args = parser.parse_args(argv)
+
+    broker = Broker(SocketTransport(args.host, args.port), args.socket, cache=StateCache(default_ttl=args.ttl))
+    print("Serving DP832 at {}:{} on {}".format(args.host, args.port, args.socket), flush=True)
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""A write-through cache of instrument configuration.
+
+Configuration values such as setpoints, step increments and protection levels
+only change when they are written, so reading them from the instrument again
+and again is usually redundant. A StateCache attached to a DP832 serves such
+reads locally. Writes made through the object model update the cache, and
+volatile values - measurements, channel modes, output states and protection
+trips - are never cached.
+"""
+import time
+
+
+SETPOINT_LEVEL = 'setpoint.level'
+STEP_INCREMENT = 'step.increment'
+STEP_DEFAULT = 'step.default'
+PROTECTION_LEVEL = 'protection.level'
+PROTECTION_IS_ENABLED = 'protection.is_enabled'
+
+CATEGORIES = (SETPOINT_LEVEL, STEP_INCREMENT, STEP_DEFAULT, PROTECTION_LEVEL, PROTECTION_IS_ENABLED)
+
+
+class StateCache:
+    """A cache of query responses with per-category time-to-live.
+
+    Entries are keyed by the query command which produced them and belong to one
+    of the categories in CATEGORIES, named after the property they back.
+
+    Args:
+        ttls: An optional mapping of category to time-to-live in seconds. A
+            time-to-live of None means entries never expire; zero disables
+            caching for that category.
+        default_ttl: The time-to-live for categories not in ttls.
+    """
+
+    def __init__(self, ttls=None, default_ttl=None):
+        ttls = dict(ttls or {})
+        unknown = set(ttls) - set(CATEGORIES)
+        if unknown:
+            raise ValueError("Unknown cache categories {} not in {}".format(
+                ', '.join(sorted(unknown)), ', '.join(CATEGORIES)))
+        self._ttls = {category: ttls.get(category, default_ttl) for category in CATEGORIES}
+        self._entries = {}
+        self._suspended = set()
+        self._generation = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, query):
+        return query in self._entries
+
+    def ttl(self, category):
+        return self._ttls[category]
+
+    @property
+    def generation(self):
+        """A counter which advances whenever an entry is stored or discarded other than by store_read()."""
+        return self._generation
+
+    @property
+    def queries(self):
+        """The queries with entries in the cache, whether or not they have expired."""
+        return list(self._entries.keys())
+
+    def lookup(self, query):
+        """Look up the cached response to a query.
+
+        Returns:
+            The response, or None if there is no unexpired entry.
+        """
+        if query in self._suspended:
+            return None
+        try:
+            category, response, expiry = self._entries[query]
+        except KeyError:
+            return None
+        if expiry is not None and time.monotonic() >= expiry:
+            del self._entries[query]
+            return None
+        return response
+
+    def store(self, category, query, response):
+        """Record the response to a query."""
+        self._generation += 1
+        self._store(category, query, response)
+
+    def store_read(self, category, query, response, generation):
+        """Record the response to a query read from the instrument, unless the cache has changed since.
+
+        Args:
+            generation: The generation of the cache when the query was sent. If
+                anything has been stored or invalidated since, the response may
+                be older than a value written in the meantime, and is not stored.
+        """
+        if generation == self._generation:
+            self._store(category, query, response)
+
+    def _store(self, category, query, response):
+        ttl = self._ttls[category]
+        if ttl == 0 or query in self._suspended:
+            return
+        expiry = None if ttl is None else time.monotonic() + ttl
+        self._entries[query] = (category, response, expiry)
+
+    def invalidate(self, *queries):
+        """Discard the entries for the given queries, or every entry if none are given."""
+        self._generation += 1
+        if not queries:
+            self._entries.clear()
+            return
+        for query in queries:
+            self._entries.pop(query, None)
+
+    def suspend(self, *queries):
+        """Stop caching the given queries, discarding their entries, until they are resumed.
+
+        Used while the instrument changes the values they read by itself, as
+        its timer does.
+        """
+        self._generation += 1
+        self._suspended.update(queries)
+        for query in queries:
+            self._entries.pop(query, None)
+
+    def resume(self, *queries):
+        """Resume caching queries which were suspended."""
+        self._suspended.difference_update(queries)
+
+    def category(self, query):
+        """The category of a cached query."""
+        return self._entries[query][0]
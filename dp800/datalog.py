@@ -0,0 +1,267 @@
+"""An append-only, memory-mapped binary log of channel measurements.
+
+Long soak tests produce far more samples than are comfortable to hold as
+Python objects or CSV. A MeasurementLog appends fixed-width records to a file
+which is extended a chunk at a time and written through memory maps:
+
+    with MeasurementLog.create('soak.dp8log') as log:
+        while soaking:
+            log.append_scan(0, scan_instrument(dp832), time.time())
+
+    log = MeasurementLog.open('soak.dp8log')
+    records = log.between(start, stop)
+    print(records['voltage'].mean())
+
+The file consists of a fixed header, an index holding the timestamp of the
+first record of each chunk, and the records themselves. Records must be
+appended in non-decreasing timestamp order, so a time range is located by a
+binary search of the index followed by a binary search within the chunks it
+selects, touching only the pages needed. Reopened logs are read-only NumPy
+views of the file, so nothing is copied until it is used.
+
+This module depends on NumPy.
+"""
+import os
+
+import numpy as np
+
+
+MAGIC = b'DP800LOG'
+
+VERSION = 1
+
+# Flags recorded with each measurement.
+OUTPUT_ON = 0x01
+OVER_VOLTAGE_TRIPPED = 0x02
+OVER_CURRENT_TRIPPED = 0x04
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('voltage', '<f8'),
+    ('current', '<f8'),
+    ('power', '<f8'),
+    ('instrument', '<u2'),
+    ('channel', 'u1'),
+    ('mode', 'u1'),
+    ('flags', 'u1'),
+    ('reserved', 'V3'),
+])
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('record_size', '<u4'),
+    ('chunk_records', '<u8'),
+    ('max_chunks', '<u8'),
+    ('num_records', '<u8'),
+    ('reserved', 'V24'),
+])
+
+DEFAULT_CHUNK_RECORDS = 65536
+DEFAULT_MAX_CHUNKS = 65536
+
+
+class MeasurementLog:
+    """A measurement log file. Use create() or open() rather than constructing one directly."""
+
+    def __init__(self, path, writable):
+        self._path = os.fspath(path)
+        self._writable = writable
+        mode = 'r+' if writable else 'r'
+        self._header = np.memmap(self._path, dtype=HEADER_DTYPE, mode=mode, shape=())
+        header = self._header
+        if bytes(header['magic']) != MAGIC:
+            raise ValueError("{!r} is not a measurement log".format(self._path))
+        if int(header['version']) != VERSION or int(header['record_size']) != RECORD_DTYPE.itemsize:
+            raise ValueError("Unsupported measurement log version {} in {!r}".format(
+                int(header['version']), self._path))
+        self._chunk_records = int(header['chunk_records'])
+        self._max_chunks = int(header['max_chunks'])
+        self._index = np.memmap(self._path, dtype='<f8', mode=mode,
+                                offset=HEADER_DTYPE.itemsize, shape=(self._max_chunks,))
+        self._data_offset = HEADER_DTYPE.itemsize + self._index.nbytes
+        self._num_records = int(header['num_records'])
+        self._chunk = None
+        self._chunk_number = None
+        self._records = None
+
+    @classmethod
+    def create(cls, path, chunk_records=DEFAULT_CHUNK_RECORDS, max_chunks=DEFAULT_MAX_CHUNKS):
+        """Create a new, empty log for appending, replacing any existing file.
+
+        Args:
+            path: The path of the file.
+            chunk_records: The number of records by which the file is extended at a time.
+            max_chunks: The capacity of the chunk index, which bounds the size of
+                the log at chunk_records * max_chunks records.
+        """
+        if chunk_records < 1 or max_chunks < 1:
+            raise ValueError("Chunk records {} and maximum chunks {} must be positive".format(
+                chunk_records, max_chunks))
+        header = np.zeros((), dtype=HEADER_DTYPE)
+        header['magic'] = MAGIC
+        header['version'] = VERSION
+        header['record_size'] = RECORD_DTYPE.itemsize
+        header['chunk_records'] = chunk_records
+        header['max_chunks'] = max_chunks
+        with open(path, 'wb') as f:
+            f.write(header.tobytes())
+            f.write(np.full(max_chunks, np.nan, dtype='<f8').tobytes())
+        return cls(path, writable=True)
+
+    @classmethod
+    def open(cls, path, writable=False):
+        """Open an existing log, by default read-only."""
+        return cls(path, writable=writable)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return self._num_records
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def chunk_records(self):
+        return self._chunk_records
+
+    @property
+    def num_chunks(self):
+        return -(-self._num_records // self._chunk_records)
+
+    @property
+    def closed(self):
+        return self._header is None
+
+    @property
+    def records(self):
+        """All the records, as a structured array of RECORD_DTYPE mapped from the file."""
+        self._check_open()
+        if self._records is None or len(self._records) != self._num_records:
+            if self._num_records == 0:
+                return np.zeros(0, dtype=RECORD_DTYPE)
+            self._records = np.memmap(self._path, dtype=RECORD_DTYPE, mode='r',
+                                      offset=self._data_offset, shape=(self._num_records,))
+        return self._records
+
+    def between(self, start, stop):
+        """The records with timestamps in the half-open range [start, stop).
+
+        Returns:
+            A view of the records, without copying.
+        """
+        records = self.records
+        num_chunks = self.num_chunks
+        if num_chunks == 0 or stop <= start:
+            return records[0:0]
+        index = self._index[:num_chunks]
+        first_chunk = max(0, int(np.searchsorted(index, start, side='left')) - 1)
+        last_chunk = int(np.searchsorted(index, stop, side='left'))
+        low = first_chunk * self._chunk_records
+        high = min(last_chunk * self._chunk_records, self._num_records)
+        timestamps = records['timestamp'][low:high]
+        begin = low + int(np.searchsorted(timestamps, start, side='left'))
+        end = low + int(np.searchsorted(timestamps, stop, side='left'))
+        return records[begin:end]
+
+    def append(self, timestamp, instrument, channel, voltage, current, power, mode=0, flags=0):
+        """Append a single record."""
+        record = np.zeros(1, dtype=RECORD_DTYPE)
+        record[0] = (timestamp, voltage, current, power, instrument, channel, mode, flags, b'')
+        self.append_many(record)
+
+    def append_scan(self, instrument, channels, timestamp):
+        """Append a record for each channel of a scan.
+
+        Args:
+            instrument: The number identifying the instrument.
+            channels: A mapping of channel id to dp800.fleet.ChannelScan, as
+                returned by dp800.fleet.scan_instrument().
+            timestamp: The time of the scan.
+        """
+        records = np.zeros(len(channels), dtype=RECORD_DTYPE)
+        for row, scan in enumerate(channels.values()):
+            flags = ((OUTPUT_ON if scan.is_on else 0)
+                     | (OVER_VOLTAGE_TRIPPED if scan.over_voltage_tripped else 0)
+                     | (OVER_CURRENT_TRIPPED if scan.over_current_tripped else 0))
+            records[row] = (timestamp, scan.voltage, scan.current, scan.power, instrument,
+                            scan.channel_id, scan.mode.value, flags, b'')
+        self.append_many(records)
+
+    def append_many(self, records):
+        """Append a structured array of RECORD_DTYPE, in timestamp order."""
+        self._check_open()
+        if not self._writable:
+            raise ValueError("Measurement log {!r} is open read-only".format(self._path))
+        records = np.asarray(records, dtype=RECORD_DTYPE)
+        if len(records) == 0:
+            return
+        timestamps = records['timestamp']
+        last = self._last_timestamp()
+        if np.any(np.diff(timestamps) < 0) or (last is not None and timestamps[0] < last):
+            raise ValueError("Records must be appended in non-decreasing timestamp order")
+        position = 0
+        while position < len(records):
+            chunk_number, offset = divmod(self._num_records, self._chunk_records)
+            chunk = self._writable_chunk(chunk_number)
+            count = min(len(records) - position, self._chunk_records - offset)
+            chunk[offset:offset + count] = records[position:position + count]
+            if offset == 0:
+                self._index[chunk_number] = records['timestamp'][position]
+            position += count
+            self._num_records += count
+        self._header['num_records'] = self._num_records
+
+    def _last_timestamp(self):
+        if self._num_records == 0:
+            return None
+        chunk_number, offset = divmod(self._num_records - 1, self._chunk_records)
+        return float(self._writable_chunk(chunk_number)['timestamp'][offset])
+
+    def _writable_chunk(self, chunk_number):
+        if chunk_number != self._chunk_number:
+            if chunk_number >= self._max_chunks:
+                raise ValueError("Measurement log {!r} is full".format(self._path))
+            chunk_bytes = self._chunk_records * RECORD_DTYPE.itemsize
+            start = self._data_offset + chunk_number * chunk_bytes
+            if os.path.getsize(self._path) < start + chunk_bytes:
+                with open(self._path, 'r+b') as f:
+                    f.truncate(start + chunk_bytes)
+            if self._chunk is not None:
+                self._chunk.flush()
+            self._chunk = np.memmap(self._path, dtype=RECORD_DTYPE, mode='r+',
+                                    offset=start, shape=(self._chunk_records,))
+            self._chunk_number = chunk_number
+        return self._chunk
+
+    def _check_open(self):
+        if self.closed:
+            raise ValueError("Measurement log {!r} is closed".format(self._path))
+
+    def flush(self):
+        """Write changes through to the file."""
+        if self._writable and not self.closed:
+            if self._chunk is not None:
+                self._chunk.flush()
+            self._index.flush()
+            self._header.flush()
+
+    def close(self):
+        """Flush changes and release every mapping of the file.
+
+        Arrays previously returned by records or between() keep their own
+        mappings, which are released when they are discarded.
+        """
+        self.flush()
+        self._header = None
+        self._index = None
+        self._chunk = None
+        self._chunk_number = None
+        self._records = None
+
@@ -1,20 +1,49 @@
 from abc import abstractmethod
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
 from enum import Enum
 
+from dp800.batch import WriteBatch
+from dp800.cache import (
+    SETPOINT_LEVEL, STEP_INCREMENT, STEP_DEFAULT, PROTECTION_LEVEL, PROTECTION_IS_ENABLED)
+
+
+DP832_CHANNEL_LIMITS = OrderedDict([
+    (1, dict(over_voltage_min=0.001, over_voltage_max=33.000, over_current_min=0.001, over_current_max=3.300, step_min=0.001, step_max=1.000)), # Check step_max!
+    (2, dict(over_voltage_min=0.001, over_voltage_max=33.000, over_current_min=0.001, over_current_max=3.300, step_min=0.001, step_max=1.000)),
+    (3, dict(over_voltage_min=0.001, over_voltage_max=5.500,  over_current_min=0.001, over_current_max=3.300, step_min=0.001, step_max=1.000))])
+
 
 class DP832:
 
-    def __init__(self, instrument):
+    def __init__(self, instrument, cache=None, instrumentation=None, error_checker=None, pacer=None):
+        """
+        Args:
+            instrument: A VISA instrument resource, or any object with compatible
+                write(message) and query(message) methods.
+            cache: An optional dp800.cache.StateCache to serve configuration reads.
+            instrumentation: An optional dp800.instrumentation.Instrumentation to
+                collect per-command statistics.
+            error_checker: An optional dp800.errors.ErrorChecker to read the
+                instrument's error queue.
+            pacer: An optional dp800.pacing.AdaptivePacer to limit the rate at
+                which messages are sent.
+        """
         identification = instrument.query('*IDN?')
         if 'DP832' not in identification:
             raise ValueError("Instrument identified by {!r} is not a Rigol DP832".format(identification))
         self._inst = instrument
-
-        self._channels = OrderedDict([
-            (1, Channel(self, 1, over_voltage_min=0.001, over_voltage_max=33.000, over_current_min=0.001, over_current_max=3.300, step_min=0.001, step_max=1.000)), # Check step_max!
-            (2, Channel(self, 2, over_voltage_min=0.001, over_voltage_max=33.000, over_current_min=0.001, over_current_max=3.300, step_min=0.001, step_max=1.000)),
-            (3, Channel(self, 3, over_voltage_min=0.001, over_voltage_max=5.500,  over_current_min=0.001, over_current_max=3.300, step_min=0.001, step_max=1.000))])
+        self._cache = cache
+        self._batch = None
+        self._instrumentation = instrumentation
+        self._error_checker = error_checker
+        self._pacer = pacer
+        self._update_direct()
+
+        self._channels = OrderedDict(
+            (channel_id, Channel(self, channel_id, **limits))
+            for channel_id, limits in DP832_CHANNEL_LIMITS.items())
+        self._channel_array = None
 
     @property
     def channel_ids(self):
@@ -28,11 +57,347 @@ class DP832:
             raise ValueError("Invalid channel id {} not in range {}-{}".format(
                 channel_id, channel_ids[0], channel_ids[-1]))
 
+    @property
+    def channels(self):
+        """A vectorized view of all the channels, whose levels and measurements are NumPy arrays.
+
+        Requires NumPy. See dp800.vector.ChannelArray for details.
+        """
+        if self._channel_array is None:
+            from dp800.vector import ChannelArray
+            self._channel_array = ChannelArray(self)
+        return self._channel_array
+
+    @property
+    def instrumentation(self):
+        """The Instrumentation collecting per-command statistics, or None if disabled."""
+        return self._instrumentation
+
+    @instrumentation.setter
+    def instrumentation(self, instrumentation):
+        self._instrumentation = instrumentation
+        self._update_direct()
+
+    @property
+    def error_checker(self):
+        """The ErrorChecker reading the instrument's error queue, or None if errors are not checked."""
+        return self._error_checker
+
+    @error_checker.setter
+    def error_checker(self, error_checker):
+        self._error_checker = error_checker
+        self._update_direct()
+
+    @property
+    def pacer(self):
+        """The AdaptivePacer limiting the rate at which messages are sent, or None."""
+        return self._pacer
+
+    @pacer.setter
+    def pacer(self, pacer):
+        self._pacer = pacer
+        self._update_direct()
+
+    def synchronize(self):
+        """Wait until the instrument has completed every command sent so far.
+
+        Any batched writes are flushed, then *OPC? is queried; the instrument
+        responds only once all pending operations are complete, so this waits
+        exactly as long as the instrument needs rather than for a fixed delay.
+        """
+        self.query('*OPC?')
+
+    @contextmanager
+    def synchronized(self):
+        """Batch the writes within a with-block, and on exit wait until the instrument has completed them.
+
+        The writes are sent together as for batch(), followed by a single *OPC? query.
+        """
+        with self.batch():
+            yield
+        self.synchronize()
+
+    def wait_to_continue(self):
+        """Send *WAI, so the instrument completes pending operations before executing subsequent commands.
+
+        Unlike synchronize() this does not block the caller.
+        """
+        self.write('*WAI')
+
+    def check_errors(self):
+        """Read the instrument's error queue now, raising the first error found.
+
+        Requires an error_checker. Errors are attributed to the messages sent
+        since the queue was last read.
+        """
+        if self._error_checker is None:
+            raise RuntimeError("No error checker is attached")
+        self._flush_batch()
+        self._error_checker.check(self)
+
+    def stats(self):
+        """A snapshot of per-command statistics keyed by command template.
+
+        Returns:
+            A dict as returned by Instrumentation.stats(), empty if instrumentation is disabled.
+        """
+        if self._instrumentation is None:
+            return {}
+        return self._instrumentation.stats()
+
+    @property
+    def cache(self):
+        """The StateCache serving configuration reads, or None if caching is disabled."""
+        return self._cache
+
+    def invalidate(self, *queries):
+        """Discard cached responses to the given queries, or all cached responses if none are given."""
+        if self._cache is not None:
+            self._cache.invalidate(*queries)
+
+    def refresh(self):
+        """Re-read every cached configuration value from the instrument in a single round trip."""
+        cache = self._cache
+        if cache is None or len(cache) == 0:
+            return
+        queries = cache.queries
+        categories = [cache.category(query) for query in queries]
+        generation = cache.generation
+        responses = self.query_many(queries)
+        for category, query, response in zip(categories, queries, responses):
+            cache.store_read(category, query, response, generation)
+
+    def snapshot(self):
+        """Capture the configuration of every channel in a single round trip.
+
+        Returns:
+            An immutable dp800.snapshot.Snapshot.
+        """
+        from dp800.snapshot import snapshot
+        return snapshot(self)
+
+    def restore(self, snapshot):
+        """Restore a configuration captured by snapshot(), writing only the parameters which differ.
+
+        The changes are sent together, outputs being switched off first. See
+        dp800.snapshot.restore for details.
+
+        Returns:
+            The number of parameters written.
+        """
+        from dp800.snapshot import restore
+        return restore(self, snapshot)
+
+    def stream(self, channels=None, rate=10.0, block_size=None, num_blocks=4):
+        """Acquire measurements at a fixed rate, yielding blocks of timestamped samples.
+
+        Requires NumPy. See dp800.acquisition.stream for details.
+        """
+        from dp800.acquisition import stream
+        return stream(self, channels=channels, rate=rate, block_size=block_size, num_blocks=num_blocks)
+
+    def status_monitor(self, poll_interval=0.1, use_srq=True):
+        """Create a monitor which reports changes of channel condition through the status system.
+
+        See dp800.status.StatusMonitor for details.
+        """
+        from dp800.status import StatusMonitor
+        return StatusMonitor(self, poll_interval=poll_interval, use_srq=use_srq)
+
+    @contextmanager
+    def batch(self):
+        """Buffer writes within a with-block and send them together on exit.
+
+        Writes issued through the object model or write() are held back, and a
+        write which sets the same parameter as an earlier one in the batch
+        supersedes it. On leaving the block the remaining writes are sent as one
+        or a few ';'-joined program messages. Queries issued within the block
+        first flush the writes buffered so far. If the block raises an exception
+        the buffered writes are discarded, along with any cached state.
+
+        Batches may be nested, in which case the outermost batch is flushed.
+        """
+        if self._batch is not None:
+            yield self._batch
+            return
+        self._batch = WriteBatch()
+        try:
+            yield self._batch
+            self._flush_batch()
+        except BaseException:
+            self.invalidate()
+            raise
+        finally:
+            self._batch = None
+
+    def _flush_batch(self):
+        batch = self._batch
+        if batch is None or len(batch) == 0:
+            return
+        if self._error_checker is not None:
+            commands = batch.commands
+            batch.clear()
+            self._error_checker.flush(self, commands)
+            return
+        messages = batch.messages()
+        batch.clear()
+        for commands in messages:
+            self._send(join_commands(commands))
+
+    def _send(self, message):
+        if self._direct:
+            return self._inst.write(message)
+        if self._error_checker is not None:
+            return self._error_checker.send(self, message)
+        return self._write_message(message)
+
+    def _transact(self, message):
+        if self._direct:
+            return self._inst.query(message)
+        if self._error_checker is not None:
+            return self._error_checker.transact(self, message)
+        return self._query_message(message)
+
+    def _update_direct(self):
+        """Determine whether messages may be sent straight to the instrument, bypassing all hooks."""
+        self._direct = self._instrumentation is None and self._error_checker is None and self._pacer is None
+
+    # The paths beneath error checking, also used by the error checker for the messages it sends.
+
+    def _write_message(self, message):
+        pacer = self._pacer
+        if pacer is None:
+            return self._write_instrumented(message)
+        pacer.before_write()
+        result = self._write_instrumented(message)
+        pacer.after_write(self)
+        return result
+
+    def _query_message(self, message):
+        pacer = self._pacer
+        if pacer is None:
+            return self._query_instrumented(message)
+        pacer.before_query()
+        result = self._query_instrumented(message)
+        pacer.after_query()
+        return result
+
+    def _write_instrumented(self, message):
+        if self._instrumentation is None:
+            return self._inst.write(message)
+        return self._instrumentation.call('write', self._inst.write, message)
+
+    def _query_instrumented(self, message):
+        if self._instrumentation is None:
+            return self._inst.query(message)
+        return self._instrumentation.call('query', self._inst.query, message)
+
     def write(self, command, *args, **kwargs):
-        return self._inst.write(command.format(*args, **kwargs))
+        if args or kwargs:
+            command = command.format(*args, **kwargs)
+        if self._batch is not None:
+            self._batch.add(command)
+            return None
+        return self._send(command)
 
     def query(self, command, *args, **kwargs):
-        return self._inst.query(command.format(*args, **kwargs))
+        if args or kwargs:
+            command = command.format(*args, **kwargs)
+        if self._batch is not None:
+            self._flush_batch()
+        return self._transact(command)
+
+    def _query_cached(self, category, command):
+        cache = self._cache
+        if cache is None:
+            return self.query(command)
+        response = cache.lookup(command)
+        if response is None:
+            generation = cache.generation
+            response = self.query(command)
+            cache.store_read(category, command, response, generation)
+        return response
+
+    def _write_through(self, command, category, query, response):
+        self.write(command)
+        if self._cache is not None:
+            self._cache.store(category, query, response)
+
+    def write_many(self, commands):
+        """Send several commands to the instrument in a single message.
+
+        Args:
+            commands: An iterable of fully formatted command strings.
+        """
+        if self._batch is not None:
+            for command in commands:
+                self._batch.add(command)
+            return
+        message = join_commands(commands)
+        if message:
+            self._send(message)
+
+    def query_many(self, commands):
+        """Send several commands in a single message and collect the responses.
+
+        The commands are joined with SCPI ';' separators so the whole group costs
+        one round trip to the instrument. Commands which are not queries may be
+        included - they produce no response.
+
+        Args:
+            commands: An iterable of fully formatted command strings.
+
+        Returns:
+            A list of response strings, one for each query in commands, in order.
+        """
+        commands = list(commands)
+        num_queries = sum(1 for command in commands if is_query(command))
+        if num_queries == 0:
+            self.write_many(commands)
+            return []
+        if self._batch is not None:
+            self._flush_batch()
+        response = self._transact(join_commands(commands))
+        responses = split_responses(response)
+        if len(responses) != num_queries:
+            raise RuntimeError("Expected {} responses but received {} in {!r}".format(
+                num_queries, len(responses), response))
+        return responses
+
+
+def is_query(command):
+    """Determine whether a command is a query, that is, whether its header ends with '?'."""
+    header, _, _ = command.partition(' ')
+    return header.endswith('?')
+
+
+def join_commands(commands):
+    """Join commands into a single program message.
+
+    Each command is rooted with a leading colon (unless it is a common '*' command)
+    so that it is not interpreted relative to the path of its predecessor.
+    """
+    return ';'.join(command if command.startswith((':', '*')) else ':' + command
+                    for command in commands)
+
+
+def split_responses(response):
+    """Split the response to a compound program message into its parts.
+
+    Separators within double-quoted strings, as found in error messages, are preserved.
+    """
+    responses = []
+    start = 0
+    quoted = False
+    stripped_response = response.strip()
+    for index, character in enumerate(stripped_response):
+        if character == '"':
+            quoted = not quoted
+        elif character == ';' and not quoted:
+            responses.append(stripped_response[start:index])
+            start = index + 1
+    responses.append(stripped_response[start:])
+    return responses
 
 
 class ChannelMode(Enum):
@@ -76,14 +441,73 @@ def to_boolean(value):
         raise ValueError("Invalid boolean value {!r}".format(value)) from e
 
 
+Measurement = namedtuple('Measurement', ['voltage', 'current', 'power'])
+
+Applied = namedtuple('Applied', ['voltage', 'current'])
+
+
+def parse_measurement(response):
+    """Parse the response to a :MEASURE:ALL? query into a Measurement."""
+    try:
+        voltage, current, power = map(float, response.strip().split(','))
+    except ValueError as e:
+        raise RuntimeError("Unexpected response to measure all query: {!r}".format(response)) from e
+    return Measurement(voltage, current, power)
+
+
+def parse_applied(response):
+    """Parse the response to an :APPLY? query, such as 'CH1:30V/3A,5.000,1.000', into an Applied."""
+    try:
+        _, voltage, current = response.strip().split(',')
+        return Applied(float(voltage), float(current))
+    except ValueError as e:
+        raise RuntimeError("Unexpected response to apply query: {!r}".format(response)) from e
+
+
+def check_range(quantity, value, min, max):
+    if not (min <= value <= max):
+        raise ValueError("{name} {value} {unit} outside range {min} {unit} to {max} {unit}".format(
+            name=quantity._name.title(), value=value, unit=quantity._unit, min=min, max=max))
+
+
+def parse_float(quantity, response):
+    try:
+        return float(response)
+    except ValueError as e:
+        raise RuntimeError("Unexpected response to {} query on channel {} : {!r}".format(
+            quantity._name.lower(), quantity._channel.id, response)) from e
+
+
+def parse_boolean(response):
+    try:
+        return from_boolean_response(response)
+    except ValueError as e:
+        raise RuntimeError("Unexpected response: {!r}".format(response)) from e
+
+
+# The object model below sits on the hot path of tight control loops, so each
+# object uses __slots__ and precomputes the SCPI commands for its channel and
+# quantity at construction. Setting a value then costs one float format and a
+# string concatenation.
+
+
 class Channel:
 
+    __slots__ = ('_device', '_id', '_voltage', '_current', '_power', '_sequence',
+                 '_state_query', '_state_commands', '_mode_query', '_measure_all_query', '_apply_query')
+
     def __init__(self, device, channel_id, over_voltage_min, over_voltage_max, over_current_min, over_current_max, step_min, step_max):
         self._device = device
         self._id = channel_id
+        self._state_query = ':OUTPUT:STATE? CH{}'.format(channel_id)
+        self._state_commands = tuple(':OUTPUT:STATE CH{},{}'.format(channel_id, state) for state in BOOLEAN_RESPONSES)
+        self._mode_query = ':OUTPUT:MODE? CH{}'.format(channel_id)
+        self._measure_all_query = ':MEASURE:ALL? CH{}'.format(channel_id)
+        self._apply_query = ':APPLY? CH{}'.format(channel_id)
         self._voltage = Quantity(self, 'voltage', 'V', over_voltage_min, over_voltage_max, step_min, step_max)
         self._current = Quantity(self, 'current', 'A', over_current_min, over_current_max, step_min, step_max)
         self._power = MeasurableQuantity(self, 'power', 'W')
+        self._sequence = None
 
     @property
     def device(self):
@@ -101,16 +525,15 @@ class Channel:
 
     @property
     def is_on(self):
-        response = self._query(':OUTPUT:STATE? CH{}', self._id)
-        try:
-            return from_boolean_response(response)
-        except ValueError as e:
-            raise RuntimeError("Unexpected response: {!r}") from e
+        return parse_boolean(self._device.query(self._state_query))
 
     @is_on.setter
     def is_on(self, value):
-        state = to_boolean(value)
-        self._write(':OUTPUT:STATE CH{},{}', self._id, state)
+        try:
+            command = self._state_commands[value]
+        except (IndexError, TypeError) as e:
+            raise ValueError("Invalid boolean value {!r}".format(value)) from e
+        self._device.write(command)
 
     def on(self):
         self.is_on = True
@@ -118,6 +541,26 @@ class Channel:
     def off(self):
         self.is_on = False
 
+    def measure_all(self) -> Measurement:
+        """Measure voltage, current and power together in a single query."""
+        return parse_measurement(self._device.query(self._measure_all_query))
+
+    def applied(self) -> Applied:
+        """Retrieve both the voltage and current setpoints in a single query."""
+        return parse_applied(self._device.query(self._apply_query))
+
+    def iv_sweep(self, levels, settle=0.0, samples_per_point=1):
+        """Step the voltage setpoint through levels, measuring after each has settled.
+
+        Each measurement is sent in the same message as the next setpoint. Requires
+        NumPy. See dp800.sweep.iv_sweep for details.
+
+        Returns:
+            A dp800.sweep.IVSweep of NumPy arrays.
+        """
+        from dp800.sweep import iv_sweep
+        return iv_sweep(self, levels, settle=settle, samples_per_point=samples_per_point)
+
     @property
     def voltage(self) -> 'Quantity':
         return self._voltage
@@ -130,9 +573,17 @@ class Channel:
     def power(self) -> 'MeasurableQuantity':
         return self._power
 
+    @property
+    def sequence(self):
+        """The hardware-timed output sequence of this channel. See dp800.sequence."""
+        if self._sequence is None:
+            from dp800.sequence import Sequence
+            self._sequence = Sequence(self)
+        return self._sequence
+
     @property
     def mode(self):
-        response = self._query('OUTPUT:MODE? CH{}', self._id)
+        response = self._device.query(self._mode_query)
         try:
             return ChannelMode.from_response(response)
         except ValueError as e:
@@ -141,11 +592,15 @@ class Channel:
 
 class NamedQuantity:
 
+    __slots__ = ('_channel', '_device', '_name', '_unit', '_header')
+
     def __init__(self, channel, name, unit, **kwargs):
         assert len(kwargs) == 0
         self._channel = channel
+        self._device = channel.device
         self._name = name
         self._unit = unit
+        self._header = ':SOURCE{}:{}'.format(channel.id, name.upper())
 
     @property
     def channel(self) -> Channel:
@@ -158,22 +613,25 @@ class NamedQuantity:
 
 class MeasurableQuantity(NamedQuantity):
 
+    __slots__ = ('_measurement_query',)
+
     def __init__(self, channel, name, unit, **kwargs):
         super().__init__(channel=channel, name=name, unit=unit, **kwargs)
+        self._measurement_query = ':MEASURE:{}? CH{}'.format(name.upper(), channel.id)
 
     @property
     def measurement(self):
-        response = self.channel._query(':MEASURE:{quantity}? CH{channel}',
-                                            channel=self.channel.id,
-                                            quantity=self._name.upper())
-        try:
-            return float(response)
-        except ValueError as e:
-            raise RuntimeError("Unexpected response to {} query on channel {} : {!r}".format(self._name.lower(), self.channel.id, response)) from e
+        return parse_float(self, self._device.query(self._measurement_query))
+
+
+# Only one base of Quantity may introduce slots, so the slots of the mixins below
+# are declared on Quantity itself.
 
 
 class ProtectableQuantity(NamedQuantity):
 
+    __slots__ = ()
+
     def __init__(self, channel, name, unit, over_quantity_min, over_quantity_max, **kwargs):
         super().__init__(channel=channel, name=name, unit=unit, **kwargs)
         self._protection = Protection(self, over_quantity_min, over_quantity_max)
@@ -182,9 +640,16 @@ class ProtectableQuantity(NamedQuantity):
     def protection(self) -> 'Protection':
         return self._protection
 
+    def check_range(self, value):
+        """Raise ValueError if value lies outside the protection range of this quantity."""
+        protection = self._protection
+        check_range(self, value, protection._min, protection._max)
+
 
 class AdjustableQuantity(NamedQuantity):
 
+    __slots__ = ()
+
     def __init__(self, channel, name, unit, step_min, step_max, **kwargs):
         super().__init__(channel=channel, name=name, unit=unit, **kwargs)
         self._setpoint = SetPoint(self, step_min, step_max)
@@ -196,6 +661,8 @@ class AdjustableQuantity(NamedQuantity):
 
 class Quantity(MeasurableQuantity, AdjustableQuantity, ProtectableQuantity):
 
+    __slots__ = ('_setpoint', '_protection')
+
     def __init__(self, channel, name, unit, over_quantity_min, over_quantity_max, step_min, step_max):
         super().__init__(
             channel=channel,
@@ -209,8 +676,13 @@ class Quantity(MeasurableQuantity, AdjustableQuantity, ProtectableQuantity):
 
 class SetPoint:
 
+    __slots__ = ('_quantity', '_device', '_step', '_level_query', '_level_command')
+
     def __init__(self, quantity, step_min, step_max):
         self._quantity = quantity
+        self._device = quantity._device
+        self._level_query = quantity._header + ':IMMEDIATE?'
+        self._level_command = quantity._header + ':IMMEDIATE '
         self._step = Step(self, step_min, step_max)
 
     @property
@@ -219,25 +691,37 @@ class SetPoint:
 
     @property
     def level(self):
-        quantity = self._quantity
-        response = quantity._channel._query(':SOURCE{channel}:{quantity}:IMMEDIATE?',
-                                            channel=quantity._channel.id,
-                                            quantity=quantity._name.upper())
-        try:
-            return float(response)
-        except ValueError as e:
-            raise RuntimeError("Unexpected response to {} query on channel {} : {!r}".format(quantity._name.lower(), quantity.channel.id, response)) from e
+        return parse_float(self._quantity, self._device._query_cached(SETPOINT_LEVEL, self._level_query))
 
     @level.setter
     def level(self, value):
-        quantity = self._quantity
-        if not (quantity.protection.min <= value <= quantity.protection.max):
-            raise ValueError("{name} {value} {unit} outside range {min} {unit} to {max} {unit}".format(
-                name=quantity._name.title(), value=value, unit=quantity._unit, min=quantity.protection.min, max=quantity.protection.max))
-        quantity._channel._write(':SOURCE{channel}:{quantity}:IMMEDIATE {value:.3f}',  # TODO: Variable precision depending on whether hi-res installed
-                                 channel=quantity._channel.id,
-                                 quantity=quantity._name.upper(),
-                                 value=value)
+        protection = self._quantity._protection
+        check_range(self._quantity, value, protection._min, protection._max)
+        text = format(value, '.3f')  # TODO: Variable precision depending on whether hi-res installed
+        self._device._write_through(self._level_command + text, SETPOINT_LEVEL, self._level_query, text)
+
+    def ramp(self, start, stop, rate=None, duration=None, interval=0.1):
+        """Ramp the level linearly from start to stop in a background thread.
+
+        Exactly one of rate, in units per second, and duration, in seconds, must
+        be given. Requires NumPy. See dp800.ramp for details.
+
+        Returns:
+            A started dp800.ramp.Playback.
+        """
+        from dp800.ramp import play, ramp_schedule
+        return play(self, *ramp_schedule(start, stop, rate=rate, duration=duration, interval=interval))
+
+    def play(self, times, levels):
+        """Write an arbitrary profile of levels at the given times in a background thread.
+
+        Requires NumPy. See dp800.ramp for details.
+
+        Returns:
+            A started dp800.ramp.Playback.
+        """
+        from dp800.ramp import play, profile_schedule
+        return play(self, *profile_schedule(times, levels))
 
     @property
     def step(self):
@@ -246,10 +730,17 @@ class SetPoint:
 
 class Step:
 
+    __slots__ = ('_setpoint', '_device', '_min', '_max', '_increment_query', '_increment_command', '_default_query')
+
     def __init__(self, setpoint, step_min, step_max):
         self._setpoint = setpoint
+        self._device = setpoint._device
         self._min = step_min
         self._max = step_max
+        header = setpoint._quantity._header
+        self._increment_query = header + ':STEP?'
+        self._increment_command = header + ':STEP '
+        self._default_query = header + ':STEP? DEFAULT'
 
     @property
     def setpoint(self) -> SetPoint:
@@ -265,50 +756,42 @@ class Step:
 
     @property
     def increment(self):
-        quantity = self.setpoint.quantity
-        response = quantity.channel._query(':SOURCE{channel}:{quantity}:STEP?',
-                                            channel=quantity.channel.id,
-                                            quantity=quantity._name.upper())
-        try:
-            return float(response)
-        except ValueError as e:
-            raise RuntimeError("Unexpected response to {} query on channel {} : {!r}".format(quantity._name.lower(), quantity.channel.id, response)) from e
+        return parse_float(self._setpoint._quantity, self._device._query_cached(STEP_INCREMENT, self._increment_query))
 
     @increment.setter
     def increment(self, value):
-        quantity = self.setpoint._quantity
-        if not (quantity.protection.min <= value <= quantity.protection.max):
-            raise ValueError("{name} {value} {unit} outside range {min} {unit} to {max} {unit}".format(
-                name=quantity._name.title(), value=value, unit=quantity._unit, min=quantity.protection.min, max=quantity.protection.max))
-        quantity._channel._write(':SOURCE{channel}:{quantity}:STEP {value:.3f}',  # TODO: Variable precision depending on whether hi-res installed
-                                 channel=quantity.channel.id,
-                                 quantity=quantity._name.upper(),
-                                 value=value)
+        quantity = self._setpoint._quantity
+        protection = quantity._protection
+        check_range(quantity, value, protection._min, protection._max)
+        text = format(value, '.3f')  # TODO: Variable precision depending on whether hi-res installed
+        self._device._write_through(self._increment_command + text, STEP_INCREMENT, self._increment_query, text)
 
     @property
     def default(self):
-        quantity = self.setpoint.quantity
-        response = quantity.channel._query(':SOURCE{channel}:{quantity}:STEP? DEFAULT',
-                                            channel=quantity.channel.id,
-                                            quantity=quantity._name.upper())
-        try:
-            return float(response)
-        except ValueError as e:
-            raise RuntimeError("Unexpected response to {} query on channel {} : {!r}".format(quantity._name.lower(), quantity.channel.id, response)) from e
+        return parse_float(self._setpoint._quantity, self._device._query_cached(STEP_DEFAULT, self._default_query))
 
     def reset(self):
-        quantity = self.setpoint.quantity
-        quantity._channel._write(':SOURCE{channel}:{quantity}:STEP DEFAULT',
-                                 channel=quantity.channel.id,
-                                 quantity=quantity._name.upper())
+        self._device.write(self._increment_command + 'DEFAULT')
+        self._device.invalidate(self._increment_query)
 
 
 class Protection:
 
+    __slots__ = ('_quantity', '_device', '_min', '_max', '_tripped_query', '_state_query', '_state_command',
+                 '_clear_command', '_level_query', '_level_command')
+
     def __init__(self, quantity, over_quantity_min, over_quantity_max):
         self._quantity = quantity
+        self._device = quantity._device
         self._min = over_quantity_min
         self._max = over_quantity_max
+        header = quantity._header + ':PROTECTION'
+        self._tripped_query = header + ':TRIPPED?'
+        self._state_query = header + ':STATE?'
+        self._state_command = header + ':STATE '
+        self._clear_command = header + ':CLEAR'
+        self._level_query = header + '?'
+        self._level_command = header + ' '
 
     @property
     def quantity(self) -> Quantity:
@@ -324,32 +807,16 @@ class Protection:
 
     @property
     def has_tripped(self):
-        response = self._quantity._channel._query(':SOURCE{channel}:{quantity}:PROTECTION:TRIPPED?',
-                                                  channel=self._quantity._channel.id,
-                                                  quantity=self._quantity._name.upper())
-        try:
-            return from_boolean_response(response)
-        except ValueError as e:
-            raise RuntimeError("Unexpected response: {!r}") from e
+        return parse_boolean(self._device.query(self._tripped_query))
 
     @property
     def is_enabled(self):
-        response = self._quantity._channel._query(':SOURCE{channel}:{quantity}:PROTECTION:STATE?',
-                                                  channel=self._quantity._channel.id,
-                                                  quantity=self._quantity._name.upper())
-        try:
-            return from_boolean_response(response)
-        except ValueError as e:
-            raise RuntimeError("Unexpected response: {!r}") from e
+        return parse_boolean(self._device._query_cached(PROTECTION_IS_ENABLED, self._state_query))
 
     @is_enabled.setter
     def is_enabled(self, value):
         state = to_boolean(value)
-        quantity = self._quantity
-        quantity._channel._query(':SOURCE{channel}:{quantity}:PROTECTION:STATE {state}',
-                                 channel=quantity._channel.id,
-                                 quantity=quantity._name.upper(),
-                                 state=state)
+        self._device._write_through(self._state_command + state, PROTECTION_IS_ENABLED, self._state_query, state)
 
     def enable(self):
         self.is_enabled = True
@@ -358,33 +825,17 @@ class Protection:
         self.is_enabled = False
 
     def clear(self):
-        quantity = self._quantity
-        quantity._channel._query(':SOURCE{channel}:{quantity}:PROTECTION:CLEAR',
-                                 channel=quantity._channel.id,
-                                 quantity=quantity._name.upper())
+        self._device.write(self._clear_command)
 
     @property
     def level(self):
-        quantity = self._quantity
-        response = quantity._channel._query(':SOURCE{channel}:{quantity}:PROTECTION?',
-                                            channel=quantity._channel.id,
-                                            quantity=quantity._name.upper())
-        try:
-            return float(response)
-        except ValueError as e:
-            raise RuntimeError("Unexpected response to {} query on channel {} : {!r}".format(
-                quantity._name.lower(), quantity._channel.id, response)) from e
+        return parse_float(self._quantity, self._device._query_cached(PROTECTION_LEVEL, self._level_query))
 
     @level.setter
     def level(self, value):
-        quantity = self._quantity
-        if not (quantity.protection.min <= value <= quantity.protection.max):
-            raise ValueError("{name} {value} {unit} outside range {min} {unit} to {max} {unit}".format(
-                name=quantity._name.title(), value=value, unit=quantity._unit, min=quantity.protection.min, max=quantity.protection.max))
-        quantity._channel._write(':SOURCE{channel}:{quantity}:PROTECTION {value:.3f}',  # TODO: Variable precision depending on whether hi-res installed
-                                 channel=quantity._channel.id,
-                                 quantity=quantity._name.upper(),
-                                 value=value)
+        check_range(self._quantity, value, self._min, self._max)
+        text = format(value, '.3f')  # TODO: Variable precision depending on whether hi-res installed
+        self._device._write_through(self._level_command + text, PROTECTION_LEVEL, self._level_query, text)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,305 @@
+"""Checking of the instrument's SCPI error queue.
+
+Commands which the instrument cannot execute are not reported in-band: the
+error is placed on its error queue, to be read with :SYSTEM:ERROR?. Attach an
+ErrorChecker to a DP832 to read the queue according to one of three policies:
+
+    dp832 = DP832(instrument, error_checker=ErrorChecker(CHECK_FLUSH))
+
+CHECK_COMMAND
+    Every message is checked, so an error is raised by the call which caused
+    it. An error query follows each command within the same message, so every
+    error is attributed exactly, but each write costs a round trip.
+
+CHECK_FLUSH
+    The messages sent when a batch is flushed are checked, as above, in the
+    same round trip as the flush. Other writes are not checked immediately;
+    errors they cause are found by a drain of the queue prefixed to the next
+    query or flush, and are attributed to the messages sent since the last
+    check, not to the query or flush which found them. Such an error is still
+    raised by that query, but since the query itself succeeded its response
+    is available as the response attribute of the InstrumentError. A query
+    sent when no unchecked writes are pending is sent as it is, so polling
+    costs nothing extra; an error it causes is found by the next check.
+
+CHECK_PERIODIC
+    Messages are not checked individually. Once interval seconds have passed
+    since the last check the queue is drained, piggybacked on a query where
+    possible, and errors are attributed to the messages sent since the last
+    check.
+
+In every case the queue is drained with several :SYSTEM:ERROR? queries in one
+message, and the cost to messages which are not checked is a list append.
+Errors are raised as InstrumentError, or passed to an on_error callable.
+"""
+import re
+import time
+from collections import deque
+
+from dp800.batch import MAX_MESSAGE_LENGTH, pack_commands
+from dp800.dp800 import join_commands, split_responses
+from dp800.scpi import SCPIError, split_units
+
+
+CHECK_COMMAND = 'command'
+CHECK_FLUSH = 'flush'
+CHECK_PERIODIC = 'periodic'
+
+POLICIES = (CHECK_COMMAND, CHECK_FLUSH, CHECK_PERIODIC)
+
+ERROR_QUERY = ':SYSTEM:ERROR?'
+
+
+class InstrumentError(SCPIError):
+    """An error read from the instrument's error queue.
+
+    command: The command which caused the error, if it could be identified
+        exactly, otherwise None.
+    candidates: The messages sent since the error queue was last read, one of
+        which caused the error.
+    response: The response to the query whose error check found the error, if
+        the error was caused by earlier messages and the query succeeded,
+        otherwise None.
+    """
+
+    def __init__(self, code, description, command=None, candidates=(), response=None):
+        super().__init__(code, description, command)
+        self.candidates = tuple(candidates)
+        self.response = response
+
+
+def parse_error(response):
+    """Parse a response to :SYSTEM:ERROR? into a (code, description) pair."""
+    code, _, description = response.strip().partition(',')
+    try:
+        return int(float(code)), description.strip().strip('"')
+    except ValueError as e:
+        raise RuntimeError("Unexpected response to {}: {!r}".format(ERROR_QUERY, response)) from e
+
+
+_ERROR_REPORT = re.compile(r'^\s*[+-]?\d+,".*"\s*$')
+
+
+def _is_error_report(response):
+    return _ERROR_REPORT.match(response) is not None and parse_error(response)[0] != 0
+
+
+def _num_queries(message):
+    return sum(1 for unit in split_units(message) if unit.strip() and unit.split(None, 1)[0].endswith('?'))
+
+
+class ErrorChecker:
+    """Reads a DP832's error queue according to a policy.
+
+    Args:
+        policy: One of CHECK_COMMAND, CHECK_FLUSH or CHECK_PERIODIC.
+        interval: The interval in seconds between checks for CHECK_PERIODIC.
+        on_error: An optional callable which receives each InstrumentError. If
+            None, the first error found by a check is raised once the message
+            being sent has been completed.
+        drain_size: The number of error queries sent in each message which
+            drains the queue.
+        history: The number of recent errors retained in the errors attribute.
+    """
+
+    def __init__(self, policy=CHECK_FLUSH, interval=1.0, on_error=None, drain_size=4, history=100):
+        if policy not in POLICIES:
+            raise ValueError("Error checking policy {!r} not one of {}".format(policy, ', '.join(POLICIES)))
+        if drain_size < 1:
+            raise ValueError("Drain size {} is less than one".format(drain_size))
+        self._policy = policy
+        self._interval = interval
+        self._on_error = on_error
+        self._drain_size = drain_size
+        self._unchecked = []
+        self._last_check = time.monotonic()
+        self.errors = deque(maxlen=history)
+
+    @property
+    def policy(self):
+        return self._policy
+
+    @property
+    def unchecked(self):
+        """The messages sent since the error queue was last read."""
+        return list(self._unchecked)
+
+    def send(self, device, message):
+        """Send a message which expects no response, checking it according to the policy."""
+        if self._policy == CHECK_COMMAND:
+            self._exchange(device, message, interleave=True)
+            return None
+        result = device._write_message(message)
+        self._unchecked.append(message)
+        if self._policy == CHECK_PERIODIC and self._is_due():
+            self.check(device)
+        return result
+
+    def transact(self, device, message):
+        """Send a message and read its response, checking it according to the policy.
+
+        Under CHECK_FLUSH a query which follows unchecked writes drains the
+        queue, which costs no extra round trip. Otherwise it is sent as it is.
+        """
+        if self._policy == CHECK_COMMAND:
+            return self._exchange(device, message, interleave=True)
+        if self._policy == CHECK_FLUSH:
+            if self._unchecked:
+                return self._exchange(device, message, interleave=False)
+            return device._query_message(message)
+        if self._is_due():
+            return self._exchange(device, message, interleave=False)
+        response = device._query_message(message)
+        self._unchecked.append(message)
+        return response
+
+    def flush(self, device, commands, max_length=MAX_MESSAGE_LENGTH):
+        """Send the commands of a flushed batch, checking them according to the policy.
+
+        The commands are packed into messages which leave room for the error
+        queries added to them.
+        """
+        if self._policy == CHECK_PERIODIC:
+            for group in pack_commands(commands, max_length):
+                self.send(device, join_commands(group))
+            return
+        suffix = ';' + ERROR_QUERY
+        prefix_length = (len(ERROR_QUERY) + 1) * self._drain_size
+        for group in pack_commands([command + suffix for command in commands], max_length - prefix_length):
+            message = join_commands(command[:-len(suffix)] for command in group)
+            self._exchange(device, message, interleave=True)
+
+    def check(self, device):
+        """Drain the error queue now, attributing errors to the messages sent since the last check."""
+        candidates = self._take_unchecked()
+        command = candidates[0] if len(candidates) == 1 else None
+        self._report([InstrumentError(code, description, command, candidates)
+                      for code, description in self._drain(device)])
+
+    def _is_due(self):
+        return time.monotonic() - self._last_check >= self._interval
+
+    def _take_unchecked(self):
+        candidates = self._unchecked
+        self._unchecked = []
+        self._last_check = time.monotonic()
+        return candidates
+
+    def _exchange(self, device, message, interleave):
+        """Send a message together with error queries, in a single round trip.
+
+        Errors caused by messages sent unchecked since the last check are
+        drained at the start of the message, and attributed to them. If
+        interleave is True an error query follows each unit of the message,
+        so that errors are attributed to the unit which caused them. Otherwise
+        the queue is drained after the whole message, and errors are
+        attributed to it. Units with relative headers would be resolved against
+        the path of an interleaved error query, so a message containing them is
+        treated as a single unit.
+
+        Returns:
+            The response to the message, excluding the error queries, or None if
+            it contains no queries.
+        """
+        candidates = self._take_unchecked()
+        units = [unit for unit in split_units(message) if unit and not unit.isspace()]
+        if not interleave or not all(unit.lstrip().startswith((':', '*')) for unit in units):
+            # A leading error query would change the path against which a
+            # relative first header is resolved, so root it as it would be.
+            message = message.lstrip()
+            units = [message if message.startswith((':', '*')) else ':' + message]
+        num_errors_per_unit = 1 if interleave else self._drain_size
+        prefix = [ERROR_QUERY] * self._drain_size if candidates else []
+        commands = prefix + [unit + ';' + ';'.join([ERROR_QUERY] * num_errors_per_unit) for unit in units]
+        parts = split_responses(device._query_message(';'.join(commands)))
+
+        stale = self._parse_errors(parts[:len(prefix)])
+        stale_errors = [InstrumentError(code, description, candidates[0] if len(candidates) == 1 else None,
+                                        candidates)
+                        for code, description in stale]
+        errors = []
+        if interleave:
+            responses = self._split_interleaved(units, parts[len(prefix):], errors)
+        else:
+            # A query in error produces no response, so the error responses are counted from the end.
+            responses = parts[len(prefix):-self._drain_size]
+            errors.extend((code, description, message)
+                          for code, description in self._parse_errors(parts[-self._drain_size:]))
+        # The queue is empty once an error query reports no error, so only if
+        # the last did not can errors remain.
+        if parse_error(parts[-1])[0] != 0:
+            errors.extend((code, description, None) for code, description in self._drain(device))
+        response = ';'.join(responses) + '\n' if responses else None
+        if prefix and len(stale) == len(prefix):
+            # Errors beyond the capacity of the prefix are read by the error
+            # queries which follow, so could have been caused by either.
+            self._report(stale_errors + [InstrumentError(code, description, None, candidates + [message])
+                                         for code, description, _ in errors])
+        elif errors:
+            self._report(stale_errors + [InstrumentError(code, description, command, [message])
+                                         for code, description, command in errors])
+        else:
+            self._report(stale_errors, response)
+        return response
+
+    @staticmethod
+    def _split_interleaved(units, parts, errors):
+        """Separate the responses to units from the responses to the error queries following them.
+
+        Errors are appended to errors as (code, description, unit) triples.
+        A query in error produces no response, in which case the error
+        query's response appears in its place.
+        """
+        missing = sum(_num_queries(unit) for unit in units) + len(units) - len(parts)
+        responses = []
+        position = 0
+        for unit in units:
+            for _ in range(_num_queries(unit)):
+                if missing > 0 and _is_error_report(parts[position]):
+                    missing -= 1
+                    continue
+                responses.append(parts[position])
+                position += 1
+            code, description = parse_error(parts[position])
+            position += 1
+            if code != 0:
+                errors.append((code, description, unit))
+        return responses
+
+    @staticmethod
+    def _parse_errors(responses):
+        """Parse responses to error queries, up to the first which reports no error."""
+        errors = []
+        for response in responses:
+            code, description = parse_error(response)
+            if code == 0:
+                break
+            errors.append((code, description))
+        return errors
+
+    def _drain(self, device):
+        """Read the error queue until it is empty, drain_size entries per round trip."""
+        errors = []
+        while True:
+            response = device._query_message(';'.join([ERROR_QUERY] * self._drain_size))
+            drained = self._parse_errors(split_responses(response))
+            errors.extend(drained)
+            if len(drained) < self._drain_size:
+                return errors
+
+    def _report(self, errors, response=None):
+        """Record errors, and raise the first or pass each to on_error.
+
+        Args:
+            errors: A list of InstrumentErrors.
+            response: The response to the query which found the errors, if
+                they were all caused by earlier messages.
+        """
+        if not errors:
+            return
+        self.errors.extend(errors)
+        if self._on_error is None:
+            errors[0].response = response
+            raise errors[0]
+        for error in errors:
+            self._on_error(error)
@@ -0,0 +1,177 @@
+"""Concurrent polling of many DP832 power supplies."""
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from dp800.dp800 import ChannelMode, from_boolean_response, parse_measurement
+
+
+class ScanInProgressError(TimeoutError):
+    """The previous scan of an instrument has not yet finished, so it was not scanned again."""
+
+
+ChannelScan = namedtuple('ChannelScan', ['channel_id', 'is_on', 'mode', 'voltage', 'current', 'power',
+                                         'over_voltage_tripped', 'over_current_tripped'])
+
+InstrumentScan = namedtuple('InstrumentScan', ['name', 'timestamp', 'channels', 'error'])
+InstrumentScan.__doc__ = """The result of scanning one instrument.
+
+name: The name of the instrument within the fleet.
+timestamp: The wall-clock time at which the scan of this instrument started.
+channels: An OrderedDict of channel id to ChannelScan, or None if the scan failed.
+error: The exception raised while scanning, or None if the scan succeeded.
+"""
+
+
+class FleetScan(namedtuple('FleetScan', ['timestamp', 'duration', 'instruments'])):
+    """The consolidated result of scanning a fleet.
+
+    timestamp: The wall-clock time at which the scan started.
+    duration: The time taken by the whole scan, in seconds.
+    instruments: An OrderedDict of instrument name to InstrumentScan.
+    """
+
+    __slots__ = ()
+
+    @property
+    def errors(self):
+        """An OrderedDict of instrument name to exception for the instruments which failed."""
+        return OrderedDict((name, scan.error) for name, scan in self.instruments.items()
+                           if scan.error is not None)
+
+
+def scan_instrument(dp832):
+    """Read the output state, mode, measurements and protection trips of every channel in a single round trip.
+
+    Returns:
+        An OrderedDict of channel id to ChannelScan.
+    """
+    channel_ids = dp832.channel_ids
+    commands = []
+    for channel_id in channel_ids:
+        commands.append(':OUTPUT:STATE? CH{}'.format(channel_id))
+        commands.append(':OUTPUT:MODE? CH{}'.format(channel_id))
+        commands.append(':MEASURE:ALL? CH{}'.format(channel_id))
+        commands.append(':SOURCE{}:VOLTAGE:PROTECTION:TRIPPED?'.format(channel_id))
+        commands.append(':SOURCE{}:CURRENT:PROTECTION:TRIPPED?'.format(channel_id))
+    responses = dp832.query_many(commands)
+    channels = OrderedDict()
+    for index, channel_id in enumerate(channel_ids):
+        (state_response, mode_response, measurement_response,
+         over_voltage_response, over_current_response) = responses[5 * index:5 * index + 5]
+        try:
+            is_on = from_boolean_response(state_response)
+            mode = ChannelMode.from_response(mode_response)
+            over_voltage_tripped = from_boolean_response(over_voltage_response)
+            over_current_tripped = from_boolean_response(over_current_response)
+        except ValueError as e:
+            raise RuntimeError("Unexpected response scanning channel {}: {}".format(channel_id, e)) from e
+        channels[channel_id] = ChannelScan(channel_id, is_on, mode, *parse_measurement(measurement_response),
+                                           over_voltage_tripped, over_current_tripped)
+    return channels
+
+
+class DP832Fleet:
+    """A collection of DP832 instruments which are scanned concurrently.
+
+    Scans run on a bounded pool of worker threads, so rack-wide scan latency is
+    governed by the slowest instruments rather than the sum over all of them.
+
+    Args:
+        instruments: A mapping of name to DP832, or an iterable of DP832 instances
+            which will be named by their index.
+        max_workers: The maximum number of instruments scanned simultaneously.
+    """
+
+    def __init__(self, instruments=(), max_workers=8):
+        if max_workers < 1:
+            raise ValueError("Maximum number of workers {} is less than one".format(max_workers))
+        if not hasattr(instruments, 'items'):
+            instruments = enumerate(instruments)
+        else:
+            instruments = instruments.items()
+        self._instruments = OrderedDict(instruments)
+        # The most recent scan of each instrument, which may still be running.
+        self._in_flight = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dp832-fleet')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return len(self._instruments)
+
+    def __getitem__(self, name):
+        return self._instruments[name]
+
+    @property
+    def names(self):
+        return list(self._instruments.keys())
+
+    def add(self, name, dp832):
+        if name in self._instruments:
+            raise ValueError("Instrument named {!r} already in fleet".format(name))
+        self._instruments[name] = dp832
+
+    def remove(self, name):
+        try:
+            del self._instruments[name]
+            self._in_flight.pop(name, None)
+        except KeyError:
+            raise ValueError("No instrument named {!r} in fleet".format(name))
+
+    def scan(self, timeout=None):
+        """Scan every instrument in the fleet concurrently.
+
+        A failure on one instrument is recorded in its InstrumentScan and does
+        not abort the scan of the others.
+
+        A scan which has started cannot be abandoned, so an instrument whose
+        scan timed out is not scanned again until that scan has finished, which
+        ensures that only one thread talks to each instrument at a time. In the
+        meantime it is reported with a ScanInProgressError.
+
+        Args:
+            timeout: The maximum time in seconds to wait for the scan. Instruments
+                which have not responded in time are reported with a TimeoutError.
+
+        Returns:
+            A FleetScan.
+        """
+        timestamp = time.time()
+        start = time.monotonic()
+        futures = OrderedDict()
+        instruments = OrderedDict()
+        for name, dp832 in self._instruments.items():
+            previous = self._in_flight.get(name)
+            if previous is not None and not previous.done():
+                instruments[name] = InstrumentScan(
+                    name, timestamp, None, ScanInProgressError("Previous scan of {!r} still in progress".format(name)))
+                continue
+            futures[name] = self._in_flight[name] = self._executor.submit(self._scan_one, name, dp832)
+        wait(futures.values(), timeout=timeout)
+        for name, future in futures.items():
+            if future.done():
+                instruments[name] = future.result()
+            else:
+                # A cancelled scan is done, so cannot hold up the next; a running one can.
+                future.cancel()
+                instruments[name] = InstrumentScan(
+                    name, timestamp, None, TimeoutError("Scan of {!r} timed out".format(name)))
+        instruments = OrderedDict((name, instruments[name]) for name in self._instruments)
+        return FleetScan(timestamp, time.monotonic() - start, instruments)
+
+    @staticmethod
+    def _scan_one(name, dp832):
+        timestamp = time.time()
+        try:
+            return InstrumentScan(name, timestamp, scan_instrument(dp832), None)
+        except Exception as e:
+            return InstrumentScan(name, timestamp, None, e)
+
+    def close(self):
+        """Shut down the worker threads."""
+        self._executor.shutdown(wait=True)
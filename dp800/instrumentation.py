@@ -0,0 +1,230 @@
+"""Per-command instrumentation of the messages sent to an instrument.
+
+Attach an Instrumentation to a DP832 to count the messages it sends, record
+their latencies in histograms keyed by command template, and count errors and
+timeouts:
+
+    dp832 = DP832(instrument, instrumentation=Instrumentation())
+    ...
+    for template, stats in dp832.stats().items():
+        print(template, stats['count'], stats['p99'])
+
+Hooks registered with add_hook() receive a CommandEvent for every message.
+When no Instrumentation is attached the cost is a single attribute test per
+message.
+"""
+import re
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+
+# The VISA status code for a timeout, as carried by pyvisa's VisaIOError.error_code.
+VI_ERROR_TMO = -1073807339
+
+CommandEvent = namedtuple('CommandEvent', ['kind', 'message', 'template', 'start', 'duration', 'exception'])
+CommandEvent.__doc__ = """A message sent to an instrument.
+
+kind: Either 'write' or 'query'.
+message: The message as sent.
+template: The command template of the message; see command_template().
+start: The time.perf_counter_ns() value at which the message was sent.
+duration: The time taken in nanoseconds, including any response.
+exception: The exception raised, or None.
+"""
+
+
+_HEADER_SUFFIX = re.compile(r'(?<=[A-Za-z])\d+(?=:|\?|$)')
+_NUMBER = re.compile(r'^[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?$')
+_CHANNEL = re.compile(r'^CH\d+$', re.IGNORECASE)
+
+
+def _unit_template(unit):
+    header, separator, arguments = unit.strip().partition(' ')
+    header = _HEADER_SUFFIX.sub('{channel}', header)
+    if not separator:
+        return header
+    templated = []
+    for argument in arguments.split(','):
+        argument = argument.strip()
+        if _CHANNEL.match(argument):
+            templated.append('CH{channel}')
+        elif _NUMBER.match(argument):
+            templated.append('{value}')
+        elif argument.upper() in ('ON', 'OFF'):
+            templated.append('{state}')
+        else:
+            templated.append(argument)
+    return header + ' ' + ','.join(templated)
+
+
+@lru_cache(maxsize=4096)
+def command_template(message):
+    """Reduce a message to its command template.
+
+    Channel numbers become {channel}, numeric arguments {value} and ON/OFF
+    arguments {state}, so that ':SOURCE1:VOLTAGE:IMMEDIATE 1.000' becomes
+    ':SOURCE{channel}:VOLTAGE:IMMEDIATE {value}'. The units of a compound
+    message are templated individually and rejoined.
+    """
+    return ';'.join(_unit_template(unit) for unit in message.split(';'))
+
+
+def is_timeout(exception):
+    """Determine whether an exception raised by an instrument represents a timeout."""
+    return isinstance(exception, TimeoutError) or getattr(exception, 'error_code', None) == VI_ERROR_TMO
+
+
+class LatencyHistogram:
+    """A histogram of latencies with bounded relative error, in the style of HdrHistogram.
+
+    Values are non-negative integers, typically nanoseconds. Values below
+    2**significant_bits are recorded exactly; larger values fall into buckets
+    whose width is at most 2**-(significant_bits - 1) of their value, so
+    percentiles are reported to within that relative error.
+    """
+
+    def __init__(self, significant_bits=7):
+        if significant_bits < 2:
+            raise ValueError("Significant bits {} is less than two".format(significant_bits))
+        self._bits = significant_bits
+        self._half = 1 << (significant_bits - 1)
+        self._counts = {}
+        self._count = 0
+        self._total = 0
+        self._min = None
+        self._max = None
+
+    def _index(self, value):
+        shift = value.bit_length() - self._bits
+        if shift <= 0:
+            return value
+        return (1 << self._bits) + (shift - 1) * self._half + ((value >> shift) - self._half)
+
+    def _lowest_value(self, index):
+        size = 1 << self._bits
+        if index < size:
+            return index
+        shift, offset = divmod(index - size, self._half)
+        return (self._half + offset) << (shift + 1)
+
+    def record(self, value):
+        value = int(value)
+        if value < 0:
+            raise ValueError("Cannot record negative value {}".format(value))
+        index = self._index(value)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self._count += 1
+        self._total += value
+        if self._min is None or value < self._min:
+            self._min = value
+        if self._max is None or value > self._max:
+            self._max = value
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def min(self):
+        return self._min
+
+    @property
+    def max(self):
+        return self._max
+
+    @property
+    def mean(self):
+        return self._total / self._count if self._count else None
+
+    def percentile(self, percent):
+        """The value at or below which percent of recorded values lie, or None if empty."""
+        if not 0 <= percent <= 100:
+            raise ValueError("Percentile {} not in range 0 to 100".format(percent))
+        if not self._count:
+            return None
+        threshold = max(1, -(-self._count * percent // 100))
+        cumulative = 0
+        for index in sorted(self._counts):
+            cumulative += self._counts[index]
+            if cumulative >= threshold:
+                return min(max(self._lowest_value(index), self._min), self._max)
+        return self._max
+
+
+class CommandStats:
+    """Counters and a latency histogram for one command template."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.latency = LatencyHistogram()
+
+    def snapshot(self):
+        latency = self.latency
+        return dict(
+            count=self.count,
+            errors=self.errors,
+            timeouts=self.timeouts,
+            min=latency.min,
+            mean=latency.mean,
+            p50=latency.percentile(50),
+            p90=latency.percentile(90),
+            p99=latency.percentile(99),
+            max=latency.max)
+
+
+class Instrumentation:
+    """Collects statistics about the messages sent to an instrument and notifies hooks."""
+
+    def __init__(self):
+        self._stats = {}
+        self._hooks = []
+
+    def add_hook(self, hook):
+        """Register a callable to receive a CommandEvent for every message."""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self._hooks.remove(hook)
+
+    def reset(self):
+        """Discard all statistics collected so far."""
+        self._stats.clear()
+
+    def stats(self):
+        """A snapshot of the statistics as a dict of command template to a dict of counters.
+
+        Latencies are in nanoseconds.
+        """
+        return {template: stats.snapshot() for template, stats in self._stats.items()}
+
+    def call(self, kind, function, message):
+        """Call function(message), recording it as a message of the given kind."""
+        start = time.perf_counter_ns()
+        exception = None
+        try:
+            return function(message)
+        except Exception as e:
+            exception = e
+            raise
+        finally:
+            self.record(kind, message, start, time.perf_counter_ns() - start, exception)
+
+    def record(self, kind, message, start, duration, exception=None):
+        template = command_template(message)
+        try:
+            stats = self._stats[template]
+        except KeyError:
+            stats = self._stats[template] = CommandStats()
+        stats.count += 1
+        stats.latency.record(duration)
+        if exception is not None:
+            stats.errors += 1
+            if is_timeout(exception):
+                stats.timeouts += 1
+        if self._hooks:
+            event = CommandEvent(kind, message, template, start, duration, exception)
+            for hook in self._hooks:
+                hook(event)
@@ -0,0 +1,129 @@
+"""Adaptive pacing of the messages sent to an instrument.
+
+Writes do not wait for the instrument, so a burst of them can arrive faster
+than it executes them and overrun its input buffer. Rather than sleeping for a
+fixed worst-case delay after every write, attach an AdaptivePacer:
+
+    dp832 = DP832(instrument, pacer=AdaptivePacer())
+
+The pacer spaces messages by an interval which it learns. After every
+probe_every consecutive writes it sends *OPC?, whose response is delayed by
+any backlog of commands the instrument has yet to execute. The delay beyond
+the quickest round trip observed measures that backlog, from which the time
+the instrument takes to execute each command is estimated, and the interval
+is moved towards that time with a safety margin. When no backlog is seen the
+interval decays, so the pacer converges on the fastest rate the instrument
+sustains. A query needs no probe, since its response shows that everything
+before it has been executed.
+"""
+import time
+
+
+class AdaptivePacer:
+    """Limits the rate at which messages are sent to the rate the instrument sustains.
+
+    Args:
+        initial_interval: The initial interval between messages, in seconds.
+        min_interval: The least interval between messages, in seconds.
+        max_interval: The greatest interval between messages, in seconds.
+        probe_every: The number of consecutive writes after which to probe
+            the instrument's backlog with *OPC?.
+        safety: The factor by which the interval exceeds the estimated time
+            the instrument takes to execute a command.
+        smoothing: The weight given to each new estimate, between 0 and 1.
+        decay: The factor by which the interval shrinks after a probe finds no backlog.
+        tolerance: The least delay, in seconds, beyond the quickest round trip
+            which is taken to indicate a backlog rather than jitter.
+    """
+
+    def __init__(self, initial_interval=0.0, min_interval=0.0, max_interval=0.1, probe_every=16,
+                 safety=1.2, smoothing=0.25, decay=0.8, tolerance=0.0005):
+        if not 0 <= min_interval <= max_interval:
+            raise ValueError("Intervals {} s to {} s are not a valid range".format(min_interval, max_interval))
+        if probe_every < 1:
+            raise ValueError("Probe interval {} is less than one write".format(probe_every))
+        if not 0 < smoothing <= 1:
+            raise ValueError("Smoothing {} not in range 0 to 1".format(smoothing))
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._interval = min(max(initial_interval, min_interval), max_interval)
+        self._probe_every = probe_every
+        self._safety = safety
+        self._smoothing = smoothing
+        self._decay = decay
+        self._tolerance = tolerance
+        self._next_send = 0.0
+        self._window_start = None
+        self._window_writes = 0
+        self._min_round_trip = None
+        self.probes = 0
+        self.backlogged_probes = 0
+
+    @property
+    def interval(self):
+        """The current interval between messages, in seconds."""
+        return self._interval
+
+    @property
+    def round_trip(self):
+        """The quickest round trip observed by a probe, in seconds, or None before the first probe."""
+        return self._min_round_trip
+
+    def _wait(self):
+        now = time.monotonic()
+        if now < self._next_send:
+            time.sleep(self._next_send - now)
+            now = time.monotonic()
+        self._next_send = now + self._interval
+        return now
+
+    def before_write(self):
+        now = self._wait()
+        if self._window_start is None:
+            self._window_start = now
+
+    def after_write(self, device):
+        self._window_writes += 1
+        if self._window_writes >= self._probe_every:
+            self.probe(device)
+
+    def before_query(self):
+        self._wait()
+
+    def after_query(self):
+        self._window_start = None
+        self._window_writes = 0
+
+    def probe(self, device):
+        """Measure the instrument's backlog with *OPC? and adapt the interval."""
+        start = time.monotonic()
+        device._query_instrumented('*OPC?')
+        end = time.monotonic()
+        round_trip = end - start
+        if self._min_round_trip is None:
+            # The first probe may itself be delayed by a backlog, so establish
+            # the quickest round trip with a second, which cannot be.
+            device._query_instrumented('*OPC?')
+            self._min_round_trip = time.monotonic() - end
+            end += self._min_round_trip
+        self._min_round_trip = min(self._min_round_trip, round_trip)
+        backlog = round_trip - self._min_round_trip
+        writes = self._window_writes
+        window_start = self._window_start
+        self._window_start = None
+        self._window_writes = 0
+        self.probes += 1
+        # Delays within the tolerance, or a quarter of the round trip, are taken to be jitter.
+        if writes and window_start is not None and backlog > max(self._tolerance, 0.25 * self._min_round_trip):
+            self.backlogged_probes += 1
+            execution_time = (start - window_start + backlog) / writes
+            target = execution_time * self._safety
+            # Slow down at once, to avoid overrunning the instrument, but speed up gradually.
+            if target > self._interval:
+                interval = target
+            else:
+                interval = self._interval + self._smoothing * (target - self._interval)
+        else:
+            interval = self._interval * self._decay
+        self._interval = min(max(interval, self._min_interval), self._max_interval)
+        self._next_send = end
@@ -0,0 +1,217 @@
+"""Software-paced ramps and profiles of setpoint levels.
+
+Where the instrument's timer cannot be used, a setpoint can be stepped through
+a schedule by the host:
+
+    playback = channel.voltage.setpoint.ramp(1.0, 12.0, duration=60.0)
+    ...
+    playback.cancel()
+    print(playback.wait().stats)
+
+The whole schedule is computed up front as NumPy arrays, and each level is
+written at an absolute deadline measured from the start of playback on the
+monotonic clock, so that the time taken by each write does not accumulate as
+drift. When writes fall behind, levels whose successors are already due are
+skipped rather than played late.
+
+This module depends on NumPy.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+# The default interval in seconds between successive levels of a ramp.
+DEFAULT_INTERVAL = 0.1
+
+
+PlaybackStats = namedtuple('PlaybackStats', ['points', 'written', 'skipped', 'requested_duration',
+                                             'achieved_duration', 'mean_lateness', 'max_lateness'])
+PlaybackStats.__doc__ = """The timing achieved by a playback compared with its schedule.
+
+points: The number of levels in the schedule.
+written: The number of levels written.
+skipped: The number of levels skipped because a later level was already due.
+requested_duration: The scheduled time of the last level, in seconds.
+achieved_duration: The time at which the last written level was written, in seconds.
+mean_lateness: The mean delay of writes after their deadlines, in seconds.
+max_lateness: The largest delay of a write after its deadline, in seconds.
+"""
+
+
+def ramp_schedule(start, stop, rate=None, duration=None, interval=DEFAULT_INTERVAL):
+    """Compute the schedule of a linear ramp.
+
+    Exactly one of rate and duration must be given.
+
+    Args:
+        start: The first level.
+        stop: The last level.
+        rate: The magnitude of the rate of change, in units per second.
+        duration: The duration of the ramp in seconds.
+        interval: The interval in seconds between successive levels.
+
+    Returns:
+        A pair of arrays of times, in seconds from the start of the ramp, and levels.
+    """
+    if (rate is None) == (duration is None):
+        raise ValueError("Exactly one of rate and duration must be given")
+    if not interval > 0:
+        raise ValueError("Interval {} s is not positive".format(interval))
+    if rate is not None:
+        if not rate > 0:
+            raise ValueError("Rate {} is not positive".format(rate))
+        duration = abs(stop - start) / rate
+    elif duration < 0:
+        raise ValueError("Duration {} s is negative".format(duration))
+    num_intervals = max(1, int(np.ceil(duration / interval - 1e-9)))
+    times = np.linspace(0.0, duration, num_intervals + 1)
+    levels = np.linspace(start, stop, num_intervals + 1)
+    return times, levels
+
+
+def profile_schedule(times, levels):
+    """Validate and convert an arbitrary profile into a schedule of arrays.
+
+    Args:
+        times: The times at which to write each level, in seconds from the start
+            of playback, in non-decreasing order.
+        levels: The levels, one for each time.
+
+    Returns:
+        A pair of arrays of times and levels.
+    """
+    times = np.asarray(times, dtype=float)
+    levels = np.asarray(levels, dtype=float)
+    if times.ndim != 1 or times.shape != levels.shape:
+        raise ValueError("Times and levels must be one-dimensional sequences of equal length")
+    if len(times) == 0:
+        raise ValueError("Profile is empty")
+    if times[0] < 0 or np.any(np.diff(times) < 0):
+        raise ValueError("Profile times must be non-negative and non-decreasing")
+    return times, levels
+
+
+class Playback:
+    """A schedule of levels being written to a setpoint by a background thread.
+
+    Each level is written through the setpoint's level property, so the device
+    should not be used concurrently from other threads while a playback runs.
+
+    Args:
+        setpoint: The SetPoint to which levels are written.
+        times: An array of times in seconds from the start of playback.
+        levels: An array of levels, one for each time.
+    """
+
+    def __init__(self, setpoint, times, levels):
+        self._setpoint = setpoint
+        self._deadlines = np.round(np.asarray(times) * 1e9).astype(np.int64)
+        self._levels = np.asarray(levels, dtype=float)
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='dp800-playback', daemon=True)
+        self._stats = None
+        self._exception = None
+
+    @property
+    def setpoint(self):
+        return self._setpoint
+
+    @property
+    def stats(self):
+        """The PlaybackStats of the finished playback, or None while it is running."""
+        return self._stats
+
+    @property
+    def is_running(self):
+        return self._thread.is_alive()
+
+    @property
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Stop writing levels. The setpoint is left at the last level written."""
+        self._cancelled.set()
+
+    def wait(self, timeout=None):
+        """Wait for the playback to finish.
+
+        Returns:
+            This Playback.
+
+        Raises:
+            TimeoutError: If the playback has not finished within timeout seconds.
+            Exception: Any exception raised while writing a level.
+        """
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            raise TimeoutError("Playback still running after {} s".format(timeout))
+        if self._exception is not None:
+            raise self._exception
+        return self
+
+    def _run(self):
+        deadlines = self._deadlines
+        levels = self._levels
+        num_points = len(deadlines)
+        setpoint = self._setpoint
+        written = 0
+        skipped = 0
+        total_lateness = 0
+        max_lateness = 0
+        last_written = 0
+        start = time.monotonic_ns()
+        index = 0
+        try:
+            while index < num_points and not self._cancelled.is_set():
+                remaining = start + deadlines[index] - time.monotonic_ns()
+                if remaining > 0:
+                    if self._cancelled.wait(remaining / 1e9):
+                        break
+                now = time.monotonic_ns() - start
+                # Skip to the latest level already due, so lateness is not carried forward.
+                latest = int(np.searchsorted(deadlines, now, side='right')) - 1
+                if latest > index:
+                    skipped += latest - index
+                    index = latest
+                setpoint.level = float(levels[index])
+                last_written = time.monotonic_ns() - start
+                lateness = max(0, last_written - int(deadlines[index]))
+                total_lateness += lateness
+                max_lateness = max(max_lateness, lateness)
+                written += 1
+                index += 1
+        except Exception as e:
+            self._exception = e
+        finally:
+            self._stats = PlaybackStats(
+                points=num_points,
+                written=written,
+                skipped=skipped,
+                requested_duration=deadlines[-1] / 1e9,
+                achieved_duration=last_written / 1e9,
+                mean_lateness=total_lateness / written / 1e9 if written else None,
+                max_lateness=max_lateness / 1e9)
+            logger.debug("Playback on %s %s: %s", setpoint.quantity.name, setpoint.quantity.channel.id, self._stats)
+
+
+def play(setpoint, times, levels):
+    """Validate a schedule against the setpoint's range and start playing it.
+
+    Returns:
+        A started Playback.
+    """
+    setpoint.quantity.check_range(float(np.min(levels)))
+    setpoint.quantity.check_range(float(np.max(levels)))
+    return Playback(setpoint, times, levels).start()
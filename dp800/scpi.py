@@ -0,0 +1,327 @@
+"""Parsing and dispatch of SCPI program messages.
+
+Commands are registered with a Dispatcher using the notation of SCPI reference
+manuals, in which the upper-case letters of a mnemonic form its short form,
+optional nodes are bracketed, a '#' marks a mnemonic which takes a numeric
+suffix and a trailing '?' marks a query:
+
+    dispatcher = Dispatcher()
+    dispatcher.register('*IDN?', identify)
+    dispatcher.register('SOURce#:VOLTage[:LEVel][:IMMediate][:AMPLitude]', set_voltage)
+    dispatcher.register('SOURce#:VOLTage[:LEVel][:IMMediate][:AMPLitude]?', query_voltage)
+
+Each program message is tokenized into program message units, which are
+dispatched through a trie of header nodes, so the cost of dispatch depends on
+the depth of the header rather than on the number of registered commands.
+Both the short and long forms of each mnemonic are accepted, case-insensitively.
+A handler is called with the target object, then the numeric suffix of each
+'#' mnemonic (None where omitted), then the arguments.
+"""
+import inspect
+import itertools
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+
+class SCPIError(RuntimeError):
+    """An error in the sense of the SCPI error queue, with a standard error code."""
+
+    def __init__(self, code, description, command=None):
+        super().__init__("{},\"{}\"".format(code, description) +
+                         ("" if command is None else " in {!r}".format(command)))
+        self.code = code
+        self.description = description
+        self.command = command
+
+
+UNDEFINED_HEADER = -113
+HEADER_SUFFIX_OUT_OF_RANGE = -114
+PARAMETER_NOT_ALLOWED = -108
+MISSING_PARAMETER = -109
+DATA_TYPE_ERROR = -104
+ILLEGAL_PARAMETER_VALUE = -224
+EXECUTION_ERROR = -200
+
+
+ProgramUnit = namedtuple('ProgramUnit', ['rooted', 'elements', 'query', 'arguments'])
+ProgramUnit.__doc__ = """A program message unit, that is, one command or query of a message.
+
+rooted: True if the header began with ':', or is a common '*' command.
+elements: A tuple of (mnemonic, suffix) pairs, with the mnemonic in upper case
+    and the suffix an int or None.
+query: True if the header ended with '?'.
+arguments: A tuple of arguments, each a float, or a str for character data
+    (converted to upper case) and quoted strings (without quotes).
+"""
+
+
+_DIGITS = '0123456789'
+_NUMBER = re.compile(r'^[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?$')
+
+
+def split_units(message):
+    """Split a program message at ';' separators which are not within quoted strings."""
+    if '"' not in message:
+        return message.split(';')
+    units = []
+    start = 0
+    quoted = False
+    for index, character in enumerate(message):
+        if character == '"':
+            quoted = not quoted
+        elif character == ';' and not quoted:
+            units.append(message[start:index])
+            start = index + 1
+    units.append(message[start:])
+    return units
+
+
+def parse_argument(text):
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] == '"':
+        return text[1:-1]
+    if _NUMBER.match(text):
+        return float(text)
+    return text.upper()
+
+
+@lru_cache(maxsize=1024)
+def parse_header(header):
+    """Parse a program header into a (rooted, elements, query) tuple.
+
+    Headers recur far more often than their arguments vary, so parsed headers are cached.
+    """
+    query = header.endswith('?')
+    if query:
+        header = header[:-1]
+    if header.startswith('*'):
+        return True, ((header.upper(), None),), query
+    rooted = header.startswith(':')
+    if rooted:
+        header = header[1:]
+    elements = []
+    for element in header.split(':'):
+        mnemonic = element.rstrip(_DIGITS)
+        if not mnemonic.isalpha():
+            raise SCPIError(UNDEFINED_HEADER, "Undefined header", header)
+        suffix = element[len(mnemonic):]
+        elements.append((mnemonic.upper(), int(suffix) if suffix else None))
+    return rooted, tuple(elements), query
+
+
+def parse_unit(unit):
+    """Parse one program message unit."""
+    parts = unit.split(None, 1)
+    if not parts:
+        raise SCPIError(UNDEFINED_HEADER, "Undefined header", unit)
+    rooted, elements, query = parse_header(parts[0])
+    arguments = tuple(parse_argument(argument) for argument in split_arguments(parts[1])) if len(parts) > 1 else ()
+    return ProgramUnit(rooted, elements, query, arguments)
+
+
+def split_arguments(text):
+    if '"' not in text:
+        return text.split(',')
+    arguments = []
+    start = 0
+    quoted = False
+    for index, character in enumerate(text):
+        if character == '"':
+            quoted = not quoted
+        elif character == ',' and not quoted:
+            arguments.append(text[start:index])
+            start = index + 1
+    arguments.append(text[start:])
+    return arguments
+
+
+def parse_message(message):
+    """Parse a program message into a list of ProgramUnits."""
+    return [parse_unit(unit) for unit in split_units(message) if not unit.isspace() and unit]
+
+
+def mnemonic_forms(mnemonic):
+    """The accepted forms of a mnemonic written in SCPI notation, such as 'VOLTage'.
+
+    Returns:
+        A tuple of the short and long forms, in upper case.
+    """
+    short = ''.join(itertools.takewhile(str.isupper, mnemonic)) or mnemonic.upper()
+    return short, mnemonic.upper()
+
+
+def keyword_matches(argument, keyword):
+    """Determine whether a character data argument is the short or long form of a keyword.
+
+    Args:
+        argument: An argument as produced by parse_argument.
+        keyword: A keyword in SCPI notation, such as 'DEFault'.
+    """
+    return isinstance(argument, str) and argument.upper() in mnemonic_forms(keyword)
+
+
+class _Node:
+
+    __slots__ = ('children', 'takes_suffix', 'handlers')
+
+    def __init__(self, takes_suffix=False):
+        self.children = {}
+        self.takes_suffix = takes_suffix
+        self.handlers = {}
+
+
+_Handler = namedtuple('_Handler', ['function', 'min_arguments', 'max_arguments', 'num_suffixes'])
+
+
+def _expand(pattern):
+    """Expand a header pattern with bracketed optional nodes into all its concrete forms.
+
+    Yields:
+        Tuples of (mnemonic, takes_suffix) pairs.
+    """
+    tokens = re.findall(r'\[:?([^\]]+)\]|:?([^:\[]+)', pattern)
+    choices = []
+    for optional, required in tokens:
+        mnemonic = optional or required
+        takes_suffix = mnemonic.endswith('#')
+        node = (mnemonic.rstrip('#'), takes_suffix)
+        choices.append(((node,), ()) if optional else ((node,),))
+    for combination in itertools.product(*choices):
+        yield tuple(itertools.chain.from_iterable(combination))
+
+
+def _argument_range(function, num_suffixes):
+    parameters = list(inspect.signature(function).parameters.values())[1 + num_suffixes:]
+    if any(parameter.kind == parameter.VAR_POSITIONAL for parameter in parameters):
+        return sum(1 for parameter in parameters if parameter.kind == parameter.POSITIONAL_OR_KEYWORD
+                   and parameter.default is parameter.empty), None
+    positional = [parameter for parameter in parameters if parameter.kind == parameter.POSITIONAL_OR_KEYWORD]
+    required = sum(1 for parameter in positional if parameter.default is parameter.empty)
+    return required, len(positional)
+
+
+class Dispatcher:
+    """An index of SCPI commands which dispatches program messages to their handlers."""
+
+    def __init__(self):
+        self._root = _Node()
+
+    def register(self, pattern, function):
+        """Register a handler for a command or query.
+
+        Args:
+            pattern: The header in SCPI notation, ending in '?' for a query.
+            function: The handler, called with the target, the suffixes of the
+                '#' mnemonics and then the arguments. A query handler returns
+                its response.
+        """
+        query = pattern.endswith('?')
+        header = pattern[:-1] if query else pattern
+        header = header.lstrip(':')
+        for nodes in _expand(header):
+            num_suffixes = sum(1 for _, takes_suffix in nodes if takes_suffix)
+            min_arguments, max_arguments = _argument_range(function, num_suffixes)
+            node = self._root
+            for mnemonic, takes_suffix in nodes:
+                forms = (mnemonic.upper(),) if mnemonic.startswith('*') else mnemonic_forms(mnemonic)
+                child = node.children.get(forms[0])
+                if child is None:
+                    child = _Node(takes_suffix)
+                    for form in forms:
+                        node.children[form] = child
+                elif child.takes_suffix != takes_suffix:
+                    raise ValueError("Conflicting numeric suffix for {} in {!r}".format(mnemonic, pattern))
+                node = child
+            if query in node.handlers:
+                raise ValueError("Pattern {!r} already registered".format(pattern))
+            node.handlers[query] = _Handler(function, min_arguments, max_arguments, num_suffixes)
+
+    def execute(self, target, message, on_error=None):
+        """Execute each unit of a program message.
+
+        Headers which do not begin with ':' are resolved relative to the path of
+        the preceding unit, as specified by IEEE 488.2.
+
+        Args:
+            target: The object passed to each handler.
+            message: The program message.
+            on_error: An optional callable which receives the SCPIError for each
+                unit which cannot be executed, after which execution continues
+                with the next unit. If None, the error is raised.
+
+        Returns:
+            A list of the responses to the queries in the message which were executed.
+
+        Raises:
+            SCPIError: If a unit cannot be dispatched and on_error is None. Units
+                preceding it have been executed.
+        """
+        responses = []
+        path = ()
+        for text in split_units(message):
+            if not text or text.isspace():
+                continue
+            try:
+                unit = parse_unit(text)
+                if unit.elements[0][0].startswith('*'):
+                    elements = unit.elements
+                elif unit.rooted:
+                    elements = unit.elements
+                    path = elements[:-1]
+                else:
+                    elements = path + unit.elements
+                    path = elements[:-1]
+                response = self._dispatch(target, unit, elements)
+            except SCPIError as e:
+                if on_error is None:
+                    raise
+                on_error(e)
+                continue
+            if unit.query:
+                responses.append(response)
+        return responses
+
+    def _dispatch(self, target, unit, elements):
+        node = self._root
+        suffixes = []
+        for mnemonic, suffix in elements:
+            node = node.children.get(mnemonic)
+            if node is None:
+                raise SCPIError(UNDEFINED_HEADER, "Undefined header", _format_unit(unit))
+            if node.takes_suffix:
+                suffixes.append(suffix)
+            elif suffix is not None:
+                raise SCPIError(HEADER_SUFFIX_OUT_OF_RANGE, "Header suffix out of range", _format_unit(unit))
+        handler = node.handlers.get(unit.query)
+        if handler is None:
+            raise SCPIError(UNDEFINED_HEADER, "Undefined header", _format_unit(unit))
+        num_arguments = len(unit.arguments)
+        if num_arguments < handler.min_arguments:
+            raise SCPIError(MISSING_PARAMETER, "Missing parameter", _format_unit(unit))
+        if handler.max_arguments is not None and num_arguments > handler.max_arguments:
+            raise SCPIError(PARAMETER_NOT_ALLOWED, "Parameter not allowed", _format_unit(unit))
+        try:
+            return handler.function(target, *suffixes, *unit.arguments)
+        except SCPIError as e:
+            if e.command is not None:
+                raise
+            raise SCPIError(e.code, e.description, _format_unit(unit)) from e
+        except ValueError as e:
+            raise SCPIError(DATA_TYPE_ERROR, "Data type error", _format_unit(unit)) from e
+        except IndexError as e:
+            raise SCPIError(ILLEGAL_PARAMETER_VALUE, "Illegal parameter value", _format_unit(unit)) from e
+        except Exception as e:
+            # Any other failure of a handler is an error in the command, never of the caller.
+            raise SCPIError(EXECUTION_ERROR, "Execution error", _format_unit(unit)) from e
+
+
+def _format_unit(unit):
+    header = ':'.join(mnemonic + ('' if suffix is None else str(suffix)) for mnemonic, suffix in unit.elements)
+    if unit.rooted and not header.startswith('*'):
+        header = ':' + header
+    if unit.query:
+        header += '?'
+    if unit.arguments:
+        header += ' ' + ','.join(str(argument) for argument in unit.arguments)
+    return header
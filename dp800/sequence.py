@@ -0,0 +1,172 @@
+"""Hardware-timed output sequences using the DP800 timer function.
+
+The timer steps a channel through a table of (voltage, current, dwell) points
+by itself, so the timing of the sequence is independent of the host. Each point
+is set by a :TIMER:PARAMETER command of its own, and the commands are packed
+into as few program messages as possible:
+
+    channel.sequence.upload([(1.0, 0.5, 2.0), (2.0, 0.5, 2.0), (3.0, 0.5, 5.0)], cycles=10)
+    channel.sequence.start()
+    ...
+    progress = channel.sequence.progress()
+
+The timer function operates on the instrument's currently selected channel, so
+every operation first selects the channel it belongs to.
+
+The timer changes the setpoints of the channel behind the back of any state
+cache, so uploading a sequence discards the channel's cached setpoints and
+protection settings, and from when it is started until it is stopped, or
+is_running is found to be false, they are not cached at all.
+"""
+import time
+from collections import namedtuple
+
+from dp800.batch import MAX_MESSAGE_LENGTH, pack_commands
+
+
+MAX_POINTS = 2048
+
+# The range of dwell times accepted by the instrument, in seconds.
+MIN_DWELL = 1.0
+MAX_DWELL = 99999.0
+
+END_STATES = ('OFF', 'LAST')
+
+
+SequencePoint = namedtuple('SequencePoint', ['voltage', 'current', 'dwell'])
+
+SequenceProgress = namedtuple('SequenceProgress', ['is_running', 'elapsed', 'cycle', 'point'])
+SequenceProgress.__doc__ = """The progress of a running sequence.
+
+The instrument reports only whether the timer is running, so the position
+within the sequence is estimated from the time elapsed since it was started by
+this host, and is None if it was not.
+
+is_running: Whether the instrument's timer is running.
+elapsed: Seconds since the sequence was started, or None.
+cycle: The zero-based index of the current cycle, or None.
+point: The zero-based index of the current point within the cycle, or None.
+"""
+
+
+class Sequence:
+    """The timer sequence of one channel."""
+
+    def __init__(self, channel):
+        self._channel = channel
+        self._device = channel.device
+        self._select_command = ':INSTRUMENT:NSELECT {}'.format(channel.id)
+        self._cached_queries = tuple(
+            query
+            for quantity in (channel.voltage, channel.current)
+            for query in (quantity.setpoint._level_query, quantity.protection._level_query,
+                          quantity.protection._state_query))
+        self._points = ()
+        self._cycles = None
+        self._started = None
+
+    @property
+    def channel(self):
+        return self._channel
+
+    @property
+    def points(self):
+        """The points most recently uploaded, as a tuple of SequencePoint."""
+        return self._points
+
+    @property
+    def duration(self):
+        """The duration of one cycle of the uploaded sequence, in seconds."""
+        return sum(point.dwell for point in self._points)
+
+    def upload(self, points, cycles=1, end_state='OFF', max_length=MAX_MESSAGE_LENGTH):
+        """Upload a table of points to the instrument's timer for this channel.
+
+        Args:
+            points: An iterable of (voltage, current, dwell) triples, where dwell
+                is in seconds, from MIN_DWELL to MAX_DWELL.
+            cycles: The number of times to repeat the table, or None to repeat
+                it indefinitely.
+            end_state: 'OFF' to turn the output off when the sequence ends, or
+                'LAST' to hold the last point.
+            max_length: The longest program message to send.
+        """
+        points = tuple(SequencePoint(*point) for point in points)
+        if not 1 <= len(points) <= MAX_POINTS:
+            raise ValueError("Number of points {} not in range 1 to {}".format(len(points), MAX_POINTS))
+        voltage = self._channel.voltage
+        current = self._channel.current
+        for point in points:
+            voltage.check_range(point.voltage)
+            current.check_range(point.current)
+            if not MIN_DWELL <= point.dwell <= MAX_DWELL:
+                raise ValueError("Dwell time {} s not in range {:g} s to {:g} s".format(
+                    point.dwell, MIN_DWELL, MAX_DWELL))
+        if cycles is not None and cycles < 1:
+            raise ValueError("Number of cycles {} is less than one".format(cycles))
+        end_state = end_state.upper()
+        if end_state not in END_STATES:
+            raise ValueError("End state {!r} not one of {}".format(end_state, ', '.join(END_STATES)))
+
+        commands = [self._select_command,
+                    ':TIMER:STATE OFF',
+                    ':TIMER:GROUPS {}'.format(len(points))]
+        commands.extend(':TIMER:PARAMETER {},{:.3f},{:.3f},{:g}'.format(index, *point)
+                        for index, point in enumerate(points, start=1))
+        commands.append(':TIMER:CYCLES I' if cycles is None else ':TIMER:CYCLES N,{}'.format(cycles))
+        commands.append(':TIMER:ENDSTATE {}'.format(end_state))
+        for message in pack_commands(commands, max_length):
+            self._device.write_many(message)
+        self._device.invalidate(*self._cached_queries)
+        self._points = points
+        self._cycles = cycles
+        self._started = None
+
+    def start(self):
+        """Start the uploaded sequence."""
+        cache = self._device.cache
+        if cache is not None:
+            cache.suspend(*self._cached_queries)
+        self._device.write_many([self._select_command, ':TIMER:STATE ON'])
+        self._started = time.monotonic()
+
+    def stop(self):
+        """Stop the sequence."""
+        self._device.write_many([self._select_command, ':TIMER:STATE OFF'])
+        self._started = None
+        self._resume_caching()
+
+    @property
+    def is_running(self):
+        response, = self._device.query_many([self._select_command, ':TIMER:STATE?'])
+        is_running = response.strip() == 'ON'
+        if not is_running:
+            self._resume_caching()
+        return is_running
+
+    def _resume_caching(self):
+        cache = self._device.cache
+        if cache is not None:
+            cache.resume(*self._cached_queries)
+
+    def progress(self):
+        """Report the progress of the sequence.
+
+        Returns:
+            A SequenceProgress.
+        """
+        is_running = self.is_running
+        if self._started is None or not self._points:
+            return SequenceProgress(is_running, None, None, None)
+        elapsed = time.monotonic() - self._started
+        duration = self.duration
+        cycle, offset = divmod(elapsed, duration)
+        cycle = int(cycle)
+        if self._cycles is not None and cycle >= self._cycles:
+            return SequenceProgress(is_running, elapsed, self._cycles - 1, len(self._points) - 1)
+        point = 0
+        for point, sequence_point in enumerate(self._points):
+            offset -= sequence_point.dwell
+            if offset < 0:
+                break
+        return SequenceProgress(is_running, elapsed, cycle, point)
@@ -0,0 +1,328 @@
+"""Thread-safe sharing of one DP832 between many threads.
+
+A single IOWorker thread owns the connection to the instrument and serves a
+priority queue of requests, so threads never interleave their messages, and a
+request of higher priority overtakes any backlog of lower priority requests
+rather than waiting behind it:
+
+    dp832 = SharedDP832(resource)
+
+    # On the safety monitor thread:
+    with dp832.worker.priority(HIGH):
+        tripped = dp832.channel(1).voltage.protection.has_tripped
+
+Identical reads which are pending at the same time, perhaps from different
+threads, are coalesced into a single query whose response is delivered to
+each of them. Reads which change the state of the instrument, such as those of
+the error queue or event registers, are never coalesced.
+
+Requests may also be submitted without waiting, with submit_query() and
+submit_write(), which return concurrent.futures.Future objects. The blocking
+write() and query() used by DP832 wait for their own request to complete, so
+the messages of each thread are executed in the order in which it sends them,
+whatever their priorities.
+"""
+import heapq
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from itertools import count
+
+from dp800.dp800 import DP832
+from dp800.scpi import split_units
+
+
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+# Headers of reads which change the state of the instrument, or whose response
+# depends on when they are executed relative to other requests.
+_UNCOALESCABLE = ('*ESR?', '*OPC?', ':SYST', 'SYST', ':STAT', 'STAT')
+
+
+def is_coalescable(message):
+    """Determine whether a message is a read which may be shared by concurrent requesters.
+
+    A message is coalescable if every unit is a query, and none reads the
+    error queue, the status registers, or *OPC?.
+    """
+    for unit in split_units(message):
+        header = unit.strip().split(None, 1)[0].upper() if unit.strip() else ''
+        if not header.endswith('?') or header.startswith(_UNCOALESCABLE):
+            return False
+    return True
+
+
+class _Request:
+
+    __slots__ = ('kind', 'message', 'futures', 'priority', 'taken')
+
+    def __init__(self, kind, message, priority):
+        self.kind = kind
+        self.message = message
+        self.futures = []
+        self.priority = priority
+        self.taken = False
+
+
+class IOWorker:
+    """Owns an instrument and executes the requests of many threads on a single thread.
+
+    The worker has the write() and query() methods of an instrument, so it can
+    be used wherever an instrument is expected.
+
+    Args:
+        instrument: A VISA instrument resource, or any object with compatible
+            write() and query() methods. It should not be used other than
+            through the worker once the worker has been created.
+        name: The name of the worker thread.
+    """
+
+    def __init__(self, instrument, name='dp800-io'):
+        self._inst = instrument
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._queue = []
+        self._pending_queries = {}
+        self._sequence = count()
+        self._closed = False
+        self._local = threading.local()
+        self.executed = 0
+        self.coalesced = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def instrument(self):
+        return self._inst
+
+    @property
+    def is_closed(self):
+        return self._closed
+
+    def __len__(self):
+        """The number of requests waiting to be executed."""
+        with self._lock:
+            return sum(1 for _, _, request in self._queue if not request.taken)
+
+    @contextmanager
+    def priority(self, priority):
+        """Set the priority of requests made by the current thread within a with-block."""
+        previous = getattr(self._local, 'priority', NORMAL)
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    @property
+    def current_priority(self):
+        """The priority of requests made by the current thread."""
+        return getattr(self._local, 'priority', NORMAL)
+
+    def submit_write(self, message, priority=None):
+        """Queue a message which expects no response.
+
+        Args:
+            message: The message.
+            priority: HIGH, NORMAL or LOW, or any integer, lower values being
+                executed first. Defaults to the current thread's priority.
+
+        Returns:
+            A Future whose result is that of the instrument's write().
+        """
+        return self._submit('write', message, priority)
+
+    def submit_query(self, message, priority=None):
+        """Queue a message and read its response, coalescing it with an identical pending read.
+
+        Returns:
+            A Future whose result is the response.
+        """
+        return self._submit('query', message, priority)
+
+    def write(self, message, timeout=None):
+        return self.submit_write(message).result(timeout)
+
+    def query(self, message, timeout=None):
+        return self.submit_query(message).result(timeout)
+
+    def close(self, timeout=None):
+        """Execute the requests already queued, then stop the worker thread."""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._available.notify()
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+    def _submit(self, kind, message, priority):
+        if priority is None:
+            priority = self.current_priority
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("I/O worker is closed")
+            request = self._pending_queries.get(message) if kind == 'query' else None
+            if request is not None:
+                self.coalesced += 1
+                if priority < request.priority:
+                    # Promote the request; the entry at its old priority will be skipped.
+                    request.priority = priority
+                    heapq.heappush(self._queue, (priority, next(self._sequence), request))
+            else:
+                request = _Request(kind, message, priority)
+                if kind == 'query' and is_coalescable(message):
+                    self._pending_queries[message] = request
+                heapq.heappush(self._queue, (priority, next(self._sequence), request))
+                self._available.notify()
+            request.futures.append(future)
+        return future
+
+    def _next_request(self):
+        with self._lock:
+            while True:
+                while self._queue:
+                    _, _, request = heapq.heappop(self._queue)
+                    if request.taken:
+                        continue
+                    request.taken = True
+                    if self._pending_queries.get(request.message) is request:
+                        del self._pending_queries[request.message]
+                    return request
+                if self._closed:
+                    return None
+                self._available.wait()
+
+    def _run(self):
+        while True:
+            request = self._next_request()
+            if request is None:
+                return
+            futures = [future for future in request.futures if future.set_running_or_notify_cancel()]
+            if not futures:
+                continue
+            try:
+                if request.kind == 'query':
+                    result = self._inst.query(request.message)
+                else:
+                    result = self._inst.write(request.message)
+            except BaseException as e:
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future in futures:
+                    future.set_result(result)
+            self.executed += 1
+
+
+class _SynchronizedCache:
+    """A StateCache whose operations are serialized by a lock, so that it may be shared between threads."""
+
+    def __init__(self, cache):
+        self._cache = cache
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._cache)
+
+    def __contains__(self, query):
+        with self._lock:
+            return query in self._cache
+
+    @property
+    def generation(self):
+        with self._lock:
+            return self._cache.generation
+
+    def ttl(self, category):
+        return self._cache.ttl(category)
+
+    @property
+    def queries(self):
+        with self._lock:
+            return self._cache.queries
+
+    def lookup(self, query):
+        with self._lock:
+            return self._cache.lookup(query)
+
+    def store(self, category, query, response):
+        with self._lock:
+            self._cache.store(category, query, response)
+
+    def store_read(self, category, query, response, generation):
+        with self._lock:
+            self._cache.store_read(category, query, response, generation)
+
+    def invalidate(self, *queries):
+        with self._lock:
+            self._cache.invalidate(*queries)
+
+    def suspend(self, *queries):
+        with self._lock:
+            self._cache.suspend(*queries)
+
+    def resume(self, *queries):
+        with self._lock:
+            self._cache.resume(*queries)
+
+    def category(self, query):
+        with self._lock:
+            return self._cache.category(query)
+
+
+class SharedDP832(DP832):
+    """A DP832 which may be used concurrently from many threads.
+
+    All messages are executed by an IOWorker. Batches are per-thread, so a
+    with-block of batch() buffers only the writes of the thread which entered
+    it. An error checker or pacer should not be attached, since their state
+    is not shared safely between threads.
+
+    Args:
+        instrument: A VISA instrument resource, or any object with compatible
+            write() and query() methods, or an IOWorker.
+        cache: As for DP832. It is guarded by a lock, and should not be used
+            other than through this DP832.
+        instrumentation: As for DP832.
+    """
+
+    def __init__(self, instrument, cache=None, instrumentation=None):
+        worker = instrument if isinstance(instrument, IOWorker) else IOWorker(instrument)
+        self._batches = threading.local()
+        self._worker = worker
+        if cache is not None:
+            cache = _SynchronizedCache(cache)
+        super().__init__(worker, cache=cache, instrumentation=instrumentation)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def _batch(self):
+        return getattr(self._batches, 'batch', None)
+
+    @_batch.setter
+    def _batch(self, batch):
+        self._batches.batch = batch
+
+    @property
+    def worker(self):
+        """The IOWorker executing the messages."""
+        return self._worker
+
+    def close(self, timeout=None):
+        """Stop the I/O worker once the requests already queued have been executed."""
+        self._worker.close(timeout)
@@ -0,0 +1,685 @@
+"""A simulated Rigol DP832, and a server exposing simulated instruments over TCP.
+
+The server speaks newline-terminated SCPI on raw sockets, like the real
+instrument on port 5555, so that transports, fleet scans and pipelining can be
+exercised end-to-end without hardware. Run it with:
+
+    python -m dp800.sim --count 4 --port 5555 --latency 0.002
+
+which serves four instruments on ports 5555 to 5558.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import deque
+
+from dp800.scpi import HEADER_SUFFIX_OUT_OF_RANGE, Dispatcher, SCPIError, keyword_matches
+from dp800.status import (
+    CONDITIONS, ESR_COMMAND_ERROR, ESR_EXECUTION_ERROR, ESR_OPERATION_COMPLETE, ISUM_CONSTANT_CURRENT,
+    ISUM_CONSTANT_VOLTAGE, ISUM_OVER_CURRENT, ISUM_OVER_VOLTAGE, QUESTIONABLE_INSTRUMENT, STB_ERROR_QUEUE,
+    STB_QUESTIONABLE, STB_SERVICE_REQUEST, STB_STANDARD_EVENT)
+
+
+class SimulatedDP832:
+    """A simulated Rigol DP832 which executes SCPI program messages in-process.
+
+    It has the write(message) and query(message) methods of a VISA resource, so
+    it may be passed directly to DP832.
+
+    Args:
+        serial: The serial number reported by *IDN?.
+        strict: If True, a message which cannot be executed raises SCPIError.
+            Otherwise the error is placed on the error queue, to be read with
+            :SYSTEM:ERROR?, as a real instrument would.
+    """
+
+    def __init__(self, serial='DP8A000001', strict=True):
+        self._serial = serial
+        self._strict = strict
+        self._errors = deque(maxlen=ERROR_QUEUE_LENGTH)
+        self._voltage_setpoint_step_default = 0.001
+        self._current_setpoint_step_default = 0.001
+        self._channel_states = [None, 'OFF', 'OFF', 'OFF']
+        self._channel_voltage_setpoint_levels = [None, 0.0, 0.0, 0.0]
+        self._channel_current_setpoint_levels = [None, 0.0, 0.0, 0.0]
+        self._channel_voltage_setpoint_step = [None] + [self._voltage_setpoint_step_default] * 3
+        self._channel_current_setpoint_step = [None] + [self._current_setpoint_step_default] * 3
+        self._channel_current_setpoint_step = [None, 0.001, 0.001, 0.001]
+        self._channel_voltage_protection_levels = [None, 33.0, 33.0, 5.5]
+        self._channel_current_protection_levels = [None, 3.3, 3.3, 3.3]  # Check!
+        self._channel_voltage_protection_states = [None, 'OFF', 'OFF', 'OFF']
+        self._channel_current_protection_states = [None, 'OFF', 'OFF', 'OFF']
+        self._channel_voltage_protection_tripped = [None, 'OFF', 'OFF', 'OFF']
+        self._channel_current_protection_tripped = [None, 'OFF', 'OFF', 'OFF']
+        self._channel_voltage_setpoint_step = [None, 0.001, 0.001, 0.001]
+        self._channel_voltage_measurements = [None, 0, 0, 0]
+        self._channel_current_measurements = [None, 0, 0, 0]
+        self._channel_modes = [None, 'CV', 'CV', 'CV']
+        self._selected_channel = 1
+        self._channel_timer_parameters = [None, {}, {}, {}]
+        self._channel_timer_groups = [None, 1, 1, 1]
+        self._channel_timer_cycles = [None, 1, 1, 1]  # None for infinite
+        self._channel_timer_end_states = [None, 'OFF', 'OFF', 'OFF']
+        self._channel_timer_started = [None, None, None, None]
+        self._standard_event_status = 0
+        self._standard_event_enable = 0
+        self._service_request_enable = 0
+        self._questionable_enable = 0
+        self._questionable_events = 0
+        self._questionable_condition = 0
+        self._questionable_instrument_enable = 0
+        self._questionable_instrument_events = 0
+        self._questionable_instrument_condition = 0
+        self._channel_isum_enables = [None, 0, 0, 0]
+        self._channel_isum_positive_transitions = [None] + [sum(bit for bit, _ in CONDITIONS)] * 3
+        self._channel_isum_negative_transitions = [None, 0, 0, 0]
+        self._channel_isum_events = [None, 0, 0, 0]
+        self._channel_isum_conditions = [None] + [self._isum_condition(index) for index in range(1, 4)]
+
+    def write(self, command):
+        self.query(command)
+
+    def query(self, command):
+        on_error = None if self._strict else self._record_error
+        for channel_index in range(1, len(RATINGS)):
+            self._advance_timer(channel_index)
+        self._update_status()
+        responses = [response.strip() for response in DISPATCHER.execute(self, command, on_error=on_error)]
+        self._update_status()
+        return ';'.join(responses) + '\n' if responses else None
+
+    def _channel_index(self, suffix):
+        """The channel index of a header suffix, the selected channel if it is omitted."""
+        if suffix is None:
+            return self._selected_channel
+        if not 1 <= suffix < len(RATINGS):
+            raise SCPIError(HEADER_SUFFIX_OUT_OF_RANGE, "Header suffix out of range")
+        return suffix
+
+    def _record_error(self, error):
+        self._errors.append(error)
+        self._standard_event_status |= ESR_COMMAND_ERROR if -200 < error.code <= -100 else ESR_EXECUTION_ERROR
+
+    def _isum_condition(self, channel_index):
+        condition = 0
+        mode = self._channel_modes[channel_index]
+        if mode == 'CC':
+            condition |= ISUM_CONSTANT_CURRENT
+        elif mode == 'CV':
+            condition |= ISUM_CONSTANT_VOLTAGE
+        if self._channel_voltage_protection_tripped[channel_index] == 'ON':
+            condition |= ISUM_OVER_VOLTAGE
+        if self._channel_current_protection_tripped[channel_index] == 'ON':
+            condition |= ISUM_OVER_CURRENT
+        return condition
+
+    def _update_status(self):
+        """Latch transitions of the channel conditions into their event registers.
+
+        The questionable instrument and questionable registers summarize the
+        enabled events of the registers below them, and latch each rising
+        summary bit until they are read or cleared, as the instrument does.
+        """
+        for channel_index in range(1, len(RATINGS)):
+            previous = self._channel_isum_conditions[channel_index]
+            condition = self._isum_condition(channel_index)
+            if condition != previous:
+                rising = condition & ~previous & self._channel_isum_positive_transitions[channel_index]
+                falling = previous & ~condition & self._channel_isum_negative_transitions[channel_index]
+                self._channel_isum_events[channel_index] |= rising | falling
+                self._channel_isum_conditions[channel_index] = condition
+        condition = sum(1 << channel_index for channel_index in range(1, len(RATINGS))
+                        if self._channel_isum_events[channel_index] & self._channel_isum_enables[channel_index])
+        self._questionable_instrument_events |= condition & ~self._questionable_instrument_condition
+        self._questionable_instrument_condition = condition
+        condition = (QUESTIONABLE_INSTRUMENT
+                     if self._questionable_instrument_events & self._questionable_instrument_enable else 0)
+        self._questionable_events |= condition & ~self._questionable_condition
+        self._questionable_condition = condition
+
+    def status_byte(self):
+        self._update_status()
+        status = 0
+        if self._errors:
+            status |= STB_ERROR_QUEUE
+        if self._questionable_events & self._questionable_enable:
+            status |= STB_QUESTIONABLE
+        if self._standard_event_status & self._standard_event_enable:
+            status |= STB_STANDARD_EVENT
+        if status & self._service_request_enable:
+            status |= STB_SERVICE_REQUEST
+        return status
+
+    def _clear_status_command(self):
+        self._errors.clear()
+        self._standard_event_status = 0
+        self._channel_isum_events = [None, 0, 0, 0]
+        self._questionable_instrument_events = 0
+        self._questionable_events = 0
+
+    def _operation_complete_command(self):
+        # The simulator executes each command as it is received, so all operations are already complete.
+        self._standard_event_status |= ESR_OPERATION_COMPLETE
+
+    def _operation_complete_query(self):
+        return '1\n'
+
+    def _wait_to_continue_command(self):
+        pass
+
+    def _standard_event_enable_command(self, mask):
+        self._standard_event_enable = int(mask)
+
+    def _standard_event_enable_query(self):
+        return '{}\n'.format(self._standard_event_enable)
+
+    def _standard_event_status_query(self):
+        status, self._standard_event_status = self._standard_event_status, 0
+        return '{}\n'.format(status)
+
+    def _service_request_enable_command(self, mask):
+        self._service_request_enable = int(mask)
+
+    def _service_request_enable_query(self):
+        return '{}\n'.format(self._service_request_enable)
+
+    def _status_byte_query(self):
+        return '{}\n'.format(self.status_byte())
+
+    def _questionable_event_query(self):
+        event, self._questionable_events = self._questionable_events, 0
+        return '{}\n'.format(event)
+
+    def _questionable_enable_command(self, mask):
+        self._questionable_enable = int(mask)
+
+    def _questionable_enable_query(self):
+        return '{}\n'.format(self._questionable_enable)
+
+    def _questionable_instrument_event_query(self):
+        event, self._questionable_instrument_events = self._questionable_instrument_events, 0
+        return '{}\n'.format(event)
+
+    def _questionable_instrument_enable_command(self, mask):
+        self._questionable_instrument_enable = int(mask)
+
+    def _questionable_instrument_enable_query(self):
+        return '{}\n'.format(self._questionable_instrument_enable)
+
+    def _isum_event_query(self, channel):
+        channel_index = self._channel_index(channel)
+        event, self._channel_isum_events[channel_index] = self._channel_isum_events[channel_index], 0
+        return '{}\n'.format(event)
+
+    def _isum_condition_query(self, channel):
+        return '{}\n'.format(self._channel_isum_conditions[self._channel_index(channel)])
+
+    def _isum_enable_command(self, channel, mask):
+        self._channel_isum_enables[self._channel_index(channel)] = int(mask)
+
+    def _isum_enable_query(self, channel):
+        return '{}\n'.format(self._channel_isum_enables[self._channel_index(channel)])
+
+    def _isum_positive_transition_command(self, channel, mask):
+        self._channel_isum_positive_transitions[self._channel_index(channel)] = int(mask)
+
+    def _isum_negative_transition_command(self, channel, mask):
+        self._channel_isum_negative_transitions[self._channel_index(channel)] = int(mask)
+
+    def _id_query(self):
+        return 'RIGOL TECHNOLOGIES,DP832,{},00.01.01\n'.format(self._serial)
+
+    def _error_query(self):
+        if not self._errors:
+            return '0,"No error"\n'
+        error = self._errors.popleft()
+        return '{},"{}"\n'.format(error.code, error.description)
+
+    def _output_state_command(self, channel, state):
+        channel_index = channel_argument(channel)
+        self._channel_states[channel_index] = boolean_argument(state)
+
+    def _output_state_query(self, channel):
+        channel_index = channel_argument(channel)
+        return self._channel_states[channel_index] + '\n'
+
+    def _output_mode_query(self, channel):
+        channel_index = channel_argument(channel)
+        return self._channel_modes[channel_index] + '\n'
+
+    def _voltage_setpoint_level_command(self, channel, voltage):
+        channel_index = self._channel_index(channel)
+        self._channel_voltage_setpoint_levels[channel_index] = float(voltage)
+
+    def _voltage_setpoint_level_query(self, channel):
+        channel_index = self._channel_index(channel)
+        return str(self._channel_voltage_setpoint_levels[channel_index]) + '\n'
+
+    def _current_setpoint_level_command(self, channel, current):
+        channel_index = self._channel_index(channel)
+        self._channel_current_setpoint_levels[channel_index] = float(current)
+
+    def _current_setpoint_level_query(self, channel):
+        channel_index = self._channel_index(channel)
+        return str(self._channel_current_setpoint_levels[channel_index]) + '\n'
+
+    def _voltage_setpoint_step_command(self, channel, value):
+        channel_index = self._channel_index(channel)
+        is_default = keyword_matches(value, 'DEFault')
+        increment = self._voltage_setpoint_step_default if is_default else float(value)
+        self._channel_voltage_setpoint_step[channel_index] = float(increment)
+
+    def _voltage_setpoint_step_query(self, channel, default=None):
+        channel_index = self._channel_index(channel)
+        is_default = keyword_matches(default, 'DEFault')
+        increment = self._voltage_setpoint_step_default if is_default else self._channel_voltage_setpoint_step[channel_index]
+        return str(increment) + '\n'
+
+    def _current_setpoint_step_command(self, channel, value):
+        channel_index = self._channel_index(channel)
+        is_default = keyword_matches(value, 'DEFault')
+        increment = self._current_setpoint_step_default if is_default else float(value)
+        self._channel_current_setpoint_step[channel_index] = float(increment)
+
+    def _current_setpoint_step_query(self, channel, default=None):
+        channel_index = self._channel_index(channel)
+        is_default = keyword_matches(default, 'DEFault')
+        increment = self._current_setpoint_step_default if is_default else self._channel_current_setpoint_step[channel_index]
+        return str(increment) + '\n'
+
+    def _voltage_protection_level_command(self, channel, voltage):
+        channel_index = self._channel_index(channel)
+        self._channel_voltage_protection_levels[channel_index] = float(voltage)
+
+    def _voltage_protection_level_query(self, channel, limit=None):
+        channel_index = self._channel_index(channel)
+        # TODO: Handle the limit flag
+        return str(self._channel_voltage_protection_levels[channel_index]) + '\n'
+
+    def _current_protection_level_command(self, channel, current):
+        channel_index = self._channel_index(channel)
+        self._channel_current_protection_levels[channel_index] = float(current)
+
+    def _current_protection_level_query(self, channel, limit=None):
+        channel_index = self._channel_index(channel)
+        # TODO: Handle the limit flag
+        return str(self._channel_current_protection_levels[channel_index]) + '\n'
+
+    def _voltage_protection_state_command(self, channel, state):
+        channel_index = self._channel_index(channel)
+        self._channel_voltage_protection_states[channel_index] = boolean_argument(state)
+
+    def _voltage_protection_state_query(self, channel):
+        channel_index = self._channel_index(channel)
+        return self._channel_voltage_protection_states[channel_index] + '\n'
+
+    def _current_protection_state_command(self, channel, state):
+        channel_index = self._channel_index(channel)
+        self._channel_current_protection_states[channel_index] = boolean_argument(state)
+
+    def _current_protection_state_query(self, channel):
+        channel_index = self._channel_index(channel)
+        return self._channel_current_protection_states[channel_index] + '\n'
+
+    def _voltage_protection_tripped_query(self, channel):
+        channel_index = self._channel_index(channel)
+        return self._channel_voltage_protection_tripped[channel_index] + '\n'
+
+    def _voltage_protection_clear_command(self, channel):
+        channel_index = self._channel_index(channel)
+        self._channel_voltage_protection_tripped[channel_index] = 'OFF'
+
+    def _current_protection_tripped_query(self, channel):
+        channel_index = self._channel_index(channel)
+        return self._channel_current_protection_tripped[channel_index] + '\n'
+
+    def _current_protection_clear_command(self, channel):
+        channel_index = self._channel_index(channel)
+        self._channel_current_protection_tripped[channel_index] = 'OFF'
+
+    def _voltage_measurement_query(self, channel):
+        channel_index = channel_argument(channel)
+        return "{:.3f}\n".format(self._channel_voltage_measurements[channel_index])
+
+    def _current_measurement_query(self, channel):
+        channel_index = channel_argument(channel)
+        return "{:.3f}\n".format(self._channel_current_measurements[channel_index])
+
+    def _power_measurement_query(self, channel):
+        channel_index = channel_argument(channel)
+        voltage = self._channel_voltage_measurements[channel_index]
+        current = self._channel_current_measurements[channel_index]
+        power = round(voltage*current, 3)
+        return "{:.3f}\n".format(power)
+
+    def _measure_all_query(self, channel):
+        channel_index = channel_argument(channel)
+        voltage = self._channel_voltage_measurements[channel_index]
+        current = self._channel_current_measurements[channel_index]
+        power = round(voltage*current, 3)
+        return "{:.3f},{:.3f},{:.3f}\n".format(voltage, current, power)
+
+    def _apply_query(self, channel):
+        channel_index = channel_argument(channel)
+        rated_voltage, rated_current = RATINGS[channel_index]
+        return "CH{}:{}V/{}A,{:.3f},{:.3f}\n".format(
+            channel_index, rated_voltage, rated_current,
+            self._channel_voltage_setpoint_levels[channel_index],
+            self._channel_current_setpoint_levels[channel_index])
+
+    def _select_number_command(self, channel):
+        channel_index = int(channel)
+        if not 1 <= channel_index < len(RATINGS):
+            raise IndexError(channel_index)
+        self._selected_channel = channel_index
+
+    def _select_number_query(self):
+        return '{}\n'.format(self._selected_channel)
+
+    def _timer_parameter_command(self, group, voltage, current, dwell):
+        group = int(group)
+        if not 1 <= group <= TIMER_GROUPS_MAX:
+            raise IndexError(group)
+        dwell = float(dwell)
+        if not TIMER_DWELL_MIN <= dwell <= TIMER_DWELL_MAX:
+            raise IndexError(dwell)
+        self._channel_timer_parameters[self._selected_channel][group] = (float(voltage), float(current), dwell)
+
+    def _timer_parameter_query(self, first, count=1):
+        parameters = self._channel_timer_parameters[self._selected_channel]
+        values = []
+        for group in range(int(first), int(first) + int(count)):
+            values.extend('{:.3f}'.format(value) for value in parameters.get(group, (0.0, 0.0, 1.0)))
+        return ','.join(values) + '\n'
+
+    def _timer_groups_command(self, groups):
+        groups = int(groups)
+        if not 1 <= groups <= TIMER_GROUPS_MAX:
+            raise IndexError(groups)
+        self._channel_timer_groups[self._selected_channel] = groups
+
+    def _timer_groups_query(self):
+        return '{}\n'.format(self._channel_timer_groups[self._selected_channel])
+
+    def _timer_cycles_command(self, mode, cycles=1):
+        if keyword_matches(mode, 'I'):
+            self._channel_timer_cycles[self._selected_channel] = None
+        elif keyword_matches(mode, 'N'):
+            self._channel_timer_cycles[self._selected_channel] = int(cycles)
+        else:
+            raise ValueError(mode)
+
+    def _timer_cycles_query(self):
+        cycles = self._channel_timer_cycles[self._selected_channel]
+        return 'I\n' if cycles is None else 'N,{}\n'.format(cycles)
+
+    def _timer_end_state_command(self, state):
+        if state not in ('OFF', 'LAST'):
+            raise ValueError(state)
+        self._channel_timer_end_states[self._selected_channel] = state
+
+    def _timer_end_state_query(self):
+        return self._channel_timer_end_states[self._selected_channel] + '\n'
+
+    def _timer_state_command(self, state):
+        channel_index = self._selected_channel
+        state = boolean_argument(state)
+        if state == 'ON':
+            self._channel_timer_started[channel_index] = time.monotonic()
+            self._channel_states[channel_index] = 'ON'
+            self._advance_timer(channel_index)
+        else:
+            self._channel_timer_started[channel_index] = None
+
+    def _timer_state_query(self):
+        channel_index = self._selected_channel
+        self._advance_timer(channel_index)
+        return ('OFF' if self._channel_timer_started[channel_index] is None else 'ON') + '\n'
+
+    def _advance_timer(self, channel_index):
+        """Apply the setpoints of the timer group due now, or end the sequence if it is complete."""
+        started = self._channel_timer_started[channel_index]
+        if started is None:
+            return
+        parameters = self._channel_timer_parameters[channel_index]
+        groups = [parameters.get(group, (0.0, 0.0, 1.0))
+                  for group in range(1, self._channel_timer_groups[channel_index] + 1)]
+        duration = sum(dwell for _, _, dwell in groups)
+        cycle, offset = divmod(time.monotonic() - started, duration)
+        cycles = self._channel_timer_cycles[channel_index]
+        if cycles is not None and cycle >= cycles:
+            self._channel_timer_started[channel_index] = None
+            if self._channel_timer_end_states[channel_index] == 'OFF':
+                self._channel_states[channel_index] = 'OFF'
+            else:
+                self._set_levels(channel_index, *groups[-1][:2])
+            return
+        for voltage, current, dwell in groups:
+            offset -= dwell
+            if offset < 0:
+                break
+        self._set_levels(channel_index, voltage, current)
+
+    def _set_levels(self, channel_index, voltage, current):
+        self._channel_voltage_setpoint_levels[channel_index] = voltage
+        self._channel_current_setpoint_levels[channel_index] = current
+
+
+ERROR_QUEUE_LENGTH = 16
+
+TIMER_GROUPS_MAX = 2048
+TIMER_DWELL_MIN = 1.0
+TIMER_DWELL_MAX = 99999.0
+
+RATINGS = [None, (30, 3), (30, 3), (5, 3)]
+
+
+def channel_argument(argument):
+    """Convert a channel argument such as 'CH1' into a channel index."""
+    if not (isinstance(argument, str) and argument.startswith('CH')):
+        raise ValueError("Invalid channel argument {!r}".format(argument))
+    channel_index = int(argument[2:])
+    if not 1 <= channel_index < len(RATINGS):
+        raise IndexError(channel_index)
+    return channel_index
+
+
+def boolean_argument(argument):
+    """Convert a boolean argument, ON, OFF, 1 or 0, into 'ON' or 'OFF'."""
+    if argument in ('ON', 1.0):
+        return 'ON'
+    if argument in ('OFF', 0.0):
+        return 'OFF'
+    raise ValueError("Invalid boolean argument {!r}".format(argument))
+
+
+ACTIONS = (
+    ('*IDN?', SimulatedDP832._id_query),
+    (':SYSTem:ERRor[:NEXT]?', SimulatedDP832._error_query),
+    ('*CLS', SimulatedDP832._clear_status_command),
+    ('*OPC', SimulatedDP832._operation_complete_command),
+    ('*OPC?', SimulatedDP832._operation_complete_query),
+    ('*WAI', SimulatedDP832._wait_to_continue_command),
+    ('*ESE', SimulatedDP832._standard_event_enable_command),
+    ('*ESE?', SimulatedDP832._standard_event_enable_query),
+    ('*ESR?', SimulatedDP832._standard_event_status_query),
+    ('*SRE', SimulatedDP832._service_request_enable_command),
+    ('*SRE?', SimulatedDP832._service_request_enable_query),
+    ('*STB?', SimulatedDP832._status_byte_query),
+    (':STATus:QUEStionable[:EVENt]?', SimulatedDP832._questionable_event_query),
+    (':STATus:QUEStionable:ENABle', SimulatedDP832._questionable_enable_command),
+    (':STATus:QUEStionable:ENABle?', SimulatedDP832._questionable_enable_query),
+    (':STATus:QUEStionable:INSTrument[:EVENt]?', SimulatedDP832._questionable_instrument_event_query),
+    (':STATus:QUEStionable:INSTrument:ENABle', SimulatedDP832._questionable_instrument_enable_command),
+    (':STATus:QUEStionable:INSTrument:ENABle?', SimulatedDP832._questionable_instrument_enable_query),
+    (':STATus:QUEStionable:INSTrument:ISUMmary#[:EVENt]?', SimulatedDP832._isum_event_query),
+    (':STATus:QUEStionable:INSTrument:ISUMmary#:CONDition?', SimulatedDP832._isum_condition_query),
+    (':STATus:QUEStionable:INSTrument:ISUMmary#:ENABle', SimulatedDP832._isum_enable_command),
+    (':STATus:QUEStionable:INSTrument:ISUMmary#:ENABle?', SimulatedDP832._isum_enable_query),
+    (':STATus:QUEStionable:INSTrument:ISUMmary#:PTRansition', SimulatedDP832._isum_positive_transition_command),
+    (':STATus:QUEStionable:INSTrument:ISUMmary#:NTRansition', SimulatedDP832._isum_negative_transition_command),
+    (':OUTPut[:STATe]', SimulatedDP832._output_state_command),
+    (':OUTPut[:STATe]?', SimulatedDP832._output_state_query),
+    (':OUTPut:MODE?', SimulatedDP832._output_mode_query),
+    (':SOURce#:VOLTage[:LEVel][:IMMediate][:AMPLitude]', SimulatedDP832._voltage_setpoint_level_command),
+    (':SOURce#:VOLTage[:LEVel][:IMMediate][:AMPLitude]?', SimulatedDP832._voltage_setpoint_level_query),
+    (':SOURce#:CURRent[:LEVel][:IMMediate][:AMPLitude]', SimulatedDP832._current_setpoint_level_command),
+    (':SOURce#:CURRent[:LEVel][:IMMediate][:AMPLitude]?', SimulatedDP832._current_setpoint_level_query),
+    (':SOURce#:VOLTage[:LEVel][:IMMediate]:STEP[:INCRement]', SimulatedDP832._voltage_setpoint_step_command),
+    (':SOURce#:VOLTage[:LEVel][:IMMediate]:STEP[:INCRement]?', SimulatedDP832._voltage_setpoint_step_query),
+    (':SOURce#:CURRent[:LEVel][:IMMediate]:STEP[:INCRement]', SimulatedDP832._current_setpoint_step_command),
+    (':SOURce#:CURRent[:LEVel][:IMMediate]:STEP[:INCRement]?', SimulatedDP832._current_setpoint_step_query),
+    (':SOURce#:VOLTage:PROTection[:LEVel]', SimulatedDP832._voltage_protection_level_command),
+    (':SOURce#:VOLTage:PROTection[:LEVel]?', SimulatedDP832._voltage_protection_level_query),
+    (':SOURce#:CURRent:PROTection[:LEVel]', SimulatedDP832._current_protection_level_command),
+    (':SOURce#:CURRent:PROTection[:LEVel]?', SimulatedDP832._current_protection_level_query),
+    (':SOURce#:VOLTage:PROTection:STATe', SimulatedDP832._voltage_protection_state_command),
+    (':SOURce#:VOLTage:PROTection:STATe?', SimulatedDP832._voltage_protection_state_query),
+    (':SOURce#:CURRent:PROTection:STATe', SimulatedDP832._current_protection_state_command),
+    (':SOURce#:CURRent:PROTection:STATe?', SimulatedDP832._current_protection_state_query),
+    (':SOURce#:VOLTage:PROTection:TRIPped?', SimulatedDP832._voltage_protection_tripped_query),
+    (':SOURce#:VOLTage:PROTection:CLEar', SimulatedDP832._voltage_protection_clear_command),
+    (':SOURce#:CURRent:PROTection:TRIPped?', SimulatedDP832._current_protection_tripped_query),
+    (':SOURce#:CURRent:PROTection:CLEar', SimulatedDP832._current_protection_clear_command),
+    (':MEASure:VOLTage[:DC]?', SimulatedDP832._voltage_measurement_query),
+    (':MEASure:CURRent[:DC]?', SimulatedDP832._current_measurement_query),
+    (':MEASure:POWEr[:DC]?', SimulatedDP832._power_measurement_query),
+    (':MEASure:ALL[:DC]?', SimulatedDP832._measure_all_query),
+    (':APPLy?', SimulatedDP832._apply_query),
+    (':INSTrument:NSELect', SimulatedDP832._select_number_command),
+    (':INSTrument:NSELect?', SimulatedDP832._select_number_query),
+    (':TIMEr:PARAmeter', SimulatedDP832._timer_parameter_command),
+    (':TIMEr:PARAmeter?', SimulatedDP832._timer_parameter_query),
+    (':TIMEr:GROUPs', SimulatedDP832._timer_groups_command),
+    (':TIMEr:GROUPs?', SimulatedDP832._timer_groups_query),
+    (':TIMEr:CYCLEs', SimulatedDP832._timer_cycles_command),
+    (':TIMEr:CYCLEs?', SimulatedDP832._timer_cycles_query),
+    (':TIMEr:ENDState', SimulatedDP832._timer_end_state_command),
+    (':TIMEr:ENDState?', SimulatedDP832._timer_end_state_query),
+    (':TIMEr[:STATe]', SimulatedDP832._timer_state_command),
+    (':TIMEr[:STATe]?', SimulatedDP832._timer_state_query),
+)
+
+DISPATCHER = Dispatcher()
+for pattern, function in ACTIONS:
+    DISPATCHER.register(pattern, function)
+
+
+class SimulatorServer:
+    """An asyncio server exposing simulated instruments on consecutive TCP ports.
+
+    Each instrument serves any number of concurrent clients. Messages to one
+    instrument are executed one at a time, each after the configured latency,
+    so that the throughput of the simulated instrument is bounded like that of
+    a real one.
+
+    Args:
+        instruments: An iterable of SimulatedDP832.
+        host: The interface to listen on.
+        port: The port of the first instrument; the others follow consecutively.
+            Zero assigns an ephemeral port to each instrument.
+        latency: The mean processing latency per message in seconds.
+        jitter: The maximum deviation from the mean latency in seconds.
+    """
+
+    def __init__(self, instruments, host='127.0.0.1', port=5555, latency=0.0, jitter=0.0):
+        self._instruments = list(instruments)
+        self._host = host
+        self._port = port
+        self._latency = latency
+        self._jitter = jitter
+        self._random = random.Random()
+        self._servers = []
+
+    @property
+    def instruments(self):
+        return list(self._instruments)
+
+    @property
+    def addresses(self):
+        """The (host, port) address of each instrument, once started."""
+        return [server.sockets[0].getsockname()[:2] for server in self._servers]
+
+    async def start(self):
+        for index, instrument in enumerate(self._instruments):
+            port = 0 if self._port == 0 else self._port + index
+            lock = asyncio.Lock()
+
+            async def handle(reader, writer, instrument=instrument, lock=lock):
+                await self._serve_client(instrument, lock, reader, writer)
+
+            self._servers.append(await asyncio.start_server(handle, self._host, port))
+        return self
+
+    async def serve_forever(self):
+        await asyncio.gather(*(server.serve_forever() for server in self._servers))
+
+    async def stop(self):
+        for server in self._servers:
+            server.close()
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    def _delay(self):
+        delay = self._latency
+        if self._jitter:
+            delay += self._random.uniform(-self._jitter, self._jitter)
+        return max(delay, 0.0)
+
+    async def _serve_client(self, instrument, lock, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = line.decode('ascii', errors='replace').strip()
+                if not message:
+                    continue
+                async with lock:
+                    delay = self._delay()
+                    if delay:
+                        await asyncio.sleep(delay)
+                    response = instrument.query(message)
+                if response is not None:
+                    writer.write(response.encode('ascii'))
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m dp800.sim', description="Serve simulated Rigol DP832 instruments over TCP.")
+    parser.add_argument('--count', type=int, default=1, help="Number of instruments to simulate.")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to listen on.")
+    parser.add_argument('--port', type=int, default=5555, help="Port of the first instrument.")
+    parser.add_argument('--latency', type=float, default=0.0, help="Mean processing latency per message in seconds.")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Maximum latency jitter in seconds.")
+    args = parser.parse_args(argv)
+
+    instruments = [SimulatedDP832(serial='DP8A{:06d}'.format(index + 1), strict=False) for index in range(args.count)]
+    server = SimulatorServer(instruments, host=args.host, port=args.port, latency=args.latency, jitter=args.jitter)
+
+    async def run():
+        await server.start()
+        for instrument, (host, port) in zip(instruments, server.addresses):
+            print("Simulating DP832 {} on {}:{}".format(instrument._serial, host, port), flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""Capture and diff-based restoration of the whole configuration of a DP832.
+
+    baseline = dp832.snapshot()
+    ...
+    dp832.restore(baseline)
+
+A snapshot reads every setpoint, step increment, protection level, protection
+state and output state in a single round trip, taking values from the state
+cache where it holds them. Restoring compares the snapshot with the current
+configuration and writes only the parameters which differ, coalesced into as
+few messages as possible, and ordered so that the instrument never passes
+through an unsafe intermediate state: outputs being switched off are switched
+off first, a protection level is never below the setpoint it guards, and
+outputs being switched on are switched on last.
+"""
+from collections import namedtuple
+
+from dp800.cache import SETPOINT_LEVEL, STEP_INCREMENT, PROTECTION_LEVEL, PROTECTION_IS_ENABLED
+from dp800.dp800 import BOOLEAN_RESPONSES, from_boolean_response
+
+
+ChannelConfiguration = namedtuple('ChannelConfiguration', [
+    'channel_id',
+    'voltage_level', 'current_level',
+    'voltage_step', 'current_step',
+    'over_voltage_level', 'over_current_level',
+    'over_voltage_enabled', 'over_current_enabled',
+    'is_on'])
+ChannelConfiguration.__doc__ = """The configuration of one channel.
+
+Levels and steps are floats in volts or amps; the remaining fields are bools.
+"""
+
+Snapshot = namedtuple('Snapshot', ['channels'])
+Snapshot.__doc__ = """The configuration of a whole instrument.
+
+channels: A tuple of ChannelConfiguration, in channel order.
+"""
+
+
+# The order in which parameters are restored. Outputs are switched off first
+# and on last. Protection levels which rise are set before the setpoints, and
+# those which fall after them, so that whether the setpoints rise or fall a
+# live output never has a setpoint above its protection level. Protection is
+# enabled only once the setpoints it guards are in place.
+_RISING = '+'
+_FALLING = '-'
+
+_RESTORE_ORDER = (
+    'over_voltage_level' + _RISING, 'over_current_level' + _RISING,
+    'voltage_step', 'current_step',
+    'voltage_level', 'current_level',
+    'over_voltage_level' + _FALLING, 'over_current_level' + _FALLING,
+    'over_voltage_enabled', 'over_current_enabled',
+)
+
+_PROTECTION_LEVELS = ('over_voltage_level', 'over_current_level')
+
+_Parameter = namedtuple('_Parameter', ['field', 'query', 'command', 'category', 'is_boolean'])
+
+
+def _channel_parameters(channel):
+    """The parameters of a channel, in ChannelConfiguration field order, excluding channel_id."""
+    voltage = channel.voltage
+    current = channel.current
+    return (
+        _Parameter('voltage_level', voltage.setpoint._level_query, voltage.setpoint._level_command,
+                   SETPOINT_LEVEL, False),
+        _Parameter('current_level', current.setpoint._level_query, current.setpoint._level_command,
+                   SETPOINT_LEVEL, False),
+        _Parameter('voltage_step', voltage.setpoint.step._increment_query, voltage.setpoint.step._increment_command,
+                   STEP_INCREMENT, False),
+        _Parameter('current_step', current.setpoint.step._increment_query, current.setpoint.step._increment_command,
+                   STEP_INCREMENT, False),
+        _Parameter('over_voltage_level', voltage.protection._level_query, voltage.protection._level_command,
+                   PROTECTION_LEVEL, False),
+        _Parameter('over_current_level', current.protection._level_query, current.protection._level_command,
+                   PROTECTION_LEVEL, False),
+        _Parameter('over_voltage_enabled', voltage.protection._state_query, voltage.protection._state_command,
+                   PROTECTION_IS_ENABLED, True),
+        _Parameter('over_current_enabled', current.protection._state_query, current.protection._state_command,
+                   PROTECTION_IS_ENABLED, True),
+        _Parameter('is_on', channel._state_query, None, None, True),
+    )
+
+
+def _parse(parameter, response):
+    try:
+        if parameter.is_boolean:
+            return from_boolean_response(response)
+        return float(response)
+    except ValueError as e:
+        raise RuntimeError("Unexpected response to {}: {!r}".format(parameter.query, response)) from e
+
+
+def _format(parameter, value):
+    if parameter.is_boolean:
+        return BOOLEAN_RESPONSES[bool(value)]
+    return format(value, '.3f')
+
+
+def snapshot(dp832):
+    """Capture the configuration of every channel.
+
+    Values held in the device's state cache are used as they are; all the
+    others are read in a single round trip, and those of cacheable categories
+    are then cached.
+
+    Returns:
+        A Snapshot.
+    """
+    cache = dp832.cache
+    channel_parameters = [(channel_id, _channel_parameters(dp832.channel(channel_id)))
+                          for channel_id in dp832.channel_ids]
+    responses = {}
+    pending = []
+    for _, parameters in channel_parameters:
+        for parameter in parameters:
+            response = None
+            if cache is not None and parameter.category is not None:
+                response = cache.lookup(parameter.query)
+            if response is None:
+                pending.append(parameter)
+            else:
+                responses[parameter.query] = response
+    if pending:
+        generation = None if cache is None else cache.generation
+        for parameter, response in zip(pending, dp832.query_many(parameter.query for parameter in pending)):
+            responses[parameter.query] = response
+            if cache is not None and parameter.category is not None:
+                cache.store_read(parameter.category, parameter.query, response, generation)
+    channels = []
+    for channel_id, parameters in channel_parameters:
+        values = [_parse(parameter, responses[parameter.query]) for parameter in parameters]
+        channels.append(ChannelConfiguration(channel_id, *values))
+    return Snapshot(tuple(channels))
+
+
+def restore_commands(dp832, target, current):
+    """Compute the commands which change the configuration from current to target, in a safe order.
+
+    Args:
+        dp832: The DP832.
+        target: The Snapshot to restore.
+        current: A Snapshot of the present configuration.
+
+    Returns:
+        A list of (command, parameter, text) triples, where parameter
+        describes the value written and text is its formatted value.
+    """
+    current_channels = {configuration.channel_id: configuration for configuration in current.channels}
+    switch_off = []
+    settings = {field: [] for field in _RESTORE_ORDER}
+    switch_on = []
+    for configuration in target.channels:
+        channel = dp832.channel(configuration.channel_id)
+        present = current_channels[configuration.channel_id]
+        for parameter in _channel_parameters(channel):
+            wanted = getattr(configuration, parameter.field)
+            text = _format(parameter, wanted)
+            existing = getattr(present, parameter.field)
+            if text == _format(parameter, existing):
+                continue
+            if parameter.field == 'is_on':
+                command = channel._state_commands[bool(wanted)]
+                (switch_on if wanted else switch_off).append((command, parameter, text))
+            elif parameter.field in _PROTECTION_LEVELS:
+                phase = parameter.field + (_RISING if wanted > existing else _FALLING)
+                settings[phase].append((parameter.command + text, parameter, text))
+            else:
+                settings[parameter.field].append((parameter.command + text, parameter, text))
+    ordered = list(switch_off)
+    for field in _RESTORE_ORDER:
+        ordered.extend(settings[field])
+    ordered.extend(switch_on)
+    return ordered
+
+
+def restore(dp832, target, current=None):
+    """Restore a Snapshot, writing only the parameters which differ from the present configuration.
+
+    Args:
+        dp832: The DP832.
+        target: The Snapshot to restore.
+        current: An optional Snapshot of the present configuration. By default
+            it is taken with snapshot(), which uses the state cache.
+
+    Returns:
+        The number of parameters written.
+    """
+    if current is None:
+        current = snapshot(dp832)
+    changes = restore_commands(dp832, target, current)
+    if not changes:
+        return 0
+    with dp832.batch():
+        dp832.write_many(command for command, _, _ in changes)
+    cache = dp832.cache
+    if cache is not None:
+        for _, parameter, text in changes:
+            if parameter.category is not None:
+                cache.store(parameter.category, parameter.query, text)
+    return len(changes)
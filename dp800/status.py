@@ -0,0 +1,268 @@
+"""Event-driven notification of channel conditions through the SCPI status system.
+
+Rather than reading every condition of every channel on each poll, a
+StatusMonitor configures the instrument's status registers so that any change
+of regulation mode or protection trip on any channel is summarized in the
+status byte. The instrument is then watched through service requests where
+the transport supports them, or otherwise by polling *STB? alone, and the
+registers which identify the channel and condition are read only when the
+status byte shows that something has changed:
+
+    monitor = dp832.status_monitor()
+    monitor.add_callback(print)
+    monitor.start()
+
+The register layout follows the DP800 programming guide: each channel has a
+questionable instrument summary register, ISUMmary<n>, whose bits are
+summarized in bit n of the questionable instrument register, which is in turn
+summarized in the questionable status register and then in the status byte.
+The questionable instrument and questionable event registers latch, so they
+are read, and so cleared, along with the summary registers whenever a change
+is decoded; otherwise the status byte would go on signalling a change which
+has already been handled.
+
+Callbacks run on the thread which calls check() or wait(). An exception raised
+by a callback is logged and does not prevent the other callbacks, or later
+events, from being dispatched.
+
+A monitor started with start() talks to the instrument from its own thread, so
+while it runs the DP832 must not be used from other threads unless it is a
+dp800.shared.SharedDP832. An error reading the instrument, such as a timeout,
+is logged and polling resumes after a delay which doubles with each
+consecutive failure, up to MAX_ERROR_BACKOFF; the thread ends only when the
+monitor is stopped.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from dp800.instrumentation import is_timeout
+
+
+logger = logging.getLogger(__name__)
+
+# The longest delay, in seconds, before polling again after consecutive failures.
+MAX_ERROR_BACKOFF = 5.0
+
+# Status byte bits, as reported by *STB?.
+STB_ERROR_QUEUE = 0x04
+STB_QUESTIONABLE = 0x08
+STB_MESSAGE_AVAILABLE = 0x10
+STB_STANDARD_EVENT = 0x20
+STB_SERVICE_REQUEST = 0x40
+STB_OPERATION = 0x80
+
+# Standard event status register bits, as reported by *ESR?.
+ESR_OPERATION_COMPLETE = 0x01
+ESR_QUERY_ERROR = 0x04
+ESR_DEVICE_ERROR = 0x08
+ESR_EXECUTION_ERROR = 0x10
+ESR_COMMAND_ERROR = 0x20
+ESR_POWER_ON = 0x80
+
+ESR_ERRORS = ESR_QUERY_ERROR | ESR_DEVICE_ERROR | ESR_EXECUTION_ERROR | ESR_COMMAND_ERROR
+
+# The bit of the questionable status register summarizing the questionable instrument register.
+QUESTIONABLE_INSTRUMENT = 0x2000
+
+# Questionable instrument summary register bits, one register per channel.
+ISUM_CONSTANT_CURRENT = 0x01
+ISUM_CONSTANT_VOLTAGE = 0x02
+ISUM_OVER_VOLTAGE = 0x04
+ISUM_OVER_CURRENT = 0x08
+
+ISUM_ALL = ISUM_CONSTANT_CURRENT | ISUM_CONSTANT_VOLTAGE | ISUM_OVER_VOLTAGE | ISUM_OVER_CURRENT
+
+CONDITIONS = (
+    (ISUM_CONSTANT_CURRENT, 'constant_current'),
+    (ISUM_CONSTANT_VOLTAGE, 'constant_voltage'),
+    (ISUM_OVER_VOLTAGE, 'over_voltage_tripped'),
+    (ISUM_OVER_CURRENT, 'over_current_tripped'),
+)
+
+STANDARD_EVENTS = (
+    (ESR_OPERATION_COMPLETE, 'operation_complete'),
+    (ESR_QUERY_ERROR, 'query_error'),
+    (ESR_DEVICE_ERROR, 'device_error'),
+    (ESR_EXECUTION_ERROR, 'execution_error'),
+    (ESR_COMMAND_ERROR, 'command_error'),
+    (ESR_POWER_ON, 'power_on'),
+)
+
+
+StatusEvent = namedtuple('StatusEvent', ['channel_id', 'condition', 'active', 'timestamp'])
+StatusEvent.__doc__ = """A change of condition reported by the status system.
+
+channel_id: The channel id, or None for a standard event.
+condition: The name of the condition, from CONDITIONS or STANDARD_EVENTS.
+active: Whether the condition is now present. Standard events are always active.
+timestamp: The wall-clock time at which the change was decoded.
+"""
+
+
+class StatusMonitor:
+    """Watches the status byte of a DP832 and decodes the changes it signals.
+
+    Args:
+        dp832: The DP832 to monitor.
+        poll_interval: The interval in seconds between *STB? polls when the
+            transport does not support service requests, and the longest wait
+            for a service request before checking whether to stop.
+        use_srq: Whether to wait for service requests if the transport has a
+            wait_for_srq() method, as VISA GPIB and USBTMC resources do.
+    """
+
+    def __init__(self, dp832, poll_interval=0.1, use_srq=True):
+        self._dp832 = dp832
+        self._poll_interval = poll_interval
+        self._wait_for_srq = getattr(dp832._inst, 'wait_for_srq', None) if use_srq else None
+        channel_ids = dp832.channel_ids
+        # The latched summary registers, read first so that a change latched
+        # while the message executes is not lost when they are cleared.
+        self._summary_queries = [':STATUS:QUESTIONABLE?', ':STATUS:QUESTIONABLE:INSTRUMENT?']
+        self._event_queries = [':STATUS:QUESTIONABLE:INSTRUMENT:ISUMMARY{}?'.format(channel_id)
+                               for channel_id in channel_ids]
+        self._condition_queries = [':STATUS:QUESTIONABLE:INSTRUMENT:ISUMMARY{}:CONDITION?'.format(channel_id)
+                                   for channel_id in channel_ids]
+        self._callbacks = []
+        self._stopped = threading.Event()
+        self._thread = None
+        self.exception = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def uses_srq(self):
+        """True if the monitor waits for service requests rather than polling."""
+        return self._wait_for_srq is not None
+
+    def configure(self):
+        """Enable the status registers so that any change of condition requests service.
+
+        Both rising and falling transitions of every channel condition are
+        latched, and standard error events are enabled too. Pending events are
+        cleared. All the settings are sent in a single message.
+        """
+        commands = ['*CLS']
+        for channel_id in self._dp832.channel_ids:
+            header = ':STATUS:QUESTIONABLE:INSTRUMENT:ISUMMARY{}'.format(channel_id)
+            commands.append('{}:ENABLE {}'.format(header, ISUM_ALL))
+            commands.append('{}:PTRANSITION {}'.format(header, ISUM_ALL))
+            commands.append('{}:NTRANSITION {}'.format(header, ISUM_ALL))
+        instrument_mask = sum(1 << channel_id for channel_id in self._dp832.channel_ids)
+        commands.append(':STATUS:QUESTIONABLE:INSTRUMENT:ENABLE {}'.format(instrument_mask))
+        commands.append(':STATUS:QUESTIONABLE:ENABLE {}'.format(QUESTIONABLE_INSTRUMENT))
+        commands.append('*ESE {}'.format(ESR_ERRORS))
+        commands.append('*SRE {}'.format(STB_QUESTIONABLE | STB_STANDARD_EVENT))
+        self._dp832.write_many(commands)
+
+    def add_callback(self, callback):
+        """Register a callable to receive each StatusEvent."""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        self._callbacks.remove(callback)
+
+    def check(self):
+        """Read the status byte and, only if it signals a change, decode and dispatch it.
+
+        Returns:
+            A list of the StatusEvents decoded, empty if nothing changed.
+        """
+        status_byte = int(float(self._dp832.query('*STB?')))
+        if not status_byte & (STB_QUESTIONABLE | STB_STANDARD_EVENT):
+            return []
+        return self._decode(status_byte)
+
+    def _decode(self, status_byte):
+        commands = []
+        if status_byte & STB_QUESTIONABLE:
+            commands.extend(self._summary_queries)
+            commands.extend(self._event_queries)
+            commands.extend(self._condition_queries)
+        if status_byte & STB_STANDARD_EVENT:
+            commands.append('*ESR?')
+        responses = [int(float(response)) for response in self._dp832.query_many(commands)]
+        timestamp = time.time()
+        events = []
+        if status_byte & STB_QUESTIONABLE:
+            num_channels = len(self._event_queries)
+            start = len(self._summary_queries)
+            channel_events = responses[start:start + num_channels]
+            conditions = responses[start + num_channels:start + 2 * num_channels]
+            for channel_id, event, condition in zip(self._dp832.channel_ids, channel_events, conditions):
+                for bit, name in CONDITIONS:
+                    if event & bit:
+                        events.append(StatusEvent(channel_id, name, bool(condition & bit), timestamp))
+        if status_byte & STB_STANDARD_EVENT:
+            standard_events = responses[-1]
+            for bit, name in STANDARD_EVENTS:
+                if standard_events & bit:
+                    events.append(StatusEvent(None, name, True, timestamp))
+        for event in events:
+            for callback in self._callbacks:
+                try:
+                    callback(event)
+                except Exception:
+                    logger.exception("Status callback %r failed for %s", callback, event)
+        return events
+
+    def wait(self, timeout=None):
+        """Wait until the status byte signals a change, or timeout seconds elapse.
+
+        Returns:
+            A list of the StatusEvents decoded, empty on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._stopped.is_set():
+            remaining = self._poll_interval if deadline is None else min(self._poll_interval,
+                                                                         deadline - time.monotonic())
+            if self._wait_for_srq is not None:
+                try:
+                    self._wait_for_srq(max(1, int(remaining * 1000)))
+                except Exception as e:
+                    if not is_timeout(e):
+                        raise
+            events = self.check()
+            if events:
+                return events
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
+            if self._wait_for_srq is None:
+                self._stopped.wait(max(0.0, remaining))
+        return []
+
+    def start(self):
+        """Configure the instrument and start dispatching events from a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.configure()
+        self._stopped.clear()
+        self.exception = None
+        self._thread = threading.Thread(target=self._run, name='dp800-status', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        backoff = 0.0
+        while not self._stopped.is_set():
+            try:
+                self.wait()
+            except Exception as e:
+                self.exception = e
+                backoff = min(max(2 * backoff, self._poll_interval), MAX_ERROR_BACKOFF)
+                logger.error("Status monitor poll failed, retrying in %g s: %s", backoff, e)
+                self._stopped.wait(backoff)
+            else:
+                backoff = 0.0
@@ -0,0 +1,81 @@
+"""Pipelined current-voltage characterization sweeps.
+
+A sweep steps the voltage setpoint of a channel through a sequence of levels,
+measuring voltage, current and power at each once it has settled. Each program
+message carries the measurements of one point together with the setpoint of the
+next, so a sweep of n points costs a single write of the first setpoint and then
+n query round trips, and the settle time of each point is the only delay between
+them:
+
+    result = channel.iv_sweep(np.linspace(0.1, 5.0, 50), settle=0.05, samples_per_point=4)
+    resistance = result.voltage / result.current
+
+This module depends on NumPy.
+"""
+import time
+from collections import namedtuple
+
+import numpy as np
+
+
+IVSweep = namedtuple('IVSweep', ['setpoint', 'voltage', 'current', 'power'])
+IVSweep.__doc__ = """The result of an I-V sweep, as contiguous float arrays of equal length.
+
+setpoint: The voltage setpoint of each point, in volts.
+voltage: The mean measured voltage at each point, in volts.
+current: The mean measured current at each point, in amps.
+power: The mean measured power at each point, in watts.
+"""
+
+
+def iv_sweep(channel, levels, settle=0.0, samples_per_point=1):
+    """Sweep the voltage setpoint of a channel, measuring at each level.
+
+    The setpoint is left at the last level of the sweep.
+
+    Args:
+        channel: The Channel to sweep.
+        levels: A sequence of voltage setpoints, in volts.
+        settle: The time in seconds to wait after setting each level before
+            measuring.
+        samples_per_point: The number of measurements to average at each level.
+
+    Returns:
+        An IVSweep.
+    """
+    levels = np.array(levels, dtype=float)
+    if levels.ndim != 1 or len(levels) == 0:
+        raise ValueError("Levels must be a non-empty one-dimensional sequence")
+    if settle < 0:
+        raise ValueError("Settle time {} s is negative".format(settle))
+    if samples_per_point < 1:
+        raise ValueError("Samples per point {} is less than one".format(samples_per_point))
+    setpoint = channel.voltage.setpoint
+    channel.voltage.check_range(float(levels.min()))
+    channel.voltage.check_range(float(levels.max()))
+
+    device = channel.device
+    measure_commands = [channel._measure_all_query] * samples_per_point
+    level_commands = [setpoint._level_command + format(level, '.3f') for level in levels]
+    samples = np.empty((len(levels), samples_per_point, 3))
+    settle_ns = int(settle * 1e9)
+
+    device.invalidate(setpoint._level_query)
+    device.write(level_commands[0])
+    deadline = time.monotonic_ns() + settle_ns
+    for index in range(len(levels)):
+        remaining = deadline - time.monotonic_ns()
+        if remaining > 0:
+            time.sleep(remaining / 1e9)
+        commands = measure_commands
+        if index + 1 < len(levels):
+            commands = measure_commands + [level_commands[index + 1]]
+        responses = device.query_many(commands)
+        deadline = time.monotonic_ns() + settle_ns
+        samples[index] = np.array(','.join(responses).split(','), dtype=float).reshape(samples_per_point, 3)
+
+    means = samples.mean(axis=1)
+    return IVSweep(levels,
+                   np.ascontiguousarray(means[:, 0]),
+                   np.ascontiguousarray(means[:, 1]),
+                   np.ascontiguousarray(means[:, 2]))
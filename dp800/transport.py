@@ -0,0 +1,209 @@
+"""A raw-socket SCPI transport, usable in place of a VISA resource.
+
+The DP800 series accepts newline-terminated SCPI on TCP port 5555. Talking to
+it directly avoids the import, connection and per-call overhead of a VISA
+stack:
+
+    dp832 = DP832(SocketTransport('10.0.0.145'))
+"""
+import socket
+import threading
+from collections import defaultdict
+
+
+DEFAULT_PORT = 5555
+
+
+class SocketTransport:
+    """A persistent TCP connection speaking newline-terminated SCPI.
+
+    Nagle's algorithm is disabled so that short commands are sent immediately,
+    and a single receive buffer is reused for all responses.
+
+    Args:
+        host: The host name or address of the instrument.
+        port: The TCP port of the instrument.
+        timeout: The timeout in seconds for connecting and for each response.
+        encoding: The character encoding of messages.
+        buffer_size: The initial size of the receive buffer in bytes. It grows
+            as needed to hold long responses.
+    """
+
+    def __init__(self, host, port=DEFAULT_PORT, timeout=5.0, encoding='ascii', buffer_size=4096):
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self._encoding = encoding
+        self._socket = None
+        self._buffer = bytearray(buffer_size)
+        self._start = 0
+        self._end = 0
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def address(self):
+        return self._host, self._port
+
+    @property
+    def is_open(self):
+        return self._socket is not None
+
+    def open(self):
+        if self._socket is None:
+            sock = socket.create_connection((self._host, self._port), timeout=self._timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._socket = sock
+            self._start = self._end = 0
+        return self
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            finally:
+                self._socket = None
+                self._start = self._end = 0
+
+    def write(self, message):
+        """Send a message, which must not contain a newline."""
+        self._send(message.encode(self._encoding) + b'\n')
+
+    def read(self):
+        """Read one response, including its terminating newline."""
+        return self._read_line().decode(self._encoding)
+
+    def query(self, message):
+        """Send a message and read its response."""
+        self.write(message)
+        return self.read()
+
+    def pipeline(self, messages):
+        """Send several messages back-to-back, then read the responses to those which are queries.
+
+        All the messages are sent before any response is read, so the whole group
+        costs a single network round trip even though each message is executed
+        separately by the instrument.
+
+        Args:
+            messages: An iterable of messages.
+
+        Returns:
+            A list of responses, one for each message whose header ends in '?'.
+        """
+        messages = list(messages)
+        self._send(b''.join(message.encode(self._encoding) + b'\n' for message in messages))
+        num_responses = sum(1 for message in messages if _expects_response(message))
+        return [self.read() for _ in range(num_responses)]
+
+    def _send(self, data):
+        self.open()
+        try:
+            self._socket.sendall(data)
+        except OSError:
+            self.close()
+            raise
+
+    def _read_line(self):
+        self.open()
+        buffer = self._buffer
+        while True:
+            index = buffer.find(b'\n', self._start, self._end)
+            if index >= 0:
+                line = bytes(buffer[self._start:index + 1])
+                self._start = index + 1
+                if self._start == self._end:
+                    self._start = self._end = 0
+                return line
+            if self._end == len(buffer):
+                if self._start > 0:
+                    remaining = self._end - self._start
+                    buffer[:remaining] = buffer[self._start:self._end]
+                    self._start, self._end = 0, remaining
+                else:
+                    buffer.extend(bytes(len(buffer)))
+            try:
+                received = self._socket.recv_into(memoryview(buffer)[self._end:])
+            except OSError:
+                self.close()
+                raise
+            if received == 0:
+                self.close()
+                raise ConnectionError("Connection to {}:{} closed by instrument".format(self._host, self._port))
+            self._end += received
+
+
+def _expects_response(message):
+    return any(unit.split(None, 1)[0].endswith('?') for unit in message.split(';') if unit.strip())
+
+
+class ConnectionPool:
+    """A pool of SocketTransports keyed by instrument address.
+
+    Connections released to the pool are kept open for reuse, up to max_idle
+    per address. The pool may be shared between threads, though each acquired
+    transport must be used by one thread at a time.
+
+    Args:
+        max_idle: The maximum number of idle connections kept per address.
+        **kwargs: Keyword arguments for each SocketTransport.
+    """
+
+    def __init__(self, max_idle=2, **kwargs):
+        self._max_idle = max_idle
+        self._kwargs = kwargs
+        self._idle = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def acquire(self, host, port=DEFAULT_PORT):
+        """Take an open transport to the given address, reusing an idle one if available."""
+        with self._lock:
+            idle = self._idle.get((host, port))
+            if idle:
+                return idle.pop()
+        return SocketTransport(host, port, **self._kwargs).open()
+
+    def release(self, transport):
+        """Return a transport to the pool, closing it if the pool is full or it has failed."""
+        if not transport.is_open:
+            return
+        with self._lock:
+            idle = self._idle[transport.address]
+            if len(idle) < self._max_idle:
+                idle.append(transport)
+                return
+        transport.close()
+
+    def connection(self, host, port=DEFAULT_PORT):
+        """A context manager which acquires a transport and releases it on exit."""
+        return _PooledConnection(self, host, port)
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, defaultdict(list)
+        for transports in idle.values():
+            for transport in transports:
+                transport.close()
+
+
+class _PooledConnection:
+
+    def __init__(self, pool, host, port):
+        self._pool = pool
+        self._host = host
+        self._port = port
+        self._transport = None
+
+    def __enter__(self):
+        self._transport = self._pool.acquire(self._host, self._port)
+        return self._transport
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self._transport.close()
+        self._pool.release(self._transport)
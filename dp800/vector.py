@@ -0,0 +1,180 @@
+"""A vectorized view of all the channels of a DP832.
+
+Rather than looping over channel ids and setting or reading each channel in
+turn, a ChannelArray addresses all the channels at once through NumPy arrays,
+each operation compiling to a single message:
+
+    dp832.channels.voltage.setpoint.levels = np.array([5.0, 12.0, 3.3])
+    readings = dp832.channels.measure()    # Voltage, current and power of each channel.
+
+Levels are validated against the protection ranges of all the channels in a
+single vectorized comparison before anything is sent, and reads and writes go
+through the state cache as they do for the individual channels.
+
+This module depends on NumPy, which is imported only when the view is used.
+"""
+import numpy as np
+
+from dp800.cache import SETPOINT_LEVEL, PROTECTION_LEVEL
+from dp800.dp800 import check_range
+
+
+class ChannelArray:
+    """A view of several channels of a DP832, addressed together.
+
+    Args:
+        dp832: The DP832.
+        channel_ids: The ids of the channels in the view, in order. Defaults to all channels.
+    """
+
+    __slots__ = ('_device', '_channels', '_voltage', '_current', '_measure_all_message')
+
+    def __init__(self, dp832, channel_ids=None):
+        if channel_ids is None:
+            channel_ids = dp832.channel_ids
+        self._device = dp832
+        self._channels = tuple(dp832.channel(channel_id) for channel_id in channel_ids)
+        self._voltage = QuantityArray(self, [channel.voltage for channel in self._channels])
+        self._current = QuantityArray(self, [channel.current for channel in self._channels])
+        self._measure_all_message = ';'.join(channel._measure_all_query for channel in self._channels)
+
+    def __len__(self):
+        return len(self._channels)
+
+    def __getitem__(self, channel_ids):
+        """A view of a subset of the channels, such as dp832.channels[1, 3]."""
+        if isinstance(channel_ids, int):
+            channel_ids = (channel_ids,)
+        return ChannelArray(self._device, channel_ids)
+
+    @property
+    def channel_ids(self):
+        return [channel.id for channel in self._channels]
+
+    @property
+    def voltage(self) -> 'QuantityArray':
+        return self._voltage
+
+    @property
+    def current(self) -> 'QuantityArray':
+        return self._current
+
+    def measure(self):
+        """Measure the voltage, current and power of every channel in a single query.
+
+        Returns:
+            An array of shape (number of channels, 3), whose columns are voltage,
+            current and power, and whose rows are in channel order.
+        """
+        response = self._device.query(self._measure_all_message)
+        try:
+            values = np.array(response.strip().replace(';', ',').split(','), dtype=float)
+            return values.reshape(len(self._channels), 3)
+        except ValueError as e:
+            raise RuntimeError("Unexpected response to measure all query: {!r}".format(response)) from e
+
+
+class QuantityArray:
+    """The voltage or current of each channel in a ChannelArray."""
+
+    __slots__ = ('_channels', '_quantities', '_setpoint', '_protection')
+
+    def __init__(self, channels, quantities):
+        self._channels = channels
+        self._quantities = tuple(quantities)
+        protections = [quantity.protection for quantity in self._quantities]
+        self._setpoint = LevelArray(
+            channels._device, self._quantities, SETPOINT_LEVEL,
+            [quantity.setpoint._level_query for quantity in self._quantities],
+            [quantity.setpoint._level_command for quantity in self._quantities],
+            [protection.min for protection in protections],
+            [protection.max for protection in protections])
+        self._protection = LevelArray(
+            channels._device, self._quantities, PROTECTION_LEVEL,
+            [protection._level_query for protection in protections],
+            [protection._level_command for protection in protections],
+            [protection.min for protection in protections],
+            [protection.max for protection in protections])
+
+    @property
+    def setpoint(self) -> 'LevelArray':
+        return self._setpoint
+
+    @property
+    def protection(self) -> 'LevelArray':
+        return self._protection
+
+
+class LevelArray:
+    """The setpoint or protection levels of a quantity across several channels."""
+
+    __slots__ = ('_device', '_quantities', '_category', '_queries', '_commands', '_min', '_max')
+
+    def __init__(self, device, quantities, category, queries, commands, min, max):
+        self._device = device
+        self._quantities = quantities
+        self._category = category
+        self._queries = tuple(queries)
+        self._commands = tuple(commands)
+        self._min = np.array(min, dtype=float)
+        self._max = np.array(max, dtype=float)
+
+    @property
+    def min(self):
+        """The least level accepted for each channel."""
+        return self._min.copy()
+
+    @property
+    def max(self):
+        """The greatest level accepted for each channel."""
+        return self._max.copy()
+
+    @property
+    def levels(self):
+        """The level of each channel, as an array in channel order.
+
+        Levels held in the state cache are used as they are, and the others are
+        read in a single query. Assigning an array of one level per channel, or
+        a single level for all channels, sets them in a single message. If any
+        level lies outside its channel's range, ValueError is raised and no
+        level is set.
+        """
+        device = self._device
+        cache = device.cache
+        responses = [None] * len(self._queries)
+        if cache is not None:
+            responses = [cache.lookup(query) for query in self._queries]
+        missing = [index for index, response in enumerate(responses) if response is None]
+        if missing:
+            generation = None if cache is None else cache.generation
+            fetched = device.query_many(self._queries[index] for index in missing)
+            for index, response in zip(missing, fetched):
+                responses[index] = response
+                if cache is not None:
+                    cache.store_read(self._category, self._queries[index], response, generation)
+        try:
+            return np.array(responses, dtype=float)
+        except ValueError as e:
+            raise RuntimeError("Unexpected response to {} queries: {!r}".format(
+                self._category, responses)) from e
+
+    @levels.setter
+    def levels(self, values):
+        values = np.asarray(values, dtype=float)
+        try:
+            values = np.broadcast_to(values, self._min.shape)
+        except ValueError as e:
+            raise ValueError("Expected {} levels, not an array of shape {}".format(
+                len(self._min), values.shape)) from e
+        invalid = ~((self._min <= values) & (values <= self._max))
+        if invalid.any():
+            index = int(np.argmax(invalid))
+            check_range(self._quantities[index], float(values[index]),
+                        float(self._min[index]), float(self._max[index]))
+        texts = ['{:.3f}'.format(value) for value in values.tolist()]
+        device = self._device
+        device.write_many([command + text for command, text in zip(self._commands, texts)])
+        cache = device.cache
+        if cache is not None:
+            for query, text in zip(self._queries, texts):
+                cache.store(self._category, query, text)
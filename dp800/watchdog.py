@@ -0,0 +1,256 @@
+"""Background monitoring of protection trips, output states and channel modes.
+
+A ProtectionWatchdog polls the output state, regulation mode and both
+protection trip flags of every channel of each instrument in a single round
+trip per instrument, and calls registered callbacks when any of them changes:
+
+    def on_trip(event):
+        print("{} channel {}: {} {} -> {}".format(
+            event.instrument, event.channel_id, event.kind, event.previous, event.current))
+
+    with ProtectionWatchdog({'psu-1': dp832}) as watchdog:
+        watchdog.add_callback(on_trip, kinds=(OVER_VOLTAGE_TRIPPED, OVER_CURRENT_TRIPPED))
+        ...
+
+The poll interval adapts to activity: it drops to min_interval whenever a
+change is detected, and otherwise grows by a constant factor up to
+max_interval, so a quiet bench costs few messages while a tripping one is
+watched closely.
+
+Callbacks run on the watchdog thread, which also sends the polling queries, so
+the instruments should not be used concurrently from other threads without
+arranging mutual exclusion. A callback which raises an exception, or an
+instrument which cannot be polled, is logged and does not stop the watchdog;
+an instrument which fails is not polled again until max_interval has passed.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from dp800.dp800 import ChannelMode, parse_boolean
+
+
+logger = logging.getLogger(__name__)
+
+# The kinds of WatchdogEvent.
+OUTPUT_STATE = 'is_on'
+MODE = 'mode'
+OVER_VOLTAGE_TRIPPED = 'over_voltage_tripped'
+OVER_CURRENT_TRIPPED = 'over_current_tripped'
+
+KINDS = (OUTPUT_STATE, MODE, OVER_VOLTAGE_TRIPPED, OVER_CURRENT_TRIPPED)
+
+
+ChannelStatus = namedtuple('ChannelStatus', KINDS)
+ChannelStatus.__doc__ = """The protection-related status of a channel.
+
+is_on: Whether the output is on.
+mode: The ChannelMode of the output.
+over_voltage_tripped: Whether over-voltage protection has tripped.
+over_current_tripped: Whether over-current protection has tripped.
+"""
+
+WatchdogEvent = namedtuple('WatchdogEvent', ['instrument', 'channel_id', 'kind', 'previous', 'current',
+                                             'timestamp'])
+WatchdogEvent.__doc__ = """A change in the status of a channel detected by a ProtectionWatchdog.
+
+instrument: The name of the instrument.
+channel_id: The id of the channel.
+kind: One of KINDS, naming the ChannelStatus field which changed.
+previous: The previous value of the field.
+current: The new value of the field.
+timestamp: The wall-clock time of the poll which detected the change.
+"""
+
+
+def status_queries(dp832):
+    """The queries which read the ChannelStatus of every channel, in channel order."""
+    commands = []
+    for channel_id in dp832.channel_ids:
+        channel = dp832.channel(channel_id)
+        commands.append(channel._state_query)
+        commands.append(channel._mode_query)
+        commands.append(channel.voltage.protection._tripped_query)
+        commands.append(channel.current.protection._tripped_query)
+    return commands
+
+
+def read_status(dp832, commands=None):
+    """Read the ChannelStatus of every channel in a single round trip.
+
+    Args:
+        dp832: A DP832.
+        commands: The result of status_queries(dp832), if already computed.
+
+    Returns:
+        An OrderedDict of channel id to ChannelStatus.
+    """
+    if commands is None:
+        commands = status_queries(dp832)
+    responses = dp832.query_many(commands)
+    statuses = OrderedDict()
+    for index, channel_id in enumerate(dp832.channel_ids):
+        state, mode, over_voltage, over_current = responses[4 * index:4 * index + 4]
+        try:
+            mode = ChannelMode.from_response(mode)
+        except ValueError as e:
+            raise RuntimeError("Unexpected response reading status of channel {}: {}".format(channel_id, e)) from e
+        statuses[channel_id] = ChannelStatus(parse_boolean(state), mode,
+                                             parse_boolean(over_voltage), parse_boolean(over_current))
+    return statuses
+
+
+class ProtectionWatchdog:
+    """Polls instruments on a background thread and reports changes in channel status.
+
+    Args:
+        instruments: A mapping of name to DP832, or an iterable of DP832
+            instances which will be named by their index.
+        min_interval: The shortest interval between polls, in seconds, used
+            after a change is detected.
+        max_interval: The longest interval between polls, in seconds, reached
+            when nothing changes.
+        backoff: The factor by which the interval grows after each quiet poll.
+        on_error: An optional callable which receives (name, exception) when
+            polling an instrument fails. If None, the failure is logged. Either
+            way polling continues, and the most recent failure is available as
+            the exception attribute.
+    """
+
+    def __init__(self, instruments, min_interval=0.05, max_interval=1.0, backoff=1.5, on_error=None):
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("Poll intervals {} s to {} s are not a positive range".format(min_interval, max_interval))
+        if backoff < 1:
+            raise ValueError("Backoff factor {} is less than one".format(backoff))
+        if not hasattr(instruments, 'items'):
+            instruments = enumerate(instruments)
+        else:
+            instruments = instruments.items()
+        self._instruments = OrderedDict((name, (dp832, status_queries(dp832))) for name, dp832 in instruments)
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._backoff = backoff
+        self._on_error = on_error
+        self._interval = min_interval
+        self._callbacks = []
+        self._statuses = {}
+        self._retry_times = {}
+        self._stopped = threading.Event()
+        self._thread = None
+        self.exception = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def interval(self):
+        """The current poll interval in seconds."""
+        return self._interval
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def status(self, name):
+        """The most recently polled statuses of an instrument, as an OrderedDict of channel id to ChannelStatus."""
+        return self._statuses.get(name)
+
+    def add_callback(self, callback, kinds=None):
+        """Register a callable to receive a WatchdogEvent for each change.
+
+        Args:
+            callback: The callable.
+            kinds: An optional collection of event kinds to receive. Defaults to all kinds.
+        """
+        kinds = frozenset(KINDS if kinds is None else kinds)
+        unknown = kinds.difference(KINDS)
+        if unknown:
+            raise ValueError("Unknown event kinds {}".format(', '.join(sorted(unknown))))
+        self._callbacks.append((callback, kinds))
+
+    def remove_callback(self, callback):
+        self._callbacks = [(registered, kinds) for registered, kinds in self._callbacks if registered != callback]
+
+    def start(self):
+        if self.is_running:
+            return
+        self._stopped.clear()
+        self.exception = None
+        self._thread = threading.Thread(target=self._run, name='dp800-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def poll(self):
+        """Poll every instrument once, dispatching events for any changes, and adapt the interval.
+
+        The first poll of each instrument establishes its status and generates
+        no events. An instrument which fails to respond is reported, and is
+        skipped by subsequent polls until max_interval has passed.
+
+        Returns:
+            A list of the WatchdogEvents detected.
+        """
+        events = []
+        for name, (dp832, commands) in self._instruments.items():
+            retry_time = self._retry_times.get(name)
+            if retry_time is not None and time.monotonic() < retry_time:
+                continue
+            timestamp = time.time()
+            try:
+                statuses = read_status(dp832, commands)
+            except Exception as e:
+                self._retry_times[name] = time.monotonic() + self._max_interval
+                self._report(name, e)
+                continue
+            self._retry_times.pop(name, None)
+            previous_statuses = self._statuses.get(name)
+            self._statuses[name] = statuses
+            if previous_statuses is None:
+                continue
+            for channel_id, status in statuses.items():
+                previous = previous_statuses[channel_id]
+                if status == previous:
+                    continue
+                for kind, old, new in zip(KINDS, previous, status):
+                    if old != new:
+                        events.append(WatchdogEvent(name, channel_id, kind, old, new, timestamp))
+        if events:
+            self._interval = self._min_interval
+        else:
+            self._interval = min(self._interval * self._backoff, self._max_interval)
+        for event in events:
+            for callback, kinds in self._callbacks:
+                if event.kind in kinds:
+                    try:
+                        callback(event)
+                    except Exception:
+                        logger.exception("Watchdog callback %r failed for %s", callback, event)
+        return events
+
+    def _report(self, name, exception):
+        self.exception = exception
+        if self._on_error is None:
+            logger.error("Polling instrument %r failed: %s", name, exception)
+        else:
+            self._on_error(name, exception)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            start = time.monotonic()
+            try:
+                self.poll()
+            except Exception:
+                # Only a failing on_error reaches here; keep watching regardless.
+                logger.exception("Watchdog poll failed")
+            # The poll may have changed the interval, so the next is timed from it.
+            self._stopped.wait(max(0.0, start + self._interval - time.monotonic()))
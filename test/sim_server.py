@@ -0,0 +1,27 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+
+from dp800.sim import SimulatedDP832, SimulatorServer
+
+
+@contextmanager
+def running_simulator(count=1, latency=0.0):
+    """Run a SimulatorServer on ephemeral ports in a background thread.
+
+    Yields:
+        The server, whose addresses attribute lists the (host, port) of each instrument.
+    """
+    loop = asyncio.new_event_loop()
+    instruments = [SimulatedDP832(serial='DP8A{:06d}'.format(index + 1), strict=False) for index in range(count)]
+    server = SimulatorServer(instruments, port=0, latency=latency)
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    try:
+        yield server
+    finally:
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
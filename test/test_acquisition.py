@@ -0,0 +1,60 @@
+from itertools import islice
+
+import pytest
+
+from dp800.dp800 import DP832
+
+
+@pytest.fixture
+def instrument():
+    from test.fake_visa_dp832 import FakeVisaDP832
+    visa_dp832 = FakeVisaDP832()
+    dp832 = DP832(visa_dp832)
+    return dp832
+
+
+def test_stream_block_shape(instrument):
+    blocks = list(islice(instrument.stream(rate=1000.0, block_size=5), 3))
+    assert len(blocks) == 3
+    for block in blocks:
+        assert block.channel_ids == instrument.channel_ids
+        assert block.samples.shape == (5,)
+        assert block.samples['voltage'].shape == (5, len(instrument.channel_ids))
+        assert block.dropped >= 0
+        assert block.achieved_rate > 0
+
+
+def test_stream_timestamps_increase(instrument):
+    block = next(instrument.stream(rate=1000.0, block_size=10))
+    timestamps = block.samples['timestamp']
+    assert all(timestamps[i] <= timestamps[i+1] for i in range(len(timestamps) - 1))
+
+
+def test_stream_measurements(instrument):
+    instrument._inst._channel_voltage_measurements[2] = 12.0
+    instrument._inst._channel_current_measurements[2] = 0.5
+    block = next(instrument.stream(channels=[2], rate=1000.0, block_size=4))
+    assert block.channel_ids == [2]
+    assert (block.samples['voltage'] == 12.0).all()
+    assert (block.samples['current'] == 0.5).all()
+    assert (block.samples['power'] == 6.0).all()
+
+
+def test_stream_measurements_in_channel_order(instrument):
+    for channel_id in instrument.channel_ids:
+        instrument._inst._channel_voltage_measurements[channel_id] = float(channel_id)
+        instrument._inst._channel_current_measurements[channel_id] = 0.5
+    block = next(instrument.stream(channels=[3, 1], rate=1000.0, block_size=2))
+    assert block.samples['voltage'].tolist() == [[3.0, 1.0], [3.0, 1.0]]
+    assert block.samples['current'].tolist() == [[0.5, 0.5], [0.5, 0.5]]
+    assert block.samples['power'].tolist() == [[1.5, 0.5], [1.5, 0.5]]
+
+
+def test_stream_invalid_channel(instrument):
+    with pytest.raises(ValueError):
+        next(instrument.stream(channels=[4]))
+
+
+def test_stream_invalid_rate(instrument):
+    with pytest.raises(ValueError):
+        next(instrument.stream(rate=0))
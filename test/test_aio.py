@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from dp800.aio import AsyncDP832, ExecutorTransport
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def open_instrument():
+    from test.fake_visa_dp832 import FakeVisaDP832
+    return await AsyncDP832.open(ExecutorTransport(FakeVisaDP832()))
+
+
+def test_channel_ids():
+    async def scenario():
+        instrument = await open_instrument()
+        return instrument.channel_ids
+    assert run(scenario()) == [1, 2, 3]
+
+
+def test_channel_on_off():
+    async def scenario():
+        instrument = await open_instrument()
+        channel = instrument.channel(1)
+        await channel.on()
+        on = await channel.is_on()
+        await channel.off()
+        off = await channel.is_on()
+        return on, off
+    assert run(scenario()) == (True, False)
+
+
+def test_setpoint_level():
+    async def scenario():
+        instrument = await open_instrument()
+        setpoint = instrument.channel(2).voltage.setpoint
+        await setpoint.set_level(12.5)
+        return await setpoint.level()
+    assert run(scenario()) == 12.5
+
+
+def test_setpoint_level_out_of_range():
+    async def scenario():
+        instrument = await open_instrument()
+        await instrument.channel(3).voltage.setpoint.set_level(6.0)
+    with pytest.raises(ValueError):
+        run(scenario())
+
+
+def test_protection_enable():
+    async def scenario():
+        instrument = await open_instrument()
+        protection = instrument.channel(1).current.protection
+        await protection.enable()
+        return await protection.is_enabled()
+    assert run(scenario())
+
+
+def test_step_reset():
+    async def scenario():
+        instrument = await open_instrument()
+        step = instrument.channel(1).voltage.setpoint.step
+        await step.set_increment(0.5)
+        await step.reset()
+        return await step.increment(), await step.default()
+    increment, default = run(scenario())
+    assert increment == default
+
+
+def test_concurrent_measurements():
+    async def scenario():
+        instrument = await open_instrument()
+        instrument.transport._inst._channel_voltage_measurements[1:] = [1.0, 2.0, 3.0]
+        channels = [instrument.channel(channel_id) for channel_id in instrument.channel_ids]
+        return await asyncio.gather(*(channel.voltage.measurement() for channel in channels))
+    assert run(scenario()) == [1.0, 2.0, 3.0]
+
+
+def test_query_many():
+    async def scenario():
+        instrument = await open_instrument()
+        return await instrument.query_many([':OUTPUT:STATE CH2,ON', ':OUTPUT:STATE? CH1', ':OUTPUT:STATE? CH2'])
+    assert run(scenario()) == ['OFF', 'ON']
@@ -0,0 +1,117 @@
+import pytest
+
+from dp800.batch import WriteBatch, parameter_key
+from dp800.dp800 import DP832
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class RecordingFakeVisaDP832(FakeVisaDP832):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def write(self, command):
+        self.messages.append(command)
+        super().write(command)
+
+
+@pytest.fixture
+def instrument():
+    return DP832(RecordingFakeVisaDP832())
+
+
+def test_parameter_key():
+    assert parameter_key(':OUTPUT:STATE CH1,ON') == ':OUTPUT:STATE CH1'
+    assert parameter_key(':SOURCE1:VOLTAGE:IMMEDIATE 1.000') == ':SOURCE1:VOLTAGE:IMMEDIATE'
+    assert parameter_key(':SOURCE1:VOLTAGE:STEP DEFAULT') == ':SOURCE1:VOLTAGE:STEP'
+    assert parameter_key(':SOURCE1:VOLTAGE:PROTECTION:CLEAR') is None
+    assert parameter_key(':INSTRUMENT:NSELECT 2') is None
+    assert parameter_key(':TIMER:STATE ON') is None
+    assert parameter_key(':TIMER:PARAMETER 1,1.000,1.000,1') is None
+
+
+def test_superseding_write_takes_last_position():
+    batch = WriteBatch()
+    batch.add(':SOURCE1:VOLTAGE:IMMEDIATE 5.000')
+    batch.add(':SOURCE1:VOLTAGE:PROTECTION 20.000')
+    batch.add(':SOURCE1:VOLTAGE:IMMEDIATE 15.000')
+    assert batch.commands == [':SOURCE1:VOLTAGE:PROTECTION 20.000', ':SOURCE1:VOLTAGE:IMMEDIATE 15.000']
+
+
+def test_actions_are_barriers():
+    batch = WriteBatch()
+    batch.add(':SOURCE1:VOLTAGE:PROTECTION 1.000')
+    batch.add(':SOURCE1:VOLTAGE:PROTECTION:CLEAR')
+    batch.add(':SOURCE1:VOLTAGE:PROTECTION 2.000')
+    assert len(batch) == 3
+
+
+def test_messages_respect_max_length():
+    batch = WriteBatch()
+    for channel_id in range(1, 4):
+        batch.add(':SOURCE{}:VOLTAGE:IMMEDIATE 1.000'.format(channel_id))
+    messages = batch.messages(max_length=70)
+    assert [len(commands) for commands in messages] == [2, 1]
+
+
+def test_batch_is_one_message(instrument):
+    with instrument.batch():
+        for channel_id in instrument.channel_ids:
+            channel = instrument.channel(channel_id)
+            channel.voltage.setpoint.level = 1.0
+            channel.current.setpoint.level = 0.5
+            channel.voltage.protection.level = 2.0
+            channel.on()
+        assert instrument._inst.messages == []
+    assert len(instrument._inst.messages) == 1
+    for channel_id in instrument.channel_ids:
+        channel = instrument.channel(channel_id)
+        assert channel.is_on
+        assert channel.voltage.setpoint.level == 1.0
+        assert channel.current.setpoint.level == 0.5
+        assert channel.voltage.protection.level == 2.0
+
+
+def test_batch_drops_superseded(instrument):
+    with instrument.batch():
+        channel = instrument.channel(1)
+        channel.voltage.setpoint.level = 1.0
+        channel.voltage.setpoint.level = 2.0
+        channel.on()
+        channel.off()
+    assert instrument._inst.messages == [':SOURCE1:VOLTAGE:IMMEDIATE 2.000;:OUTPUT:STATE CH1,OFF']
+
+
+def test_query_in_batch_flushes(instrument):
+    with instrument.batch():
+        channel = instrument.channel(2)
+        channel.current.setpoint.level = 1.5
+        assert channel.current.setpoint.level == 1.5
+
+
+def test_batch_discarded_on_exception(instrument):
+    with pytest.raises(ZeroDivisionError):
+        with instrument.batch():
+            instrument.channel(1).on()
+            1 / 0
+    assert instrument._inst.messages == []
+    assert not instrument.channel(1).is_on
+
+
+def test_nested_batches(instrument):
+    with instrument.batch():
+        instrument.channel(1).on()
+        with instrument.batch():
+            instrument.channel(2).on()
+        assert instrument._inst.messages == []
+    assert len(instrument._inst.messages) == 1
+
+
+def test_protection_state_is_batched(instrument):
+    with instrument.batch():
+        instrument.channel(1).voltage.protection.enable()
+        instrument.channel(1).current.protection.enable()
+    assert len(instrument._inst.messages) == 1
+    assert instrument.channel(1).voltage.protection.is_enabled
+    assert instrument.channel(1).current.protection.is_enabled
@@ -0,0 +1,35 @@
+import pytest
+
+from bench.instrument import LatencyInstrument
+from bench.runner import run, run_scenario
+from bench.scenarios import SCENARIOS
+
+
+def test_latency_instrument_counts():
+    instrument = LatencyInstrument()
+    instrument.write(':OUTPUT:STATE CH1,ON')
+    response = instrument.query(':OUTPUT:STATE? CH1')
+    assert instrument.counters() == dict(
+        messages=2, round_trips=1, bytes_sent=len(':OUTPUT:STATE CH1,ON') + len(':OUTPUT:STATE? CH1') + 2,
+        bytes_received=len(response))
+
+
+@pytest.mark.parametrize('name, round_trips, messages', [
+    ('full_state_read.batched', 1, 1),
+    ('setup_sequence.batched', 0, 1),
+    ('measurement_polling.batched', 10, 10),
+])
+def test_batched_scenario_io_counts(name, round_trips, messages):
+    result = run_scenario(SCENARIOS[name], repeat=1)
+    assert result['round_trips'] == round_trips
+    assert result['messages'] == messages
+
+
+def test_run_all_scenarios():
+    results = run(repeat=1)
+    assert list(results['results'].keys()) == list(SCENARIOS.keys())
+
+
+def test_run_unknown_scenario():
+    with pytest.raises(ValueError):
+        run(['no_such_scenario'])
@@ -0,0 +1,137 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from dp800.broker import (
+    ACK, QUERY, RESPONSE, Broker, BrokerError, BrokerTransport, connect, receive_frame, send_frame)
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class GatedFakeVisaDP832(FakeVisaDP832):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def query(self, command):
+        self.gate.wait()
+        self.messages.append(command)
+        return super().query(command)
+
+
+@pytest.fixture
+def fake():
+    return GatedFakeVisaDP832()
+
+
+@pytest.fixture
+def broker(fake, tmp_path):
+    with Broker(fake, str(tmp_path / 'dp832.sock')) as broker:
+        yield broker
+    fake.gate.set()
+
+
+def test_frame_round_trip():
+    left, right = socket.socketpair()
+    with left, right:
+        send_frame(left, QUERY, 2, b':MEASURE:ALL? CH1')
+        send_frame(left, ACK, 0)
+        assert receive_frame(right) == (QUERY, 2, b':MEASURE:ALL? CH1')
+        assert receive_frame(right) == (ACK, 0, b'')
+        left.close()
+        assert receive_frame(right) is None
+
+
+def test_client_drop_in(broker):
+    dp832 = connect(broker.path)
+    dp832.channel(1).voltage.setpoint.level = 5.0
+    assert dp832.channel(1).voltage.setpoint.level == 5.0
+    assert dp832.channel(1).measure_all().voltage >= 0.0
+
+
+def test_configuration_reads_are_served_from_shared_cache(fake, broker):
+    first = connect(broker.path)
+    second = connect(broker.path)
+    assert first.channel(2).current.setpoint.level == second.channel(2).current.setpoint.level
+    assert fake.messages.count(':SOURCE2:CURRENT:IMMEDIATE?') == 1
+    assert broker.hits == 1
+
+
+def test_writes_invalidate_shared_cache(fake, broker):
+    first = connect(broker.path)
+    second = connect(broker.path)
+    assert second.channel(1).voltage.setpoint.level == 0.0
+    first.channel(1).voltage.setpoint.level = 3.0
+    assert second.channel(1).voltage.setpoint.level == 3.0
+
+
+def test_unknown_writes_clear_shared_cache(broker):
+    dp832 = connect(broker.path)
+    dp832.channel(1).voltage.setpoint.level
+    assert len(broker.cache) == 1
+    dp832.write(':SOURCE1:VOLT 2')
+    assert len(broker.cache) == 0
+    assert dp832.channel(1).voltage.setpoint.level == 2.0
+
+
+def test_writes_within_queries_invalidate_shared_cache(broker):
+    first = connect(broker.path)
+    second = connect(broker.path)
+    assert second.channel(1).voltage.setpoint.level == 0.0
+    first.query_many([':SOURCE1:VOLTAGE:IMMEDIATE 3.000', ':MEASURE:ALL? CH1'])
+    assert second.channel(1).voltage.setpoint.level == 3.0
+
+
+def test_queries_alone_do_not_invalidate_shared_cache(broker):
+    dp832 = connect(broker.path)
+    dp832.channel(1).voltage.setpoint.level
+    dp832.channel(1).measure_all()
+    assert len(broker.cache) == 1
+
+
+def test_identical_concurrent_reads_are_merged(fake, broker):
+    transports = [BrokerTransport(broker.path) for _ in range(3)]
+    responses = []
+    fake.gate.clear()
+    # Occupy the worker, so that the reads are all pending together.
+    held = broker.worker.submit_query('*IDN?')
+    while len(broker.worker):
+        time.sleep(0.001)
+    threads = [threading.Thread(target=lambda transport=transport: responses.append(
+        transport.query(':MEASURE:ALL? CH1'))) for transport in transports]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 2
+    while broker.worker.coalesced < 2 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    fake.gate.set()
+    held.result(1)
+    for thread in threads:
+        thread.join()
+    assert len(set(responses)) == 1 and len(responses) == 3
+    assert fake.messages.count(':MEASURE:ALL? CH1') == 1
+
+
+def test_instrument_errors_are_reported(broker):
+    transport = BrokerTransport(broker.path)
+    with pytest.raises(BrokerError):
+        transport.write(':SOURCE1:BOGUS 1')
+    assert transport.query('*IDN?').startswith('RIGOL')
+
+
+def test_raw_protocol(broker):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(broker.path)
+        send_frame(sock, QUERY, 1, b':OUTPUT:STATE? CH1')
+        assert receive_frame(sock) == (RESPONSE, 0, b'OFF\n')
+
+
+def test_second_broker_on_same_socket_is_refused(fake, broker):
+    second = Broker(FakeVisaDP832(), broker.path)
+    with pytest.raises(RuntimeError):
+        second.start()
+    second.worker.close()
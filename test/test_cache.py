@@ -0,0 +1,131 @@
+import time
+
+import pytest
+
+from dp800.cache import StateCache, SETPOINT_LEVEL, PROTECTION_LEVEL
+from dp800.dp800 import DP832
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class CountingFakeVisaDP832(FakeVisaDP832):
+
+    def __init__(self):
+        super().__init__()
+        self.queries = []
+
+    def query(self, command):
+        self.queries.append(command)
+        return super().query(command)
+
+
+@pytest.fixture
+def instrument():
+    return DP832(CountingFakeVisaDP832(), cache=StateCache())
+
+
+def test_repeated_reads_are_cached(instrument):
+    channel = instrument.channel(1)
+    first = channel.voltage.setpoint.level
+    count = len(instrument._inst.queries)
+    assert channel.voltage.setpoint.level == first
+    assert channel.voltage.protection.level == channel.voltage.protection.level
+    assert len(instrument._inst.queries) == count + 1
+
+
+def test_writes_update_cache(instrument):
+    setpoint = instrument.channel(2).current.setpoint
+    setpoint.level = 1.25
+    count = len(instrument._inst.queries)
+    assert setpoint.level == 1.25
+    assert len(instrument._inst.queries) == count
+
+
+def test_protection_state_write_through(instrument):
+    protection = instrument.channel(3).voltage.protection
+    protection.enable()
+    count = len(instrument._inst.queries)
+    assert protection.is_enabled
+    assert len(instrument._inst.queries) == count
+
+
+def test_step_reset_invalidates(instrument):
+    step = instrument.channel(1).voltage.setpoint.step
+    step.increment = 0.5
+    step.reset()
+    assert step.increment == step.default
+
+
+def test_measurements_bypass_cache(instrument):
+    channel = instrument.channel(1)
+    instrument._inst._channel_voltage_measurements[1] = 1.0
+    assert channel.voltage.measurement == 1.0
+    instrument._inst._channel_voltage_measurements[1] = 2.0
+    assert channel.voltage.measurement == 2.0
+
+
+def test_invalidate(instrument):
+    setpoint = instrument.channel(1).voltage.setpoint
+    setpoint.level = 1.0
+    instrument._inst._channel_voltage_setpoint_levels[1] = 2.0
+    assert setpoint.level == 1.0
+    instrument.invalidate()
+    assert setpoint.level == 2.0
+
+
+def test_refresh_is_one_round_trip(instrument):
+    for channel_id in instrument.channel_ids:
+        channel = instrument.channel(channel_id)
+        channel.voltage.setpoint.level = 1.0
+        channel.current.protection.level = 1.0
+    for channel_id in instrument.channel_ids:
+        instrument._inst._channel_voltage_setpoint_levels[channel_id] = 3.0
+    count = len(instrument._inst.queries)
+    instrument.refresh()
+    assert len(instrument._inst.queries) == count + 1
+    assert all(instrument.channel(channel_id).voltage.setpoint.level == 3.0
+               for channel_id in instrument.channel_ids)
+
+
+def test_ttl_expiry():
+    cache = StateCache(ttls={SETPOINT_LEVEL: 0.01})
+    cache.store(SETPOINT_LEVEL, ':SOURCE1:VOLTAGE:IMMEDIATE?', '1.000')
+    cache.store(PROTECTION_LEVEL, ':SOURCE1:VOLTAGE:PROTECTION?', '1.000')
+    assert cache.lookup(':SOURCE1:VOLTAGE:IMMEDIATE?') == '1.000'
+    time.sleep(0.02)
+    assert cache.lookup(':SOURCE1:VOLTAGE:IMMEDIATE?') is None
+    assert cache.lookup(':SOURCE1:VOLTAGE:PROTECTION?') == '1.000'
+
+
+def test_zero_ttl_disables_category():
+    cache = StateCache(ttls={SETPOINT_LEVEL: 0})
+    cache.store(SETPOINT_LEVEL, ':SOURCE1:VOLTAGE:IMMEDIATE?', '1.000')
+    assert cache.lookup(':SOURCE1:VOLTAGE:IMMEDIATE?') is None
+
+
+def test_unknown_category():
+    with pytest.raises(ValueError):
+        StateCache(ttls={'measurement': 1.0})
+
+
+def test_suspended_queries_are_not_cached():
+    cache = StateCache()
+    cache.store(SETPOINT_LEVEL, ':SOURCE1:VOLTAGE:IMMEDIATE?', '1.000')
+    cache.suspend(':SOURCE1:VOLTAGE:IMMEDIATE?')
+    assert cache.lookup(':SOURCE1:VOLTAGE:IMMEDIATE?') is None
+    cache.store(SETPOINT_LEVEL, ':SOURCE1:VOLTAGE:IMMEDIATE?', '2.000')
+    assert cache.lookup(':SOURCE1:VOLTAGE:IMMEDIATE?') is None
+    cache.resume(':SOURCE1:VOLTAGE:IMMEDIATE?')
+    cache.store(SETPOINT_LEVEL, ':SOURCE1:VOLTAGE:IMMEDIATE?', '3.000')
+    assert cache.lookup(':SOURCE1:VOLTAGE:IMMEDIATE?') == '3.000'
+
+
+def test_read_is_not_stored_after_intervening_write():
+    cache = StateCache()
+    generation = cache.generation
+    cache.store(SETPOINT_LEVEL, ':SOURCE1:VOLTAGE:IMMEDIATE?', '2.000')
+    cache.store_read(SETPOINT_LEVEL, ':SOURCE1:VOLTAGE:IMMEDIATE?', '1.000', generation)
+    assert cache.lookup(':SOURCE1:VOLTAGE:IMMEDIATE?') == '2.000'
+    generation = cache.generation
+    cache.store_read(SETPOINT_LEVEL, ':SOURCE2:VOLTAGE:IMMEDIATE?', '3.000', generation)
+    cache.store_read(SETPOINT_LEVEL, ':SOURCE3:VOLTAGE:IMMEDIATE?', '4.000', generation)
+    assert cache.lookup(':SOURCE3:VOLTAGE:IMMEDIATE?') == '4.000'
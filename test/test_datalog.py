@@ -0,0 +1,116 @@
+import weakref
+
+import numpy as np
+import pytest
+
+from dp800.datalog import MeasurementLog, RECORD_DTYPE, OUTPUT_ON, OVER_CURRENT_TRIPPED, OVER_VOLTAGE_TRIPPED
+from dp800.dp800 import DP832
+from dp800.fleet import scan_instrument
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+def make_records(timestamps):
+    records = np.zeros(len(timestamps), dtype=RECORD_DTYPE)
+    records['timestamp'] = timestamps
+    records['voltage'] = np.asarray(timestamps) * 2
+    records['channel'] = 1
+    return records
+
+
+def test_append_and_reopen(tmp_path):
+    path = tmp_path / 'soak.dp8log'
+    with MeasurementLog.create(path, chunk_records=4, max_chunks=8) as log:
+        log.append(1.0, 0, 2, 5.0, 0.5, 2.5, mode=1, flags=OUTPUT_ON)
+        log.append_many(make_records(np.arange(2.0, 12.0)))
+        assert len(log) == 11
+        assert log.num_chunks == 3
+    log = MeasurementLog.open(path)
+    assert len(log) == 11
+    records = log.records
+    assert isinstance(records, np.memmap)
+    assert records[0]['channel'] == 2
+    assert records[0]['flags'] == OUTPUT_ON
+    assert list(records['timestamp']) == list(np.arange(1.0, 12.0))
+
+
+def test_between(tmp_path):
+    path = tmp_path / 'soak.dp8log'
+    with MeasurementLog.create(path, chunk_records=5, max_chunks=16) as log:
+        log.append_many(make_records(np.arange(0.0, 40.0, 0.5)))
+    log = MeasurementLog.open(path)
+    selected = log.between(7.0, 12.25)
+    assert selected['timestamp'][0] == 7.0
+    assert selected['timestamp'][-1] == 12.0
+    assert len(selected) == 11
+    assert len(log.between(100.0, 200.0)) == 0
+    assert len(log.between(-10.0, 0.0)) == 0
+    assert len(log.between(-10.0, 100.0)) == 80
+
+
+def test_append_to_reopened_log(tmp_path):
+    path = tmp_path / 'soak.dp8log'
+    with MeasurementLog.create(path, chunk_records=4) as log:
+        log.append_many(make_records([1.0, 2.0, 3.0]))
+    with MeasurementLog.open(path, writable=True) as log:
+        log.append_many(make_records([4.0, 5.0]))
+        with pytest.raises(ValueError):
+            log.append_many(make_records([4.5]))
+    assert list(MeasurementLog.open(path).records['timestamp']) == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_read_only(tmp_path):
+    path = tmp_path / 'soak.dp8log'
+    MeasurementLog.create(path).close()
+    with pytest.raises(ValueError):
+        MeasurementLog.open(path).append(1.0, 0, 1, 0.0, 0.0, 0.0)
+
+
+def test_full(tmp_path):
+    with MeasurementLog.create(tmp_path / 'soak.dp8log', chunk_records=2, max_chunks=2) as log:
+        log.append_many(make_records([1.0, 2.0, 3.0, 4.0]))
+        with pytest.raises(ValueError):
+            log.append(5.0, 0, 1, 0.0, 0.0, 0.0)
+
+
+def test_not_a_log(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(bytes(256))
+    with pytest.raises(ValueError):
+        MeasurementLog.open(path)
+
+
+def test_append_scan(tmp_path):
+    dp832 = DP832(FakeVisaDP832())
+    with MeasurementLog.create(tmp_path / 'soak.dp8log') as log:
+        log.append_scan(3, scan_instrument(dp832), 100.0)
+        records = log.records
+        assert list(records['channel']) == dp832.channel_ids
+        assert (records['instrument'] == 3).all()
+        assert (records['timestamp'] == 100.0).all()
+
+
+def test_append_scan_records_protection_trips(tmp_path):
+    dp832 = DP832(FakeVisaDP832())
+    dp832.channel(2).on()
+    dp832._inst._channel_voltage_protection_tripped[2] = 'ON'
+    dp832._inst._channel_current_protection_tripped[3] = 'ON'
+    with MeasurementLog.create(tmp_path / 'soak.dp8log') as log:
+        log.append_scan(0, scan_instrument(dp832), 100.0)
+        assert list(log.records['flags']) == [0, OUTPUT_ON | OVER_VOLTAGE_TRIPPED, OVER_CURRENT_TRIPPED]
+
+
+def test_close_releases_all_mappings(tmp_path):
+    path = tmp_path / 'soak.dp8log'
+    log = MeasurementLog.create(path, chunk_records=4)
+    log.append_many(make_records([1.0, 2.0, 3.0, 4.0, 5.0]))
+    len(log.records)
+    mappings = [weakref.ref(mapping) for mapping in (log._header, log._index, log._chunk, log._records)]
+    log.close()
+    log.close()
+    assert log.closed
+    assert all(mapping() is None for mapping in mappings)
+    with pytest.raises(ValueError):
+        log.append(6.0, 0, 1, 0.0, 0.0, 0.0)
+    with pytest.raises(ValueError):
+        log.records
+    assert len(MeasurementLog.open(path)) == 5
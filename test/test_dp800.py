@@ -4,6 +4,7 @@ from hypothesis import given
 from hypothesis.strategies import floats, data, sampled_from
 
 from dp800.dp800 import DP832
+from test.fake_visa_dp832 import FakeVisaDP832
 
 
 @pytest.fixture
@@ -214,3 +215,66 @@ def test_current_channel_is_enabled_disabled(instrument):
         channel = instrument.channel(channel_id)
         channel.current.protection.is_enabled = False
         assert not channel.current.protection.is_enabled
+
+
+def test_query_many(instrument):
+    for channel_id in instrument.channel_ids:
+        instrument.channel(channel_id).voltage.setpoint.level = channel_id
+    responses = instrument.query_many(':SOURCE{}:VOLTAGE:IMMEDIATE?'.format(channel_id)
+                                      for channel_id in instrument.channel_ids)
+    assert [float(response) for response in responses] == instrument.channel_ids
+
+
+def test_query_many_with_commands(instrument):
+    responses = instrument.query_many([':OUTPUT:STATE CH1,ON', ':OUTPUT:STATE? CH1', ':OUTPUT:STATE? CH2'])
+    assert responses == ['ON', 'OFF']
+
+
+def test_write_many(instrument):
+    instrument.write_many(':OUTPUT:STATE CH{},ON'.format(channel_id) for channel_id in instrument.channel_ids)
+    assert all(instrument.channel(channel_id).is_on for channel_id in instrument.channel_ids)
+
+
+def test_split_responses_preserves_quoted_separators():
+    from dp800.dp800 import split_responses
+    assert split_responses('1.000;-113,"Undefined header;x"\n') == ['1.000', '-113,"Undefined header;x"']
+
+
+@given(data=data())
+def test_measure_all(data):
+    instrument = DP832(FakeVisaDP832())
+    channel_id = data.draw(sampled_from(instrument.channel_ids))
+    channel = instrument.channel(channel_id)
+    voltage = data.draw(floats(channel.voltage.protection.min, channel.voltage.protection.max).map(lambda v: round(v, 3)))
+    current = data.draw(floats(channel.current.protection.min, channel.current.protection.max).map(lambda v: round(v, 3)))
+    instrument._inst._channel_voltage_measurements[channel_id] = voltage
+    instrument._inst._channel_current_measurements[channel_id] = current
+    measurement = channel.measure_all()
+    assert measurement == (voltage, current, round(voltage*current, 3))
+    assert measurement.power == channel.power.measurement
+
+
+@given(data=data())
+def test_applied(data):
+    instrument = DP832(FakeVisaDP832())
+    channel_id = data.draw(sampled_from(instrument.channel_ids))
+    channel = instrument.channel(channel_id)
+    voltage = data.draw(floats(channel.voltage.protection.min, channel.voltage.protection.max).map(lambda v: round(v, 3)))
+    current = data.draw(floats(channel.current.protection.min, channel.current.protection.max).map(lambda v: round(v, 3)))
+    channel.voltage.setpoint.level = voltage
+    channel.current.setpoint.level = current
+    applied = channel.applied()
+    assert applied.voltage == voltage
+    assert applied.current == current
+
+
+def test_object_model_uses_slots(instrument):
+    channel = instrument.channel(1)
+    for obj in (channel, channel.voltage, channel.power, channel.voltage.setpoint,
+                channel.voltage.setpoint.step, channel.voltage.protection):
+        assert not hasattr(obj, '__dict__')
+
+
+def test_is_on_invalid_value(instrument):
+    with pytest.raises(ValueError):
+        instrument.channel(1).is_on = 'yes'
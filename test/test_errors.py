@@ -0,0 +1,149 @@
+import pytest
+
+from dp800.dp800 import DP832
+from dp800.errors import (CHECK_COMMAND, CHECK_FLUSH, CHECK_PERIODIC, ERROR_QUERY, ErrorChecker, InstrumentError,
+                          parse_error)
+from dp800.scpi import UNDEFINED_HEADER
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class RecordingFakeVisaDP832(FakeVisaDP832):
+
+    def __init__(self):
+        super().__init__()
+        self._strict = False
+        self.messages = []
+
+    def write(self, command):
+        self.messages.append(command)
+        super().query(command)
+
+    def query(self, command):
+        self.messages.append(command)
+        return super().query(command)
+
+
+def make_instrument(policy, **kwargs):
+    fake = RecordingFakeVisaDP832()
+    dp832 = DP832(fake, error_checker=ErrorChecker(policy, **kwargs))
+    fake.messages.clear()
+    return dp832, fake
+
+
+def test_parse_error():
+    assert parse_error('-113,"Undefined header"\n') == (-113, 'Undefined header')
+    assert parse_error('0,"No error"') == (0, 'No error')
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        ErrorChecker('sometimes')
+
+
+def test_command_policy_attributes_error():
+    dp832, fake = make_instrument(CHECK_COMMAND)
+    dp832.channel(1).voltage.setpoint.level = 1.0
+    assert len(fake.messages) == 1
+    with pytest.raises(InstrumentError) as exc_info:
+        dp832.write_many([':SOURCE1:VOLTAGE 1.0', ':BOGUS 1', ':SOURCE2:VOLTAGE 2.0'])
+    assert exc_info.value.code == UNDEFINED_HEADER
+    assert exc_info.value.command == ':BOGUS 1'
+    assert fake._channel_voltage_setpoint_levels[2] == 2.0
+
+
+def test_command_policy_query_in_error():
+    dp832, fake = make_instrument(CHECK_COMMAND)
+    with pytest.raises(InstrumentError) as exc_info:
+        dp832.query_many([':SOURCE1:VOLTAGE?', ':BOGUS?'])
+    assert exc_info.value.command == ':BOGUS?'
+    assert dp832.query_many([':SOURCE1:VOLTAGE?', ':SOURCE2:CURRENT?']) == ['0.0', '0.0']
+
+
+def test_flush_policy_checks_batch_in_one_message():
+    dp832, fake = make_instrument(CHECK_FLUSH)
+    with pytest.raises(InstrumentError) as exc_info:
+        with dp832.batch():
+            dp832.channel(1).voltage.setpoint.level = 1.0
+            dp832.write(':SOURCE2:BOGUS 1')
+            dp832.channel(3).voltage.setpoint.level = 2.0
+    assert len(fake.messages) == 1
+    assert exc_info.value.command == ':SOURCE2:BOGUS 1'
+    assert fake._channel_voltage_setpoint_levels[3] == 2.0
+
+
+def test_flush_policy_defers_writes():
+    dp832, fake = make_instrument(CHECK_FLUSH)
+    dp832.write(':BOGUS')
+    dp832.write(':SOURCE1:VOLTAGE 1.0')
+    assert fake.messages == [':BOGUS', ':SOURCE1:VOLTAGE 1.0']
+    with pytest.raises(InstrumentError) as exc_info:
+        dp832.query(':SOURCE1:VOLTAGE?')
+    assert exc_info.value.command is None
+    assert exc_info.value.candidates == (':BOGUS', ':SOURCE1:VOLTAGE 1.0')
+    assert exc_info.value.response == '1.0\n'
+    assert len(fake.messages) == 3
+
+
+def test_flush_policy_separates_deferred_errors_from_query_errors():
+    errors = []
+    dp832, fake = make_instrument(CHECK_FLUSH, on_error=errors.append)
+    dp832.write(':BOGUS')
+    assert dp832.query(':SOURCE1:VOLTAGE?') == '0.0\n'
+    assert [(error.command, error.candidates) for error in errors] == [(':BOGUS', (':BOGUS',))]
+    dp832.write(':BOGUS')
+    dp832.query(':SOURCE1:BOGUS?')
+    assert [(error.command, error.candidates) for error in errors[1:]] == [
+        (':BOGUS', (':BOGUS',)), (':SOURCE1:BOGUS?', (':SOURCE1:BOGUS?',))]
+
+
+def test_flush_policy_query_costs_no_extra_round_trip():
+    dp832, fake = make_instrument(CHECK_FLUSH)
+    assert dp832.channel(2).voltage.setpoint.level == 0.0
+    assert len(fake.messages) == 1
+
+
+def test_flush_policy_query_without_pending_writes_is_unchanged():
+    dp832, fake = make_instrument(CHECK_FLUSH)
+    dp832.channel(1).measure_all()
+    assert fake.messages == [':MEASURE:ALL? CH1']
+    dp832.write(':SOURCE1:VOLTAGE 1.0')
+    dp832.channel(1).measure_all()
+    assert ERROR_QUERY in fake.messages[-1]
+    dp832.channel(1).measure_all()
+    assert fake.messages[-1] == ':MEASURE:ALL? CH1'
+
+
+def test_periodic_policy():
+    dp832, fake = make_instrument(CHECK_PERIODIC, interval=3600)
+    dp832.write(':BOGUS')
+    assert dp832.channel(1).is_on is False
+    assert fake.messages == [':BOGUS', ':OUTPUT:STATE? CH1']
+    with pytest.raises(InstrumentError) as exc_info:
+        dp832.check_errors()
+    assert exc_info.value.candidates == (':BOGUS', ':OUTPUT:STATE? CH1')
+    dp832.check_errors()
+
+
+def test_periodic_policy_when_due():
+    dp832, fake = make_instrument(CHECK_PERIODIC, interval=0)
+    with pytest.raises(InstrumentError) as exc_info:
+        dp832.write(':BOGUS')
+    assert exc_info.value.command == ':BOGUS'
+
+
+def test_on_error_callback():
+    errors = []
+    dp832, fake = make_instrument(CHECK_COMMAND, on_error=errors.append)
+    assert dp832.query_many([':BOGUS', ':SOURCE1:VOLTAGE?']) == ['0.0']
+    assert [(error.code, error.command) for error in errors] == [(UNDEFINED_HEADER, ':BOGUS')]
+    assert list(dp832.error_checker.errors) == errors
+
+
+def test_drains_whole_queue():
+    errors = []
+    dp832, fake = make_instrument(CHECK_FLUSH, on_error=errors.append, drain_size=2)
+    for _ in range(5):
+        dp832.write(':BOGUS')
+    dp832.check_errors()
+    assert len(errors) == 5
+    assert not fake._errors
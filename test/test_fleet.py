@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+from dp800.dp800 import DP832, ChannelMode
+from dp800.fleet import DP832Fleet, ScanInProgressError, scan_instrument
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class SlowFakeVisaDP832(FakeVisaDP832):
+
+    def __init__(self, delay):
+        super().__init__()
+        self._delay = delay
+
+    def query(self, command):
+        time.sleep(self._delay)
+        return super().query(command)
+
+
+class BrokenFakeVisaDP832(FakeVisaDP832):
+
+    def __init__(self):
+        super().__init__()
+        self.broken = False
+
+    def query(self, command):
+        if self.broken:
+            raise ConnectionError("Instrument unreachable")
+        return super().query(command)
+
+
+def test_scan_instrument():
+    dp832 = DP832(FakeVisaDP832())
+    dp832.channel(2).on()
+    dp832._inst._channel_voltage_measurements[2] = 5.0
+    dp832._inst._channel_current_measurements[2] = 0.25
+    channels = scan_instrument(dp832)
+    assert list(channels.keys()) == dp832.channel_ids
+    assert channels[2].is_on
+    assert not channels[1].is_on
+    assert channels[2].mode == ChannelMode.constant_voltage
+    assert (channels[2].voltage, channels[2].current, channels[2].power) == (5.0, 0.25, 1.25)
+
+
+def test_fleet_scan_names():
+    with DP832Fleet({'a': DP832(FakeVisaDP832()), 'b': DP832(FakeVisaDP832())}) as fleet:
+        scan = fleet.scan()
+    assert list(scan.instruments.keys()) == ['a', 'b']
+    assert not scan.errors
+
+
+def test_fleet_scan_is_concurrent():
+    delay = 0.05
+    with DP832Fleet([DP832(SlowFakeVisaDP832(delay)) for _ in range(8)], max_workers=8) as fleet:
+        scan = fleet.scan()
+    assert len(scan.instruments) == 8
+    assert scan.duration < 4 * delay
+
+
+def test_fleet_scan_reports_errors():
+    broken = BrokenFakeVisaDP832()
+    with DP832Fleet({'good': DP832(FakeVisaDP832()), 'bad': DP832(broken)}) as fleet:
+        broken.broken = True
+        scan = fleet.scan()
+    assert scan.instruments['good'].error is None
+    assert scan.instruments['good'].channels is not None
+    assert isinstance(scan.errors['bad'], ConnectionError)
+    assert scan.instruments['bad'].channels is None
+
+
+def test_fleet_add_duplicate():
+    with DP832Fleet() as fleet:
+        fleet.add('a', DP832(FakeVisaDP832()))
+        with pytest.raises(ValueError):
+            fleet.add('a', DP832(FakeVisaDP832()))
+
+
+def test_fleet_remove_missing():
+    with DP832Fleet() as fleet:
+        with pytest.raises(ValueError):
+            fleet.remove('a')
+
+
+class ConcurrencyCheckingFakeVisaDP832(SlowFakeVisaDP832):
+
+    def __init__(self, delay):
+        super().__init__(delay)
+        self._busy = threading.Lock()
+        self.overlapped = False
+
+    def query(self, command):
+        if not self._busy.acquire(blocking=False):
+            self.overlapped = True
+            return super().query(command)
+        try:
+            return super().query(command)
+        finally:
+            self._busy.release()
+
+
+def test_fleet_does_not_rescan_instrument_still_being_scanned():
+    slow = ConcurrencyCheckingFakeVisaDP832(0.05)
+    with DP832Fleet({'slow': DP832(slow), 'fast': DP832(FakeVisaDP832())}) as fleet:
+        first = fleet.scan(timeout=0.01)
+        second = fleet.scan(timeout=0.01)
+        assert list(second.instruments.keys()) == ['slow', 'fast']
+        assert isinstance(first.errors['slow'], TimeoutError)
+        assert isinstance(second.errors['slow'], ScanInProgressError)
+        assert second.instruments['fast'].error is None
+        time.sleep(1.0)
+        third = fleet.scan()
+    assert third.instruments['slow'].error is None
+    assert not slow.overlapped
@@ -0,0 +1,94 @@
+import pytest
+
+from dp800.dp800 import DP832
+from dp800.instrumentation import Instrumentation, LatencyHistogram, command_template, is_timeout, VI_ERROR_TMO
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class TimingOutFakeVisaDP832(FakeVisaDP832):
+
+    def query(self, command):
+        if command.startswith(':MEASURE'):
+            raise TimeoutError("Timed out")
+        return super().query(command)
+
+
+@pytest.fixture
+def instrument():
+    return DP832(FakeVisaDP832(), instrumentation=Instrumentation())
+
+
+@pytest.mark.parametrize('message, template', [
+    (':SOURCE1:VOLTAGE:IMMEDIATE 1.000', ':SOURCE{channel}:VOLTAGE:IMMEDIATE {value}'),
+    (':SOURCE2:CURRENT:IMMEDIATE?', ':SOURCE{channel}:CURRENT:IMMEDIATE?'),
+    (':OUTPUT:STATE CH3,ON', ':OUTPUT:STATE CH{channel},{state}'),
+    (':SOURCE1:VOLTAGE:STEP? DEFAULT', ':SOURCE{channel}:VOLTAGE:STEP? DEFAULT'),
+    ('*IDN?', '*IDN?'),
+    (':MEASURE:ALL? CH1;:MEASURE:ALL? CH2', ':MEASURE:ALL? CH{channel};:MEASURE:ALL? CH{channel}'),
+])
+def test_command_template(message, template):
+    assert command_template(message) == template
+
+
+def test_stats_keyed_by_template(instrument):
+    for channel_id in instrument.channel_ids:
+        channel = instrument.channel(channel_id)
+        channel.voltage.setpoint.level = 1.0
+        channel.voltage.setpoint.level
+    stats = instrument.stats()
+    assert stats[':SOURCE{channel}:VOLTAGE:IMMEDIATE {value}']['count'] == 3
+    assert stats[':SOURCE{channel}:VOLTAGE:IMMEDIATE?']['count'] == 3
+    assert stats[':SOURCE{channel}:VOLTAGE:IMMEDIATE?']['p99'] >= 0
+
+
+def test_hooks(instrument):
+    events = []
+    instrument.instrumentation.add_hook(events.append)
+    instrument.channel(1).on()
+    assert [(event.kind, event.message) for event in events] == [('write', ':OUTPUT:STATE CH1,ON')]
+
+
+def test_errors_and_timeouts():
+    instrument = DP832(TimingOutFakeVisaDP832(), instrumentation=Instrumentation())
+    with pytest.raises(TimeoutError):
+        instrument.channel(1).voltage.measurement
+    stats = instrument.stats()[':MEASURE:VOLTAGE? CH{channel}']
+    assert stats['errors'] == 1
+    assert stats['timeouts'] == 1
+
+
+def test_disabled_stats_are_empty():
+    instrument = DP832(FakeVisaDP832())
+    instrument.channel(1).on()
+    assert instrument.stats() == {}
+
+
+def test_is_timeout_visa_error_code():
+    class VisaIOError(Exception):
+        error_code = VI_ERROR_TMO
+    assert is_timeout(VisaIOError())
+    assert not is_timeout(ValueError())
+
+
+def test_histogram_percentiles_within_relative_error():
+    histogram = LatencyHistogram()
+    for value in range(1, 100001):
+        histogram.record(value)
+    assert histogram.count == 100000
+    assert histogram.min == 1
+    assert histogram.max == 100000
+    for percent in (50, 90, 99):
+        expected = percent * 1000
+        assert abs(histogram.percentile(percent) - expected) <= expected / 64
+
+
+def test_histogram_exact_for_small_values():
+    histogram = LatencyHistogram()
+    for value in (5, 7, 9):
+        histogram.record(value)
+    assert histogram.percentile(50) == 7
+    assert histogram.percentile(100) == 9
+
+
+def test_histogram_empty():
+    assert LatencyHistogram().percentile(50) is None
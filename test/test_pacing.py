@@ -0,0 +1,133 @@
+import time
+
+import pytest
+
+from dp800.dp800 import DP832
+from dp800.pacing import AdaptivePacer
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class RecordingFakeVisaDP832(FakeVisaDP832):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def query(self, command):
+        self.messages.append(command)
+        return super().query(command)
+
+
+class SlowFakeVisaDP832(RecordingFakeVisaDP832):
+    """A fake which takes execution_time seconds to execute each command, accumulating a backlog."""
+
+    def __init__(self, execution_time):
+        super().__init__()
+        self.execution_time = execution_time
+        self._busy_until = time.monotonic()
+
+    def write(self, command):
+        # Writes are accepted at once, and executed later.
+        self._busy_until = max(self._busy_until, time.monotonic()) + self.execution_time
+        super().query(command)
+
+    def query(self, command):
+        self._busy_until = max(self._busy_until, time.monotonic()) + self.execution_time
+        delay = self._busy_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return super().query(command)
+
+
+@pytest.fixture
+def fake():
+    return RecordingFakeVisaDP832()
+
+
+def test_synchronize_queries_operation_complete(fake):
+    dp832 = DP832(fake)
+    fake.messages.clear()
+    dp832.synchronize()
+    assert fake.messages == ['*OPC?']
+
+
+def test_synchronized_sends_batch_then_one_operation_complete_query(fake):
+    dp832 = DP832(fake)
+    fake.messages.clear()
+    with dp832.synchronized():
+        dp832.channel(1).voltage.setpoint.level = 5.0
+        dp832.channel(2).voltage.setpoint.level = 6.0
+        assert fake.messages == []
+    assert len(fake.messages) == 2
+    assert fake.messages[1] == '*OPC?'
+    assert dp832.channel(2).voltage.setpoint.level == 6.0
+
+
+def test_wait_to_continue_writes_wai(fake):
+    dp832 = DP832(fake)
+    fake.messages.clear()
+    dp832.wait_to_continue()
+    assert fake.messages == ['*WAI']
+
+
+def test_direct_path_without_hooks(fake):
+    dp832 = DP832(fake)
+    assert dp832._direct
+    dp832.pacer = AdaptivePacer()
+    assert not dp832._direct
+    dp832.pacer = None
+    assert dp832._direct
+
+
+def test_pacer_probes_after_consecutive_writes(fake):
+    pacer = AdaptivePacer(probe_every=4)
+    dp832 = DP832(fake, pacer=pacer)
+    fake.messages.clear()
+    for level in range(4):
+        dp832.channel(1).voltage.setpoint.level = 1 + level
+    assert pacer.probes == 1
+    assert fake.messages.count('*OPC?') == 2
+    assert pacer.round_trip is not None
+
+
+def test_pacer_query_resets_probe_window(fake):
+    pacer = AdaptivePacer(probe_every=4)
+    dp832 = DP832(fake, pacer=pacer)
+    for level in range(3):
+        dp832.channel(1).voltage.setpoint.level = 1 + level
+    dp832.channel(1).voltage.setpoint.level
+    for level in range(3):
+        dp832.channel(1).voltage.setpoint.level = 1 + level
+    assert pacer.probes == 0
+
+
+def test_pacer_slows_down_for_a_slow_instrument():
+    fake = SlowFakeVisaDP832(execution_time=0.004)
+    pacer = AdaptivePacer(probe_every=8)
+    dp832 = DP832(fake, pacer=pacer)
+    for level in range(24):
+        dp832.channel(1).voltage.setpoint.level = 1 + level % 10
+    assert pacer.backlogged_probes >= 1
+    assert pacer.interval >= 0.002
+
+
+def test_pacer_speeds_up_for_a_fast_instrument(fake):
+    pacer = AdaptivePacer(initial_interval=0.005, probe_every=4)
+    dp832 = DP832(fake, pacer=pacer)
+    for level in range(16):
+        dp832.channel(1).voltage.setpoint.level = 1 + level % 10
+    assert pacer.interval < 0.005
+
+
+def test_pacer_interval_is_clamped():
+    fake = SlowFakeVisaDP832(execution_time=0.004)
+    pacer = AdaptivePacer(max_interval=0.001, probe_every=4)
+    dp832 = DP832(fake, pacer=pacer)
+    for level in range(12):
+        dp832.channel(1).voltage.setpoint.level = 1 + level % 10
+    assert pacer.interval <= 0.001
+
+
+def test_pacer_rejects_invalid_range():
+    with pytest.raises(ValueError):
+        AdaptivePacer(min_interval=0.2, max_interval=0.1)
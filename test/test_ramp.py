@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from dp800.dp800 import DP832
+from dp800.ramp import ramp_schedule, profile_schedule
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class RecordingFakeVisaDP832(FakeVisaDP832):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def write(self, command):
+        self.messages.append(command)
+        super().write(command)
+
+
+@pytest.fixture
+def instrument():
+    return DP832(RecordingFakeVisaDP832())
+
+
+def test_ramp_schedule_duration():
+    times, levels = ramp_schedule(0.0, 10.0, duration=1.0, interval=0.1)
+    assert len(times) == len(levels) == 11
+    assert times[-1] == 1.0
+    assert levels[0] == 0.0
+    assert levels[-1] == 10.0
+
+
+def test_ramp_schedule_rate():
+    times, levels = ramp_schedule(10.0, 5.0, rate=2.5, interval=0.5)
+    assert times[-1] == 2.0
+    assert levels[-1] == 5.0
+    assert np.all(np.diff(levels) < 0)
+
+
+def test_ramp_schedule_requires_one_of_rate_and_duration():
+    with pytest.raises(ValueError):
+        ramp_schedule(0.0, 1.0)
+    with pytest.raises(ValueError):
+        ramp_schedule(0.0, 1.0, rate=1.0, duration=1.0)
+
+
+def test_profile_schedule_rejects_decreasing_times():
+    with pytest.raises(ValueError):
+        profile_schedule([0.0, 2.0, 1.0], [1.0, 2.0, 3.0])
+
+
+def test_ramp(instrument):
+    setpoint = instrument.channel(1).voltage.setpoint
+    playback = setpoint.ramp(1.0, 2.0, duration=0.05, interval=0.01)
+    stats = playback.wait(timeout=5).stats
+    assert stats.points == 6
+    assert stats.written + stats.skipped == 6
+    assert stats.requested_duration == pytest.approx(0.05)
+    assert stats.max_lateness >= 0
+    assert setpoint.level == 2.0
+    assert instrument._inst.messages[-1] == ':SOURCE1:VOLTAGE:IMMEDIATE 2.000'
+
+
+def test_ramp_out_of_range(instrument):
+    with pytest.raises(ValueError):
+        instrument.channel(3).voltage.setpoint.ramp(0.0, 6.0, duration=1.0)
+
+
+def test_play_and_cancel(instrument):
+    setpoint = instrument.channel(2).current.setpoint
+    playback = setpoint.play([0.0, 10.0], [0.5, 1.0])
+    playback.cancel()
+    stats = playback.wait(timeout=5).stats
+    assert playback.is_cancelled
+    assert stats.written <= 1
+    assert setpoint.level != 1.0
@@ -0,0 +1,121 @@
+import pytest
+
+from dp800.scpi import (
+    Dispatcher, SCPIError, parse_message, parse_unit, mnemonic_forms, keyword_matches,
+    UNDEFINED_HEADER, MISSING_PARAMETER, PARAMETER_NOT_ALLOWED, HEADER_SUFFIX_OUT_OF_RANGE, EXECUTION_ERROR)
+
+
+class Target:
+
+    def __init__(self):
+        self.levels = {}
+
+    def set_level(self, channel, value):
+        self.levels[channel] = value
+
+    def get_level(self, channel):
+        return str(self.levels.get(channel, 0.0))
+
+    def step(self, channel, default=None):
+        return 'DEFAULT' if keyword_matches(default, 'DEFault') else 'STEP'
+
+    def identify(self):
+        return 'IDN'
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = Dispatcher()
+    dispatcher.register('*IDN?', Target.identify)
+    dispatcher.register(':SOURce#:VOLTage[:LEVel][:IMMediate]', Target.set_level)
+    dispatcher.register(':SOURce#:VOLTage[:LEVel][:IMMediate]?', Target.get_level)
+    dispatcher.register(':SOURce#:VOLTage[:LEVel][:IMMediate]:STEP?', Target.step)
+    return dispatcher
+
+
+def test_mnemonic_forms():
+    assert mnemonic_forms('VOLTage') == ('VOLT', 'VOLTAGE')
+    assert mnemonic_forms('DC') == ('DC', 'DC')
+
+
+def test_parse_unit():
+    unit = parse_unit(':SOURce2:volt:LEV 1.5,CH1,"a,b"')
+    assert unit.rooted
+    assert unit.elements == (('SOURCE', 2), ('VOLT', None), ('LEV', None))
+    assert not unit.query
+    assert unit.arguments == (1.5, 'CH1', 'a,b')
+
+
+def test_parse_message_respects_quotes():
+    units = parse_message('*IDN?;:SYST:ERR? "x;y"')
+    assert len(units) == 2
+    assert units[1].arguments == ('x;y',)
+
+
+@pytest.mark.parametrize('header', [
+    ':SOURCE1:VOLTAGE', ':SOUR1:VOLT', ':sour1:volt:lev:imm', ':SOURce1:VOLTage:IMMediate', 'SOUR1:VOLT:LEVEL'])
+def test_long_and_short_forms(dispatcher, header):
+    target = Target()
+    dispatcher.execute(target, header + ' 2.5')
+    assert target.levels == {1: 2.5}
+
+
+def test_intermediate_abbreviation_is_undefined(dispatcher):
+    with pytest.raises(SCPIError) as exc_info:
+        dispatcher.execute(Target(), ':SOURC1:VOLT 1.0')
+    assert exc_info.value.code == UNDEFINED_HEADER
+
+
+def test_compound_message(dispatcher):
+    target = Target()
+    responses = dispatcher.execute(target, '*IDN?;:SOUR1:VOLT 1.0;:SOUR2:VOLT 2.0;:SOUR1:VOLT?;:SOUR2:VOLT?')
+    assert responses == ['IDN', '1.0', '2.0']
+
+
+def test_relative_header(dispatcher):
+    target = Target()
+    responses = dispatcher.execute(target, ':SOUR1:VOLT:LEV 3.0;LEV?')
+    assert responses == ['3.0']
+
+
+def test_common_command_does_not_change_path(dispatcher):
+    target = Target()
+    responses = dispatcher.execute(target, ':SOUR1:VOLT:LEV 3.0;*IDN?;LEV?')
+    assert responses == ['IDN', '3.0']
+
+
+def test_optional_arguments(dispatcher):
+    assert dispatcher.execute(Target(), ':SOUR1:VOLT:STEP?;:SOUR1:VOLT:STEP? DEF') == ['STEP', 'DEFAULT']
+
+
+def test_missing_parameter(dispatcher):
+    with pytest.raises(SCPIError) as exc_info:
+        dispatcher.execute(Target(), ':SOUR1:VOLT')
+    assert exc_info.value.code == MISSING_PARAMETER
+
+
+def test_parameter_not_allowed(dispatcher):
+    with pytest.raises(SCPIError) as exc_info:
+        dispatcher.execute(Target(), ':SOUR1:VOLT? 1,2')
+    assert exc_info.value.code == PARAMETER_NOT_ALLOWED
+
+
+def test_suffix_not_allowed(dispatcher):
+    with pytest.raises(SCPIError) as exc_info:
+        dispatcher.execute(Target(), ':SOUR1:VOLT2 1.0')
+    assert exc_info.value.code == HEADER_SUFFIX_OUT_OF_RANGE
+
+
+def test_handler_failure_is_scpi_error(dispatcher):
+    errors = []
+    # The handler adds the missing suffix, None, to a number, raising TypeError.
+    dispatcher.register(':SOURce#:VOLTage:OFFSet', lambda target, channel, value: channel + value)
+    responses = dispatcher.execute(Target(), ':SOUR:VOLT:OFFS 1;*IDN?', on_error=errors.append)
+    assert responses == ['IDN']
+    assert [error.code for error in errors] == [EXECUTION_ERROR]
+    assert errors[0].command == ':SOUR:VOLT:OFFS 1.0'
+
+
+def test_duplicate_registration(dispatcher):
+    with pytest.raises(ValueError):
+        dispatcher.register(':SOURce#:VOLTage?', Target.get_level)
@@ -0,0 +1,137 @@
+
+import pytest
+
+from dp800.cache import StateCache
+from dp800.dp800 import DP832
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class RecordingFakeVisaDP832(FakeVisaDP832):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def write(self, command):
+        self.messages.append(command)
+        super().write(command)
+
+
+@pytest.fixture
+def instrument():
+    return DP832(RecordingFakeVisaDP832())
+
+
+def test_upload(instrument):
+    sequence = instrument.channel(2).sequence
+    sequence.upload([(1.0, 0.5, 2.0), (2.0, 0.5, 3.0)], cycles=4, end_state='last')
+    fake = instrument._inst
+    assert fake._channel_timer_parameters[2] == {1: (1.0, 0.5, 2.0), 2: (2.0, 0.5, 3.0)}
+    assert fake._channel_timer_groups[2] == 2
+    assert fake._channel_timer_cycles[2] == 4
+    assert fake._channel_timer_end_states[2] == 'LAST'
+    assert len(fake.messages) == 1
+    assert sequence.duration == 5.0
+
+
+def test_upload_many_points_in_few_messages(instrument):
+    points = [(1.0 + index * 0.01, 1.0, 1.0) for index in range(2048)]
+    instrument.channel(1).sequence.upload(points, cycles=None)
+    fake = instrument._inst
+    assert len(fake._channel_timer_parameters[1]) == 2048
+    assert fake._channel_timer_parameters[1][2048] == (21.47, 1.0, 1.0)
+    assert fake._channel_timer_cycles[1] is None
+    assert len(fake.messages) <= 80
+    assert all(len(message) <= 1024 for message in fake.messages)
+    assert all(command.count(',') == 3 for message in fake.messages
+               for command in message.split(';') if command.startswith(':TIMER:PARAMETER'))
+
+
+def test_upload_validates(instrument):
+    sequence = instrument.channel(3).sequence
+    with pytest.raises(ValueError):
+        sequence.upload([(6.0, 1.0, 1.0)])
+    with pytest.raises(ValueError):
+        sequence.upload([(1.0, 1.0, 0.0)])
+    with pytest.raises(ValueError):
+        sequence.upload([(1.0, 1.0, 0.5)])
+    with pytest.raises(ValueError):
+        sequence.upload([(1.0, 1.0, 100000.0)])
+    with pytest.raises(ValueError):
+        sequence.upload([])
+    with pytest.raises(ValueError):
+        sequence.upload([(1.0, 1.0, 1.0)] * 2049)
+    with pytest.raises(ValueError):
+        sequence.upload([(1.0, 1.0, 1.0)], end_state='hold')
+
+
+def test_start_stop(instrument):
+    sequence = instrument.channel(1).sequence
+    sequence.upload([(1.0, 0.5, 10.0), (2.0, 0.5, 10.0)])
+    assert not sequence.is_running
+    sequence.start()
+    assert sequence.is_running
+    progress = sequence.progress()
+    assert progress.is_running
+    assert (progress.cycle, progress.point) == (0, 0)
+    sequence.stop()
+    assert not sequence.is_running
+
+
+def test_sequence_runs_to_completion(instrument):
+    sequence = instrument.channel(1).sequence
+    sequence.upload([(1.0, 0.5, 1.0), (2.0, 0.5, 1.0)], cycles=1, end_state='LAST')
+    sequence.start()
+    # Let the simulated timer run past the end of the sequence.
+    instrument._inst._channel_timer_started[1] -= 3.0
+    assert not sequence.is_running
+    assert instrument.channel(1).voltage.setpoint.level == 2.0
+
+
+def test_start_channels_in_batch(instrument):
+    for channel_id in (1, 2):
+        instrument.channel(channel_id).sequence.upload([(1.0, 0.5, 10.0)])
+    with instrument.batch():
+        instrument.channel(1).sequence.start()
+        instrument.channel(2).sequence.start()
+    assert instrument.channel(1).sequence.is_running
+    assert instrument.channel(2).sequence.is_running
+
+
+def test_upload_in_batch(instrument):
+    points = [(1.0 + index * 0.01, 1.0, 1.0) for index in range(200)]
+    with instrument.batch():
+        instrument.channel(1).sequence.upload(points)
+        instrument.channel(2).sequence.upload(points[:3])
+    fake = instrument._inst
+    assert len(fake._channel_timer_parameters[1]) == 200
+    assert fake._channel_timer_parameters[1][200] == (2.99, 1.0, 1.0)
+    assert len(fake._channel_timer_parameters[2]) == 3
+
+
+def test_sequence_bypasses_state_cache():
+    fake = RecordingFakeVisaDP832()
+    dp832 = DP832(fake, cache=StateCache())
+    channel = dp832.channel(1)
+    channel.voltage.setpoint.level = 5.0
+    sequence = channel.sequence
+    sequence.upload([(1.0, 0.5, 1.0), (2.0, 0.5, 1.0)], cycles=1, end_state='LAST')
+    assert channel.voltage.setpoint.level == 5.0
+    sequence.start()
+    assert channel.voltage.setpoint.level == 1.0
+    fake._channel_timer_started[1] -= 1.5
+    assert channel.voltage.setpoint.level == 2.0
+    assert channel.voltage.setpoint._level_query not in dp832.cache
+    fake._channel_timer_started[1] -= 1.5
+    assert not sequence.is_running
+    assert channel.voltage.setpoint.level == channel.applied().voltage == 2.0
+    assert channel.voltage.setpoint._level_query in dp832.cache
+
+
+def test_upload_invalidates_state_cache():
+    dp832 = DP832(RecordingFakeVisaDP832(), cache=StateCache())
+    channel = dp832.channel(2)
+    channel.current.setpoint.level
+    channel.current.protection.level
+    channel.sequence.upload([(1.0, 0.5, 1.0)])
+    assert len(dp832.cache) == 0
@@ -0,0 +1,179 @@
+import threading
+
+import pytest
+
+from dp800.cache import SETPOINT_LEVEL, StateCache
+from dp800.shared import HIGH, LOW, NORMAL, IOWorker, SharedDP832, is_coalescable
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class GatedFakeVisaDP832(FakeVisaDP832):
+    """A fake which records the messages it executes, and holds them until the gate is opened."""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.waiting = threading.Event()
+
+    def query(self, command):
+        self.messages.append(command)
+        self.waiting.set()
+        self.gate.wait()
+        return super().query(command)
+
+
+@pytest.fixture
+def fake():
+    return GatedFakeVisaDP832()
+
+
+@pytest.fixture
+def worker(fake):
+    worker = IOWorker(fake)
+    yield worker
+    fake.gate.set()
+    worker.close()
+
+
+def hold(fake, worker):
+    """Occupy the worker with a request which waits for the gate."""
+    fake.gate.clear()
+    fake.waiting.clear()
+    future = worker.submit_query('*IDN?')
+    fake.waiting.wait(1)
+    fake.messages.clear()
+    return future
+
+
+def test_identical_pending_reads_are_coalesced(fake, worker):
+    held = hold(fake, worker)
+    futures = [worker.submit_query(':SOURCE1:VOLTAGE?') for _ in range(5)]
+    fake.gate.set()
+    held.result(1)
+    assert len({future.result(1) for future in futures}) == 1
+    assert fake.messages == [':SOURCE1:VOLTAGE?']
+    assert worker.coalesced == 4
+
+
+def test_state_changing_reads_are_not_coalesced(fake, worker):
+    held = hold(fake, worker)
+    futures = [worker.submit_query(':SYSTEM:ERROR?') for _ in range(3)]
+    fake.gate.set()
+    held.result(1)
+    for future in futures:
+        future.result(1)
+    assert fake.messages == [':SYSTEM:ERROR?'] * 3
+
+
+def test_higher_priority_requests_overtake_backlog(fake, worker):
+    held = hold(fake, worker)
+    low = [worker.submit_query(':SOURCE{}:VOLTAGE?'.format(channel_id), LOW) for channel_id in (1, 2)]
+    high = worker.submit_query(':SOURCE3:CURRENT?', HIGH)
+    normal = worker.submit_query(':SOURCE3:VOLTAGE?', NORMAL)
+    fake.gate.set()
+    for future in [held, high, normal] + low:
+        future.result(1)
+    assert fake.messages == [':SOURCE3:CURRENT?', ':SOURCE3:VOLTAGE?', ':SOURCE1:VOLTAGE?', ':SOURCE2:VOLTAGE?']
+
+
+def test_coalesced_read_is_promoted(fake, worker):
+    held = hold(fake, worker)
+    low = worker.submit_query(':SOURCE1:VOLTAGE?', LOW)
+    normal = worker.submit_query(':SOURCE2:VOLTAGE?', NORMAL)
+    high = worker.submit_query(':SOURCE1:VOLTAGE?', HIGH)
+    fake.gate.set()
+    for future in (held, low, normal, high):
+        future.result(1)
+    assert fake.messages == [':SOURCE1:VOLTAGE?', ':SOURCE2:VOLTAGE?']
+
+
+def test_thread_priority_applies_to_blocking_calls(fake, worker):
+    with worker.priority(HIGH):
+        assert worker.current_priority == HIGH
+    assert worker.current_priority == NORMAL
+
+
+def test_exceptions_are_delivered_to_requester(worker):
+    future = worker.submit_write(':SOURCE1:BOGUS 1')
+    with pytest.raises(Exception):
+        future.result(1)
+    assert float(worker.query(':SOURCE1:VOLTAGE?')) == 0.0
+
+
+def test_closed_worker_rejects_requests(worker):
+    worker.close()
+    with pytest.raises(RuntimeError):
+        worker.submit_query('*IDN?')
+
+
+def test_shared_dp832_from_many_threads():
+    with SharedDP832(FakeVisaDP832()) as dp832:
+        errors = []
+
+        def exercise(channel_id):
+            try:
+                setpoint = dp832.channel(channel_id).current.setpoint
+                for step in range(1, 30):
+                    setpoint.level = step / 10
+                    assert setpoint.level == pytest.approx(step / 10)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=exercise, args=(channel_id,)) for channel_id in dp832.channel_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+
+
+def test_shared_dp832_batches_are_per_thread(fake):
+    with SharedDP832(fake) as dp832:
+        with dp832.batch():
+            thread = threading.Thread(target=setattr, args=(dp832.channel(2).voltage.setpoint, 'level', 6.0))
+            thread.start()
+            thread.join()
+            assert dp832._batch is not None
+            dp832.channel(1).voltage.setpoint.level = 5.0
+            assert fake.messages[-1] == ':SOURCE2:VOLTAGE:IMMEDIATE 6.000'
+        assert fake.messages[-1] == ':SOURCE1:VOLTAGE:IMMEDIATE 5.000'
+
+
+def test_is_coalescable():
+    assert is_coalescable(':SOURCE1:VOLTAGE?')
+    assert is_coalescable(':OUTPUT:STATE? CH1;:MEASURE:ALL? CH1')
+    assert not is_coalescable(':SOURCE1:VOLTAGE 1.0')
+    assert not is_coalescable(':SYSTEM:ERROR?')
+    assert not is_coalescable(':STATUS:QUESTIONABLE:INSTRUMENT:ISUMMARY1?')
+    assert not is_coalescable('*ESR?')
+
+
+def test_shared_dp832_cache_read_does_not_overwrite_concurrent_write(fake):
+    with SharedDP832(fake, cache=StateCache()) as dp832:
+        setpoint = dp832.channel(1).voltage.setpoint
+        cache = dp832.cache
+        generation = cache.generation
+        setpoint.level = 5.0
+        cache.store_read(SETPOINT_LEVEL, setpoint._level_query, '0.000', generation)
+        assert setpoint.level == 5.0
+
+
+def test_shared_dp832_cache_from_many_threads(fake):
+    with SharedDP832(fake, cache=StateCache(default_ttl=0.0001)) as dp832:
+        errors = []
+
+        def exercise():
+            try:
+                for _ in range(200):
+                    dp832.channel(1).voltage.setpoint.level
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=exercise) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
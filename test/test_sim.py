@@ -0,0 +1,159 @@
+import asyncio
+import time
+
+import pytest
+
+from dp800.aio import AsyncDP832, AsyncSocketTransport
+from dp800.dp800 import DP832
+from dp800.scpi import SCPIError
+from dp800.sim import SimulatedDP832, SimulatorServer
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_simulated_instrument_in_process():
+    dp832 = DP832(SimulatedDP832())
+    dp832.channel(1).voltage.setpoint.level = 3.3
+    assert dp832.channel(1).voltage.setpoint.level == 3.3
+
+
+def test_strict_raises():
+    with pytest.raises(SCPIError):
+        SimulatedDP832(strict=True).write(':NO:SUCH:COMMAND')
+
+
+def test_error_queue():
+    instrument = SimulatedDP832(strict=False)
+    instrument.write(':NO:SUCH:COMMAND')
+    instrument.write(':SOURCE1:VOLTAGE MAX')
+    assert instrument.query(':SYSTEM:ERROR?') == '-113,"Undefined header"\n'
+    assert instrument.query(':SYST:ERR?') == '-104,"Data type error"\n'
+    assert instrument.query(':SYST:ERR?') == '0,"No error"\n'
+
+
+def test_error_does_not_abort_message():
+    instrument = SimulatedDP832(strict=False)
+    assert instrument.query(':NO:SUCH?;*IDN?').startswith('RIGOL')
+
+
+def test_missing_suffix_means_selected_channel():
+    instrument = SimulatedDP832(strict=False)
+    instrument.write(':INSTRUMENT:NSELECT 2;:SOUR:VOLT 1')
+    assert instrument._channel_voltage_setpoint_levels[2] == 1.0
+    assert instrument.query(':SOUR:VOLT?') == '1.0\n'
+
+
+def test_invalid_suffix_is_queued():
+    instrument = SimulatedDP832(strict=False)
+    instrument.write(':SOUR0:VOLT 3;:SOUR4:VOLT 3')
+    assert instrument._channel_voltage_setpoint_levels[0] is None
+    assert instrument.query(':SYST:ERR?') == '-114,"Header suffix out of range"\n'
+    assert instrument.query(':SYST:ERR?') == '-114,"Header suffix out of range"\n'
+
+
+def test_boolean_arguments():
+    instrument = SimulatedDP832(strict=False)
+    instrument.write(':OUTP CH1,1;:OUTP CH2,FOO;:OUTP CH5,ON')
+    assert instrument.query(':OUTP? CH1;:OUTP? CH2') == 'ON;OFF\n'
+    assert instrument.query(':SYST:ERR?') == '-104,"Data type error"\n'
+    assert instrument.query(':SYST:ERR?') == '-224,"Illegal parameter value"\n'
+
+
+def test_handler_failure_is_queued():
+    instrument = SimulatedDP832(strict=False)
+    instrument.write(':SOURCE1:VOLTAGE:PROTECTION:STATE')
+    instrument.write(':STATUS:QUESTIONABLE:ENABLE CH1')
+    assert instrument.query(':SYST:ERR?').startswith('-109')
+    assert instrument.query(':SYST:ERR?').startswith('-')
+    assert instrument.query('*IDN?').startswith('RIGOL')
+
+
+def test_serve_async_clients():
+    async def scenario():
+        instruments = [SimulatedDP832(serial='DP8A00000{}'.format(index), strict=False) for index in range(3)]
+        async with SimulatorServer(instruments, port=0) as server:
+            clients = [await AsyncDP832.open(AsyncSocketTransport(host, port)) for host, port in server.addresses]
+            await asyncio.gather(*(client.channel(2).voltage.setpoint.set_level(float(index + 1))
+                                   for index, client in enumerate(clients)))
+            levels = await asyncio.gather(*(client.channel(2).voltage.setpoint.level() for client in clients))
+            for client in clients:
+                await client.transport.close()
+        return levels, [instrument._channel_voltage_setpoint_levels[2] for instrument in instruments]
+    levels, simulated_levels = run(scenario())
+    assert levels == [1.0, 2.0, 3.0]
+    assert simulated_levels == [1.0, 2.0, 3.0]
+
+
+def test_raw_socket_compound_query():
+    async def scenario():
+        async with SimulatorServer([SimulatedDP832(strict=False)], port=0) as server:
+            host, port = server.addresses[0]
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(b':OUTPUT:STATE CH1,ON;:OUTPUT:STATE? CH1;:OUTPUT:STATE? CH2\n')
+            await writer.drain()
+            response = await reader.readline()
+            writer.close()
+            return response
+    assert run(scenario()) == b'ON;OFF\n'
+
+
+def test_latency():
+    async def scenario():
+        async with SimulatorServer([SimulatedDP832(strict=False)], port=0, latency=0.02) as server:
+            transport = AsyncSocketTransport(*server.addresses[0])
+            start = time.monotonic()
+            await transport.query('*IDN?')
+            elapsed = time.monotonic() - start
+            await transport.close()
+            return elapsed
+    assert run(scenario()) >= 0.02
+
+
+def test_timed_out_query_does_not_leave_response_for_next():
+    async def scenario():
+        async with SimulatorServer([SimulatedDP832(strict=False)], port=0, latency=0.05) as server:
+            transport = AsyncSocketTransport(*server.addresses[0], timeout=0.01)
+            with pytest.raises(asyncio.TimeoutError):
+                await transport.query('*IDN?')
+            transport._timeout = 1.0
+            response = await transport.query(':OUTPUT:STATE? CH1')
+            await transport.close()
+            return response
+    assert run(scenario()) == 'OFF\n'
+
+
+def test_cancelled_query_does_not_leave_response_for_next():
+    async def scenario():
+        async with SimulatorServer([SimulatedDP832(strict=False)], port=0, latency=0.05) as server:
+            transport = AsyncSocketTransport(*server.addresses[0])
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(transport.query('*IDN?'), 0.01)
+            response = await transport.query(':OUTPUT:STATE? CH1')
+            await transport.close()
+            return response
+    assert run(scenario()) == 'OFF\n'
+
+
+def test_query_reconnects_after_instrument_closes_connection():
+    async def scenario():
+        connections = []
+
+        async def handle(reader, writer):
+            connections.append(writer)
+            await reader.readline()
+            if len(connections) > 1:
+                writer.write(b'OFF\n')
+                await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        async with server:
+            transport = AsyncSocketTransport(*server.sockets[0].getsockname()[:2], timeout=1.0)
+            with pytest.raises(ConnectionError):
+                await transport.query(':OUTPUT:STATE? CH1')
+            response = await transport.query(':OUTPUT:STATE? CH1')
+            await transport.close()
+        return response, len(connections)
+    assert run(scenario()) == ('OFF\n', 2)
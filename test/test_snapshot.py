@@ -0,0 +1,137 @@
+import pytest
+
+from dp800.cache import StateCache
+from dp800.dp800 import DP832
+from dp800.scpi import split_units
+from dp800.snapshot import Snapshot
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class RecordingFakeVisaDP832(FakeVisaDP832):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def query(self, command):
+        self.messages.append(command)
+        return super().query(command)
+
+
+class TrippingFakeVisaDP832(RecordingFakeVisaDP832):
+    """A fake which executes each unit separately, tripping protection on a live output whose setpoint exceeds it."""
+
+    def query(self, command):
+        self.messages.append(command)
+        responses = []
+        for unit in split_units(command):
+            response = FakeVisaDP832.query(self, unit)
+            if response is not None:
+                responses.append(response.strip())
+            for channel_index in (1, 2, 3):
+                if self._channel_states[channel_index] != 'ON':
+                    continue
+                if self._channel_voltage_setpoint_levels[channel_index] > \
+                        self._channel_voltage_protection_levels[channel_index]:
+                    self._channel_voltage_protection_tripped[channel_index] = 'ON'
+                if self._channel_current_setpoint_levels[channel_index] > \
+                        self._channel_current_protection_levels[channel_index]:
+                    self._channel_current_protection_tripped[channel_index] = 'ON'
+        return ';'.join(responses) + '\n' if responses else None
+
+
+@pytest.fixture
+def instrument():
+    return DP832(RecordingFakeVisaDP832())
+
+
+def test_snapshot_single_round_trip(instrument):
+    fake = instrument._inst
+    fake._channel_voltage_setpoint_levels[2] = 12.5
+    fake._channel_current_protection_states[3] = 'ON'
+    fake._channel_states[1] = 'ON'
+    fake.messages.clear()
+    snapshot = instrument.snapshot()
+    assert len(fake.messages) == 1
+    assert isinstance(snapshot, Snapshot)
+    assert [channel.channel_id for channel in snapshot.channels] == instrument.channel_ids
+    assert snapshot.channels[1].voltage_level == 12.5
+    assert snapshot.channels[2].over_current_enabled is True
+    assert snapshot.channels[0].is_on is True
+    assert snapshot.channels[0].over_voltage_level == 33.0
+    with pytest.raises(AttributeError):
+        snapshot.channels[0].is_on = False
+
+
+def test_restore_writes_only_changes(instrument):
+    fake = instrument._inst
+    baseline = instrument.snapshot()
+    instrument.channel(1).voltage.setpoint.level = 5.0
+    instrument.channel(3).current.protection.level = 2.0
+    fake.messages.clear()
+    assert instrument.restore(baseline) == 2
+    assert fake.messages[1:] == [':SOURCE3:CURRENT:PROTECTION 3.300;:SOURCE1:VOLTAGE:IMMEDIATE 0.000']
+    assert instrument.snapshot() == baseline
+
+
+def test_restore_unchanged_writes_nothing(instrument):
+    baseline = instrument.snapshot()
+    instrument._inst.messages.clear()
+    assert instrument.restore(baseline) == 0
+    assert len(instrument._inst.messages) == 1
+
+
+def test_restore_safe_order(instrument):
+    fake = instrument._inst
+    fake._channel_states[1] = 'ON'
+    target = instrument.snapshot()
+    fake._channel_states[1] = 'OFF'
+    fake._channel_states[2] = 'ON'
+    fake._channel_voltage_protection_states[2] = 'ON'
+    instrument.channel(1).voltage.setpoint.level = 2.0
+    instrument.channel(1).voltage.protection.level = 1.0
+    fake.messages.clear()
+    instrument.restore(target)
+    commands = fake.messages[-1].split(';')
+    assert commands[0] == ':OUTPUT:STATE CH2,OFF'
+    assert commands[-1] == ':OUTPUT:STATE CH1,ON'
+    assert commands.index(':SOURCE1:VOLTAGE:PROTECTION 33.000') < commands.index(':SOURCE1:VOLTAGE:IMMEDIATE 0.000')
+    assert instrument.snapshot() == target
+
+
+@pytest.mark.parametrize('direction', [-1, 1])
+def test_restore_on_live_output_never_trips(direction):
+    fake = TrippingFakeVisaDP832()
+    instrument = DP832(fake)
+    channel = instrument.channel(1)
+    channel.voltage.protection.level = 10.0
+    channel.current.protection.level = 2.0
+    channel.voltage.setpoint.level = 9.0
+    channel.current.setpoint.level = 1.5
+    channel.on()
+    initial = instrument.snapshot()
+    channel.off()
+    channel.voltage.protection.level = 10.0 + 5.0 * direction
+    channel.current.protection.level = 2.0 + 0.5 * direction
+    channel.voltage.setpoint.level = 9.0 + 5.0 * direction
+    channel.current.setpoint.level = 1.5 + 0.5 * direction
+    channel.on()
+    target = instrument.snapshot()
+    instrument.restore(initial)
+    instrument.restore(target)
+    assert not channel.voltage.protection.has_tripped
+    assert not channel.current.protection.has_tripped
+    assert instrument.snapshot() == target
+
+
+def test_snapshot_uses_cache():
+    fake = RecordingFakeVisaDP832()
+    instrument = DP832(fake, cache=StateCache())
+    instrument.snapshot()
+    fake.messages.clear()
+    snapshot = instrument.snapshot()
+    assert fake.messages == [':OUTPUT:STATE? CH1;:OUTPUT:STATE? CH2;:OUTPUT:STATE? CH3']
+    instrument.channel(2).voltage.setpoint.level = 3.0
+    instrument.restore(snapshot)
+    fake.messages.clear()
+    assert instrument.snapshot() == snapshot
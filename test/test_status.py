@@ -0,0 +1,181 @@
+import threading
+import time
+
+import pytest
+
+from dp800.dp800 import DP832
+from dp800.status import QUESTIONABLE_INSTRUMENT, STB_QUESTIONABLE, STB_SERVICE_REQUEST, STB_STANDARD_EVENT, StatusEvent
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class CountingFakeVisaDP832(FakeVisaDP832):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def query(self, command):
+        self.messages.append(command)
+        return super().query(command)
+
+
+class SRQFakeVisaDP832(CountingFakeVisaDP832):
+
+    def wait_for_srq(self, timeout=25000):
+        deadline = time.monotonic() + timeout / 1000
+        while not self.status_byte() & STB_SERVICE_REQUEST:
+            if time.monotonic() >= deadline:
+                raise TimeoutError("No service request")
+            time.sleep(0.001)
+
+
+@pytest.fixture
+def instrument():
+    return DP832(CountingFakeVisaDP832())
+
+
+def conditions(events):
+    return {(event.channel_id, event.condition, event.active) for event in events}
+
+
+def test_configure(instrument):
+    monitor = instrument.status_monitor()
+    monitor.configure()
+    fake = instrument._inst
+    assert fake._service_request_enable == STB_QUESTIONABLE | STB_STANDARD_EVENT
+    assert fake._channel_isum_enables[1:] == [15, 15, 15]
+    assert fake._questionable_instrument_enable == 0b1110
+    assert fake.status_byte() == 0
+
+
+def test_idle_check_is_one_query(instrument):
+    monitor = instrument.status_monitor()
+    monitor.configure()
+    instrument._inst.messages.clear()
+    assert monitor.check() == []
+    assert monitor.check() == []
+    assert instrument._inst.messages == ['*STB?', '*STB?']
+
+
+def test_trip_is_decoded(instrument):
+    monitor = instrument.status_monitor()
+    monitor.configure()
+    instrument._inst._channel_current_protection_tripped[2] = 'ON'
+    received = []
+    monitor.add_callback(received.append)
+    events = monitor.check()
+    assert conditions(events) == {(2, 'over_current_tripped', True)}
+    assert received == events
+    assert monitor.check() == []
+    instrument.channel(2).current.protection.clear()
+    assert conditions(monitor.check()) == {(2, 'over_current_tripped', False)}
+
+
+def test_mode_change_is_decoded(instrument):
+    monitor = instrument.status_monitor()
+    monitor.configure()
+    instrument._inst._channel_modes[3] = 'CC'
+    assert conditions(monitor.check()) == {
+        (3, 'constant_current', True),
+        (3, 'constant_voltage', False),
+    }
+
+
+def test_standard_event_is_decoded():
+    fake = CountingFakeVisaDP832()
+    fake._strict = False
+    dp832 = DP832(fake)
+    monitor = dp832.status_monitor()
+    monitor.configure()
+    dp832.write(':BOGUS:COMMAND')
+    events = monitor.check()
+    assert conditions(events) == {(None, 'command_error', True)}
+    assert all(isinstance(event, StatusEvent) for event in events)
+
+
+def test_service_request():
+    dp832 = DP832(SRQFakeVisaDP832())
+    monitor = dp832.status_monitor(poll_interval=0.01)
+    assert monitor.uses_srq
+    monitor.configure()
+    assert monitor.wait(timeout=0.02) == []
+    dp832._inst._channel_voltage_protection_tripped[1] = 'ON'
+    assert conditions(monitor.wait(timeout=1.0)) == {(1, 'over_voltage_tripped', True)}
+
+
+def test_background_monitor(instrument):
+    detected = threading.Event()
+    received = []
+
+    def on_event(event):
+        received.append(event)
+        detected.set()
+
+    with instrument.status_monitor(poll_interval=0.005) as monitor:
+        monitor.add_callback(on_event)
+        assert not monitor.uses_srq
+        instrument._inst._channel_voltage_protection_tripped[3] = 'ON'
+        assert detected.wait(1.0)
+    assert conditions(received) == {(3, 'over_voltage_tripped', True)}
+
+
+def test_decoding_clears_latched_summary_registers(instrument):
+    monitor = instrument.status_monitor()
+    monitor.configure()
+    instrument._inst._channel_current_protection_tripped[2] = 'ON'
+    assert conditions(monitor.check()) == {(2, 'over_current_tripped', True)}
+    assert not instrument._inst.status_byte() & STB_QUESTIONABLE
+    instrument._inst.messages.clear()
+    assert monitor.check() == []
+    assert instrument._inst.messages == ['*STB?']
+
+
+def test_summary_registers_latch():
+    fake = FakeVisaDP832()
+    DP832(fake).status_monitor().configure()
+    fake._channel_voltage_protection_tripped[1] = 'ON'
+    assert int(fake.query(':STATUS:QUESTIONABLE:INSTRUMENT:ISUMMARY1?')) == 0x04
+    assert fake.status_byte() & STB_QUESTIONABLE
+    assert int(fake.query(':STATUS:QUESTIONABLE:INSTRUMENT?')) == 0b10
+    assert int(fake.query(':STATUS:QUESTIONABLE?')) == QUESTIONABLE_INSTRUMENT
+    assert not fake.status_byte() & STB_QUESTIONABLE
+    assert int(fake.query(':STATUS:QUESTIONABLE?')) == 0
+
+
+def test_failing_callback_does_not_stop_others(instrument):
+    monitor = instrument.status_monitor()
+    monitor.configure()
+    received = []
+    monitor.add_callback(lambda event: 1 / 0)
+    monitor.add_callback(received.append)
+    instrument._inst._channel_voltage_protection_tripped[1] = 'ON'
+    events = monitor.check()
+    assert received == events and events
+
+
+class FlakyFakeVisaDP832(CountingFakeVisaDP832):
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def query(self, command):
+        if self.failures:
+            self.failures -= 1
+            raise TimeoutError("VI_ERROR_TMO")
+        return super().query(command)
+
+
+def test_background_monitor_survives_errors():
+    fake = FlakyFakeVisaDP832(failures=0)
+    dp832 = DP832(fake)
+    detected = threading.Event()
+    with dp832.status_monitor(poll_interval=0.005) as monitor:
+        monitor.add_callback(lambda event: detected.set())
+        fake.failures = 2
+        deadline = time.monotonic() + 1.0
+        while fake.failures and time.monotonic() < deadline:
+            time.sleep(0.005)
+        fake._channel_voltage_protection_tripped[2] = 'ON'
+        assert detected.wait(1.0)
+        assert isinstance(monitor.exception, TimeoutError)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from dp800.dp800 import DP832
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class RecordingFakeVisaDP832(FakeVisaDP832):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def query(self, command):
+        self.messages.append(command)
+        return super().query(command)
+
+
+@pytest.fixture
+def instrument():
+    return DP832(RecordingFakeVisaDP832())
+
+
+def test_iv_sweep(instrument):
+    fake = instrument._inst
+    fake._channel_voltage_measurements[1] = 2.0
+    fake._channel_current_measurements[1] = 0.25
+    result = instrument.channel(1).iv_sweep([1.0, 2.0, 3.0], samples_per_point=3)
+    assert list(result.setpoint) == [1.0, 2.0, 3.0]
+    assert list(result.voltage) == [2.0, 2.0, 2.0]
+    assert list(result.current) == [0.25, 0.25, 0.25]
+    assert list(result.power) == [0.5, 0.5, 0.5]
+    for array in result:
+        assert array.flags['C_CONTIGUOUS']
+    assert instrument.channel(1).voltage.setpoint.level == 3.0
+
+
+def test_iv_sweep_round_trips(instrument):
+    instrument._inst.messages.clear()
+    instrument.channel(2).iv_sweep(np.linspace(0.5, 2.5, 5), samples_per_point=2)
+    messages = instrument._inst.messages
+    assert len(messages) == 6
+    assert messages[0] == ':SOURCE2:VOLTAGE:IMMEDIATE 0.500'
+    assert messages[1] == ':MEASURE:ALL? CH2;:MEASURE:ALL? CH2;:SOURCE2:VOLTAGE:IMMEDIATE 1.000'
+    assert messages[-1] == ':MEASURE:ALL? CH2;:MEASURE:ALL? CH2'
+
+
+def test_iv_sweep_validates(instrument):
+    with pytest.raises(ValueError):
+        instrument.channel(3).iv_sweep([1.0, 6.0])
+    with pytest.raises(ValueError):
+        instrument.channel(3).iv_sweep([])
+    with pytest.raises(ValueError):
+        instrument.channel(3).iv_sweep([1.0], samples_per_point=0)
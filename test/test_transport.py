@@ -0,0 +1,78 @@
+import socket
+
+import pytest
+
+from dp800.dp800 import DP832
+from dp800.transport import SocketTransport, ConnectionPool
+from test.sim_server import running_simulator
+
+
+@pytest.fixture(scope='module')
+def simulator():
+    with running_simulator(count=2) as server:
+        yield server
+
+
+def test_nagle_disabled(simulator):
+    with SocketTransport(*simulator.addresses[0]) as transport:
+        assert transport._socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+
+
+def test_query(simulator):
+    with SocketTransport(*simulator.addresses[0]) as transport:
+        assert transport.query('*IDN?').startswith('RIGOL TECHNOLOGIES,DP832')
+
+
+def test_drop_in_for_visa_resource(simulator):
+    with SocketTransport(*simulator.addresses[0]) as transport:
+        dp832 = DP832(transport)
+        dp832.channel(3).current.setpoint.level = 1.5
+        assert dp832.channel(3).current.setpoint.level == 1.5
+        assert dp832.query_many([':OUTPUT:STATE CH1,OFF', ':OUTPUT:STATE? CH1']) == ['OFF']
+
+
+def test_pipeline(simulator):
+    with SocketTransport(*simulator.addresses[0]) as transport:
+        responses = transport.pipeline([
+            ':SOURCE1:VOLTAGE 1.000',
+            ':SOURCE1:VOLTAGE?',
+            ':SOURCE2:VOLTAGE 2.000',
+            ':SOURCE2:VOLTAGE?;:SOURCE1:VOLTAGE?'])
+    assert [response.strip() for response in responses] == ['1.0', '2.0;1.0']
+
+
+def test_long_response_grows_buffer(simulator):
+    with SocketTransport(*simulator.addresses[0], buffer_size=8) as transport:
+        assert transport.query('*IDN?').startswith('RIGOL TECHNOLOGIES,DP832')
+        assert transport.query('*IDN?').startswith('RIGOL TECHNOLOGIES,DP832')
+
+
+def test_timeout(simulator):
+    with SocketTransport(*simulator.addresses[0], timeout=0.05) as transport:
+        with pytest.raises(TimeoutError):
+            transport.query(':OUTPUT:STATE CH1,ON')
+        assert not transport.is_open
+
+
+def test_pool_reuses_connections(simulator):
+    pool = ConnectionPool()
+    with pool.connection(*simulator.addresses[0]) as first:
+        first.query('*IDN?')
+    with pool.connection(*simulator.addresses[0]) as second:
+        second.query('*IDN?')
+    with pool.connection(*simulator.addresses[1]) as third:
+        assert 'DP8A000002' in third.query('*IDN?')
+    pool.close()
+    assert first is second
+    assert third is not first
+
+
+def test_pool_discards_failed_connections(simulator):
+    pool = ConnectionPool()
+    with pytest.raises(ZeroDivisionError):
+        with pool.connection(*simulator.addresses[0]) as first:
+            1 / 0
+    with pool.connection(*simulator.addresses[0]) as second:
+        pass
+    pool.close()
+    assert first is not second
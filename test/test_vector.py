@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from dp800.cache import StateCache
+from dp800.dp800 import DP832
+from dp800.vector import ChannelArray
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class RecordingFakeVisaDP832(FakeVisaDP832):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def query(self, command):
+        self.messages.append(command)
+        return super().query(command)
+
+
+@pytest.fixture
+def instrument():
+    return DP832(RecordingFakeVisaDP832())
+
+
+def test_channels_view_is_reused(instrument):
+    assert isinstance(instrument.channels, ChannelArray)
+    assert instrument.channels is instrument.channels
+    assert instrument.channels.channel_ids == instrument.channel_ids
+    assert len(instrument.channels) == 3
+
+
+def test_set_levels_in_one_message(instrument):
+    fake = instrument._inst
+    fake.messages.clear()
+    instrument.channels.voltage.setpoint.levels = np.array([5.0, 12.0, 3.3])
+    assert len(fake.messages) == 1
+    assert [instrument.channel(channel_id).voltage.setpoint.level for channel_id in (1, 2, 3)] == [5.0, 12.0, 3.3]
+
+
+def test_read_levels_in_one_message(instrument):
+    fake = instrument._inst
+    fake._channel_current_setpoint_levels[2] = 1.5
+    fake.messages.clear()
+    levels = instrument.channels.current.setpoint.levels
+    assert len(fake.messages) == 1
+    assert isinstance(levels, np.ndarray)
+    assert levels[1] == 1.5
+
+
+def test_scalar_level_is_broadcast(instrument):
+    instrument.channels.current.setpoint.levels = 0.5
+    np.testing.assert_array_equal(instrument.channels.current.setpoint.levels, [0.5, 0.5, 0.5])
+
+
+def test_out_of_range_level_sets_nothing(instrument):
+    fake = instrument._inst
+    fake.messages.clear()
+    with pytest.raises(ValueError) as excinfo:
+        instrument.channels.voltage.setpoint.levels = [5.0, 5.0, 6.0]
+    assert 'Voltage 6.0 V' in str(excinfo.value)
+    assert fake.messages == []
+
+
+def test_wrong_number_of_levels(instrument):
+    with pytest.raises(ValueError):
+        instrument.channels.voltage.setpoint.levels = [1.0, 2.0]
+
+
+def test_nan_level_is_rejected(instrument):
+    with pytest.raises(ValueError):
+        instrument.channels.voltage.setpoint.levels = [1.0, np.nan, 2.0]
+
+
+def test_protection_levels(instrument):
+    instrument.channels.voltage.protection.levels = [20.0, 21.0, 5.5]
+    np.testing.assert_array_equal(instrument.channels.voltage.protection.levels, [20.0, 21.0, 5.5])
+    np.testing.assert_array_equal(instrument.channels.voltage.protection.max, [33.0, 33.0, 5.5])
+
+
+def test_levels_use_cache():
+    fake = RecordingFakeVisaDP832()
+    instrument = DP832(fake, cache=StateCache())
+    instrument.channels.voltage.setpoint.levels = [1.0, 2.0, 3.0]
+    fake.messages.clear()
+    np.testing.assert_array_equal(instrument.channels.voltage.setpoint.levels, [1.0, 2.0, 3.0])
+    assert instrument.channel(2).voltage.setpoint.level == 2.0
+    assert fake.messages == []
+
+
+def test_read_overtaken_by_write_is_not_cached():
+    dp832 = DP832(RecordingFakeVisaDP832(), cache=StateCache())
+    setpoint = dp832.channel(2).voltage.setpoint
+    query = dp832._inst.query
+
+    def overtaken_query(command):
+        response = query(command)
+        # Another thread writes the setpoint while the read is in flight.
+        dp832._inst.query = query
+        setpoint.level = 7.0
+        return response
+
+    dp832._inst.query = overtaken_query
+    assert list(dp832.channels.voltage.setpoint.levels) == [0.0, 0.0, 0.0]
+    assert setpoint.level == 7.0
+    assert dp832.channels.voltage.setpoint.levels[1] == 7.0
+
+
+def test_measure_in_one_message(instrument):
+    fake = instrument._inst
+    instrument.channels.voltage.setpoint.levels = [1.0, 2.0, 3.0]
+    fake.messages.clear()
+    readings = instrument.channels.measure()
+    assert len(fake.messages) == 1
+    assert readings.shape == (3, 3)
+    for row, channel_id in zip(readings, instrument.channel_ids):
+        assert tuple(row) == tuple(instrument.channel(channel_id).measure_all())
+
+
+def test_subset_of_channels(instrument):
+    view = instrument.channels[1, 3]
+    assert view.channel_ids == [1, 3]
+    view.voltage.setpoint.levels = [4.0, 5.0]
+    assert instrument.channel(3).voltage.setpoint.level == 5.0
+    assert view.measure().shape == (2, 3)
@@ -0,0 +1,173 @@
+import threading
+import time
+
+import pytest
+
+from dp800.dp800 import DP832, ChannelMode
+from dp800.watchdog import (ProtectionWatchdog, read_status, MODE, OUTPUT_STATE, OVER_CURRENT_TRIPPED,
+                            OVER_VOLTAGE_TRIPPED)
+from test.fake_visa_dp832 import FakeVisaDP832
+
+
+class CountingFakeVisaDP832(FakeVisaDP832):
+
+    def __init__(self):
+        super().__init__()
+        self.num_queries = 0
+
+    def query(self, command):
+        self.num_queries += 1
+        return super().query(command)
+
+
+@pytest.fixture
+def instrument():
+    return DP832(CountingFakeVisaDP832())
+
+
+def test_read_status_single_round_trip(instrument):
+    instrument._inst.num_queries = 0
+    instrument._inst._channel_current_protection_tripped[2] = 'ON'
+    statuses = read_status(instrument)
+    assert instrument._inst.num_queries == 1
+    assert list(statuses) == instrument.channel_ids
+    assert statuses[2].over_current_tripped
+    assert not statuses[1].over_current_tripped
+    assert statuses[1].mode == ChannelMode.constant_voltage
+
+
+def test_poll_reports_changes(instrument):
+    watchdog = ProtectionWatchdog({'psu': instrument})
+    events = []
+    watchdog.add_callback(events.append)
+    assert watchdog.poll() == []
+    fake = instrument._inst
+    fake._channel_voltage_protection_tripped[1] = 'ON'
+    fake._channel_states[1] = 'ON'
+    fake._channel_modes[3] = 'CC'
+    watchdog.poll()
+    assert {(event.channel_id, event.kind, event.previous, event.current) for event in events} == {
+        (1, OVER_VOLTAGE_TRIPPED, False, True),
+        (1, OUTPUT_STATE, False, True),
+        (3, MODE, ChannelMode.constant_voltage, ChannelMode.constant_current),
+    }
+    assert all(event.instrument == 'psu' for event in events)
+
+
+def test_callback_kinds(instrument):
+    watchdog = ProtectionWatchdog([instrument])
+    events = []
+    watchdog.add_callback(events.append, kinds=[OVER_CURRENT_TRIPPED])
+    watchdog.poll()
+    instrument._inst._channel_states[2] = 'ON'
+    instrument._inst._channel_current_protection_tripped[2] = 'ON'
+    watchdog.poll()
+    assert [(event.instrument, event.kind) for event in events] == [(0, OVER_CURRENT_TRIPPED)]
+    with pytest.raises(ValueError):
+        watchdog.add_callback(events.append, kinds=['smoke'])
+
+
+def test_adaptive_interval(instrument):
+    watchdog = ProtectionWatchdog([instrument], min_interval=0.1, max_interval=0.4, backoff=2.0)
+    watchdog.poll()
+    watchdog.poll()
+    assert watchdog.interval == 0.4
+    instrument._inst._channel_voltage_protection_tripped[3] = 'ON'
+    watchdog.poll()
+    assert watchdog.interval == 0.1
+
+
+def test_clear_resets_trip(instrument):
+    instrument._inst._channel_voltage_protection_tripped[1] = 'ON'
+    assert instrument.channel(1).voltage.protection.has_tripped
+    instrument.channel(1).voltage.protection.clear()
+    assert not instrument.channel(1).voltage.protection.has_tripped
+
+
+def test_background_detection(instrument):
+    detected = threading.Event()
+    with ProtectionWatchdog([instrument], min_interval=0.005, max_interval=0.01) as watchdog:
+        watchdog.add_callback(lambda event: detected.set(), kinds=[OVER_CURRENT_TRIPPED])
+        while watchdog.status(0) is None:
+            detected.wait(0.005)
+        instrument._inst._channel_current_protection_tripped[1] = 'ON'
+        assert detected.wait(1.0)
+    assert not watchdog.is_running
+
+
+def test_errors_are_reported(instrument):
+    errors = []
+    watchdog = ProtectionWatchdog({'psu': instrument}, on_error=lambda name, e: errors.append(name))
+    instrument._inst._channel_modes[1] = 'XX'
+    watchdog.poll()
+    assert errors == ['psu']
+
+
+def test_failing_callback_does_not_stop_others(instrument):
+    events = []
+
+    def fail(event):
+        raise RuntimeError("Callback failed")
+
+    watchdog = ProtectionWatchdog([instrument])
+    watchdog.add_callback(fail)
+    watchdog.add_callback(events.append)
+    watchdog.poll()
+    instrument.channel(1).on()
+    watchdog.poll()
+    assert [event.kind for event in events] == [OUTPUT_STATE]
+
+
+def test_failing_instrument_is_backed_off(instrument):
+    watchdog = ProtectionWatchdog({'psu': instrument}, max_interval=60.0)
+    instrument._inst._channel_modes[1] = 'XX'
+    watchdog.poll()
+    assert isinstance(watchdog.exception, RuntimeError)
+    num_queries = instrument._inst.num_queries
+    watchdog.poll()
+    assert instrument._inst.num_queries == num_queries
+
+
+def test_background_polling_survives_errors(instrument):
+    detected = threading.Event()
+    instrument._inst._channel_modes[1] = 'XX'
+    with ProtectionWatchdog([instrument], min_interval=0.005, max_interval=0.01) as watchdog:
+        watchdog.add_callback(lambda event: 1 / 0)
+        watchdog.add_callback(lambda event: detected.set())
+        deadline = time.monotonic() + 1.0
+        while watchdog.exception is None and time.monotonic() < deadline:
+            detected.wait(0.005)
+        instrument._inst._channel_modes[1] = 'CV'
+        while watchdog.status(0) is None and time.monotonic() < deadline:
+            detected.wait(0.005)
+        instrument.channel(2).on()
+        assert detected.wait(1.0)
+        assert watchdog.is_running
+
+
+class TimedProtectionWatchdog(ProtectionWatchdog):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.poll_times = []
+
+    def poll(self):
+        self.poll_times.append(time.monotonic())
+        return super().poll()
+
+
+def test_poll_after_change_uses_tightened_interval(instrument):
+    detected = threading.Event()
+    with TimedProtectionWatchdog([instrument], min_interval=0.01, max_interval=0.5, backoff=100) as watchdog:
+        watchdog.add_callback(lambda event: detected.set())
+        deadline = time.monotonic() + 1.0
+        while len(watchdog.poll_times) < 2 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert watchdog.interval == 0.5
+        instrument.channel(1).on()
+        assert detected.wait(1.0)
+        detected_polls = len(watchdog.poll_times)
+        deadline = time.monotonic() + 1.0
+        while len(watchdog.poll_times) <= detected_polls and time.monotonic() < deadline:
+            time.sleep(0.005)
+    assert watchdog.poll_times[detected_polls] - watchdog.poll_times[detected_polls - 1] < 0.25